@@ -0,0 +1,73 @@
+"""
+ベンチマーク共通設定 - スクリプトディレクトリの追加と共通フィクスチャ
+"""
+
+import datetime
+import os
+import pathlib
+import sys
+
+import pytest
+
+SCRIPT_DIR = pathlib.Path(__file__).resolve().parent.parent / "script"
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from config_manager import ConfigManager  # noqa: E402
+from audio_processor import AudioProcessor  # noqa: E402
+from file_manager import FileManager  # noqa: E402
+
+
+class OfflineClient:
+    """ベンチマーク中にAPIが呼ばれた場合に失敗させるクライアント"""
+
+    def upload_file(self, path, mime_type=None):
+        raise AssertionError("Benchmarks must not call the API")
+
+    def generate_content(self, model_name, contents, stream=False):
+        raise AssertionError("Benchmarks must not call the API")
+
+    def delete_file(self, name):
+        raise AssertionError("Benchmarks must not call the API")
+
+
+@pytest.fixture
+def bench_env(tmp_path, monkeypatch):
+    """ベンチマーク用の環境変数を一時ディレクトリに向ける"""
+    values = {
+        "GOOGLE_API_KEY": "offline",
+        "MARKDOWN_OUTPUT_DIR": str(tmp_path / "markdown"),
+        "STATE_DIR": str(tmp_path / "state"),
+        "TEMP_CHUNK_BASE_DIR": str(tmp_path / "chunks"),
+        "RECORDING_FILENAME_PATTERN": "V%Y%m%d-%H%M%S",
+        "SEARCH_INDEX_ENABLED": "false",
+        "OBSIDIAN_DAILY_NOTES_DIR": str(tmp_path / "daily"),
+        "DAILY_NOTE_FILENAME_PATTERN": "%Y-%m-%d.md",
+        "DAILY_NOTE_HEADING": "## 🎙️ 音声記録",
+    }
+    for key, value in values.items():
+        monkeypatch.setenv(key, value)
+    return tmp_path
+
+
+@pytest.fixture
+def config(bench_env):
+    return ConfigManager()
+
+
+@pytest.fixture
+def audio_processor(config):
+    return AudioProcessor(config, client=OfflineClient())
+
+
+@pytest.fixture
+def file_manager(config):
+    return FileManager(config)
+
+
+def recording_names(count: int) -> list:
+    """RECORDING_FILENAME_PATTERN に一致する決定的なファイル名を生成"""
+    base = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    return [
+        (base + datetime.timedelta(minutes=7 * index)).strftime("V%Y%m%d-%H%M%S") + ".wav"
+        for index in range(count)
+    ]
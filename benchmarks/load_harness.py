@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+負荷試験ハーネス - 合成音声と疑似APIでパイプライン全体を実行し、資源使用量を計測
+
+実行例:
+    python benchmarks/load_harness.py --scenario many_files
+    python benchmarks/load_harness.py --scenario long_8h --check-budgets
+    python benchmarks/load_harness.py --files 3 --duration-s 90 --formats wav,mp3 --latency-ms 50
+
+計測値（経過時間・ピークRSS・tracemalloc ピーク・一時ディスク最大使用量・API呼び出し回数）は
+load_budgets.json のシナリオ別予算と比較できる。
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import os
+import pathlib
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+import wave
+
+SCRIPT_DIR = pathlib.Path(__file__).resolve().parent.parent / "script"
+sys.path.insert(0, str(SCRIPT_DIR))
+
+BUDGETS_PATH = pathlib.Path(__file__).resolve().parent / "load_budgets.json"
+SUPPORTED_FORMATS = ["wav", "mp3", "m4a", "flac", "aac"]
+EXPORT_FORMATS = {"m4a": "ipod", "aac": "adts"}
+RECORDING_FILENAME_PATTERN = "V%Y%m%d-%H%M%S"
+
+
+class FakeGeminiClient:
+    """upload / generate / delete を模擬するローカルのAPIスタンドイン"""
+
+    def __init__(self, upload_latency_ms: float = 0.0, generate_latency_ms: float = 0.0,
+                 delete_latency_ms: float = 0.0, output_chars: int = 2000, stream_chunks: int = 8):
+        self.upload_latency_ms = upload_latency_ms
+        self.generate_latency_ms = generate_latency_ms
+        self.delete_latency_ms = delete_latency_ms
+        self.output_chars = output_chars
+        self.stream_chunks = max(1, stream_chunks)
+        self.calls = collections.Counter()
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sleep(latency_ms: float):
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000)
+
+    def upload_file(self, path, mime_type=None):
+        size = 0
+        if hasattr(path, "read"):
+            position = path.tell()
+            for block in iter(lambda: path.read(1024 * 1024), b""):
+                size += len(block)
+            path.seek(position)
+        else:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    size += len(block)
+        self._sleep(self.upload_latency_ms)
+        with self._lock:
+            self.calls["upload"] += 1
+            self.bytes_received += size
+            name = f"files/fake-{self.calls['upload']}"
+        return types.SimpleNamespace(name=name, uri=f"https://fake.invalid/{name}", mime_type=mime_type)
+
+    def generate_content(self, model_name, contents, stream=False):
+        with self._lock:
+            self.calls["generate"] += 1
+        prompt = contents if isinstance(contents, str) else contents[0]
+        if "ファイル名" in prompt:
+            text = "負荷試験会議"
+        else:
+            text = ("合成音声の文字起こし結果です。" * (self.output_chars // 15 + 1))[:self.output_chars]
+        prompt_tokens = len(prompt) // 2 + (0 if isinstance(contents, str) else 1000)
+        pieces = [text[len(text) * index // self.stream_chunks:len(text) * (index + 1) // self.stream_chunks]
+                  for index in range(self.stream_chunks)]
+        chunks = []
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            chunks.append(types.SimpleNamespace(
+                candidates=[types.SimpleNamespace(
+                    finish_reason="STOP" if last else "FINISH_REASON_UNSPECIFIED",
+                    content=types.SimpleNamespace(parts=[types.SimpleNamespace(text=piece)] if piece else []),
+                )],
+                usage_metadata=types.SimpleNamespace(
+                    prompt_token_count=prompt_tokens, candidates_token_count=len(text) // 2,
+                    total_token_count=prompt_tokens + len(text) // 2,
+                ) if last else None,
+            ))
+        self._sleep(self.generate_latency_ms)
+        return iter(chunks) if stream else chunks[-1]
+
+    def delete_file(self, name):
+        self._sleep(self.delete_latency_ms)
+        with self._lock:
+            self.calls["delete"] += 1
+
+
+class DiskUsageSampler:
+    """一時ディレクトリの使用量を定期的に計測し、最大値を記録"""
+
+    def __init__(self, directory: pathlib.Path, interval_s: float = 0.2):
+        self.directory = directory
+        self.interval_s = interval_s
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _measure(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._measure())
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._measure())
+
+
+def write_synthetic_wav(path: pathlib.Path, duration_s: float, frame_rate: int = 8000):
+    """合成PCM（モノラル16bit）をメモリを使わずにWAVとして書き出し"""
+    block = bytes((index * 37) % 256 for index in range(frame_rate * 2))
+    remaining_frames = int(duration_s * frame_rate)
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(frame_rate)
+        while remaining_frames > 0:
+            frames = min(remaining_frames, frame_rate)
+            wav_file.writeframes(block[:frames * 2])
+            remaining_frames -= frames
+
+
+def generate_recordings(directory: pathlib.Path, count: int, duration_s: float, formats: list) -> list:
+    """RECORDING_FILENAME_PATTERN に一致する合成録音ファイルを生成"""
+    available_formats = []
+    for audio_format in formats:
+        if audio_format != "wav" and shutil.which("ffmpeg") is None:
+            print(f"Warning: ffmpeg not found; skipping {audio_format} recordings.")
+            continue
+        available_formats.append(audio_format)
+    if not available_formats:
+        raise ValueError("No requested audio format can be generated in this environment.")
+
+    from pydub import AudioSegment
+
+    directory.mkdir(parents=True, exist_ok=True)
+    base = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    paths = []
+    for index in range(count):
+        audio_format = available_formats[index % len(available_formats)]
+        stem = (base + datetime.timedelta(minutes=index)).strftime(RECORDING_FILENAME_PATTERN)
+        wav_path = directory / f"{stem}.wav"
+        write_synthetic_wav(wav_path, duration_s)
+        if audio_format != "wav":
+            target_path = directory / f"{stem}.{audio_format}"
+            AudioSegment.from_wav(wav_path).export(target_path, format=EXPORT_FORMATS.get(audio_format, audio_format))
+            wav_path.unlink()
+            wav_path = target_path
+        paths.append(wav_path)
+    return paths
+
+
+def peak_rss_bytes() -> int:
+    """プロセスのピークRSS（Linux は KB、macOS はバイト単位で返される）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_pipeline(work_dir: pathlib.Path, client: FakeGeminiClient, trace_memory: bool) -> dict:
+    """パイプライン全体を実行して計測値を返す"""
+    input_dir = work_dir / "inbox"
+    temp_dir = work_dir / "tmp_chunks"
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    prompt_path = SCRIPT_DIR.parent / "prompt" / "summary_prompt.txt"
+
+    os.environ.update({
+        "GOOGLE_API_KEY": "load-harness",
+        "MARKDOWN_OUTPUT_DIR": str(work_dir / "markdown"),
+        "STATE_DIR": str(work_dir / "state"),
+        "TEMP_CHUNK_BASE_DIR": str(temp_dir),
+        "PROCESSED_FILES_DIR": str(work_dir / "done"),
+        "RECORDING_FILENAME_PATTERN": RECORDING_FILENAME_PATTERN,
+        "OBSIDIAN_DAILY_NOTES_DIR": str(work_dir / "daily"),
+        "GEMINI_CASSETTE_MODE": "off",
+    })
+
+    import transcribe_summarize
+
+    argv = [
+        "--audio_processing_dir", str(input_dir),
+        "--markdown_output_dir", str(work_dir / "markdown"),
+        "--summary_prompt_file_path", str(prompt_path),
+        "--processed_log_file_path", str(work_dir / "processed_log.jsonl"),
+        "--no_summary_cache",
+    ]
+
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    with DiskUsageSampler(temp_dir) as disk_sampler:
+        transcribe_summarize.main(argv, client=client)
+    wall_s = time.perf_counter() - start_time
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    statuses = collections.Counter()
+    with open(work_dir / "processed_log.jsonl", "r", encoding="utf-8") as f:
+        for line in f:
+            statuses[json.loads(line)["status"]] += 1
+
+    return {
+        "wall_s": round(wall_s, 2),
+        "peak_rss_mb": round(peak_rss_bytes() / 1024 / 1024, 1),
+        "tracemalloc_peak_mb": round(traced_peak / 1024 / 1024, 1) if traced_peak is not None else None,
+        "temp_disk_peak_mb": round(disk_sampler.peak_bytes / 1024 / 1024, 1),
+        "api_calls.upload": client.calls["upload"],
+        "api_calls.generate": client.calls["generate"],
+        "api_calls.delete": client.calls["delete"],
+        "uploaded_mb": round(client.bytes_received / 1024 / 1024, 1),
+        "files.success": statuses["success"],
+        "files.error": statuses["error"],
+    }
+
+
+def check_budgets(report: dict, budgets: dict) -> list:
+    """予算を超えた計測値の一覧を返す（files.success は下限）"""
+    violations = []
+    for key, limit in budgets.items():
+        value = report.get(key)
+        if value is None:
+            continue
+        if key == "files.success":
+            if value < limit:
+                violations.append(f"{key}={value} < {limit}")
+        elif value > limit:
+            violations.append(f"{key}={value} > {limit}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load harness with synthetic audio and a fake API.")
+    parser.add_argument("--scenario", help="Scenario name from load_budgets.json.")
+    parser.add_argument("--files", type=int, default=3, help="Number of recordings to generate.")
+    parser.add_argument("--duration-s", type=float, default=60, help="Duration of each recording in seconds.")
+    parser.add_argument("--formats", default="wav", help=f"Comma separated formats ({','.join(SUPPORTED_FORMATS)}).")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency of each fake API call.")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Disable tracemalloc (it slows allocation-heavy code).")
+    parser.add_argument("--check-budgets", action="store_true", help="Exit non-zero if a scenario budget is exceeded.")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory.")
+    parser.add_argument("--output", help="Write the JSON report to this path.")
+    args = parser.parse_args()
+
+    settings = {
+        "files": args.files, "duration_s": args.duration_s,
+        "formats": args.formats.split(","), "latency_ms": args.latency_ms,
+    }
+    budgets = {}
+    if args.scenario:
+        with open(BUDGETS_PATH, "r", encoding="utf-8") as f:
+            scenario = json.load(f)[args.scenario]
+        settings.update({key: value for key, value in scenario.items() if key != "budgets"})
+        budgets = scenario.get("budgets", {})
+
+    work_dir = pathlib.Path(tempfile.mkdtemp(prefix="applaud_load_"))
+    try:
+        print(f"Generating {settings['files']} x {settings['duration_s']}s recordings ({','.join(settings['formats'])}) in {work_dir}")
+        generate_recordings(work_dir / "inbox", settings["files"], settings["duration_s"], settings["formats"])
+        client = FakeGeminiClient(
+            upload_latency_ms=settings["latency_ms"], generate_latency_ms=settings["latency_ms"],
+            delete_latency_ms=settings["latency_ms"],
+        )
+        report = run_pipeline(work_dir, client, trace_memory=not args.no_tracemalloc)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"scenario": args.scenario, "settings": settings, "results": report}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    violations = check_budgets(report["results"], budgets)
+    if violations:
+        print("Budget exceeded: " + ", ".join(violations))
+        if args.check_budgets:
+            sys.exit(1)
+    elif budgets:
+        print("All budgets met.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+CPU処理のマイクロベンチマーク（固定サイズの合成入力）
+
+実行例:
+    pip install -r requirements-dev.txt
+    python -m pytest benchmarks
+    python -m pytest benchmarks --benchmark-compare   # 前回保存した結果と比較
+"""
+
+import datetime
+import pathlib
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from pydub import AudioSegment  # noqa: E402
+
+from conftest import recording_names  # noqa: E402
+from daily_note_utils import add_link_to_daily_note  # noqa: E402
+from file_manager import FileManager  # noqa: E402
+
+FILENAME_COUNT = 100_000
+SANITIZE_COUNT = 10_000
+DAILY_NOTE_LINKS = 500
+AUDIO_DIR_FILES = 50_000
+MARKDOWN_COLLISIONS = 200
+SYNTHETIC_AUDIO_MS = 10 * 60 * 1000
+
+
+def test_extract_recording_datetime(benchmark, audio_processor, capsys):
+    """ファイル名からの録音日時抽出（10万件）"""
+    names = recording_names(FILENAME_COUNT)
+
+    def run():
+        for name in names:
+            audio_processor.extract_recording_datetime_from_filename(name)
+        capsys.readouterr()
+
+    benchmark.pedantic(run, rounds=3, iterations=1)
+
+
+def test_sanitize_filename(benchmark, audio_processor, file_manager):
+    """APIが提案したファイル名のサニタイズ（1万件）"""
+    suggestions = [
+        f"  「AI戦略会議」議事録 / 第{index}回: 予算*案?の<検討> -- 2024  " for index in range(SANITIZE_COUNT)
+    ]
+
+    def run():
+        for suggestion in suggestions:
+            audio_processor.sanitize_filename(suggestion)
+            file_manager._sanitize_filename(suggestion)
+
+    benchmark(run)
+
+
+def test_add_link_to_daily_note(benchmark, bench_env, capsys):
+    """数百件のリンクを持つデイリーノートへのリンク追加"""
+    note_path = bench_env / "daily" / "2024-01-01.md"
+    note_path.parent.mkdir(parents=True, exist_ok=True)
+    base = datetime.datetime(2024, 1, 1)
+    links = [
+        f"- [[20240101_会議{index}]] ({(base + datetime.timedelta(minutes=2 * index)).strftime('%H:%M')})"
+        for index in range(DAILY_NOTE_LINKS)
+    ]
+    initial_content = "# 2024年01月01日\n\n## 🎙️ 音声記録\n" + "\n".join(links) + "\n\n## 💭 メモ\n\n"
+    recording_datetime = datetime.datetime(2024, 1, 1, 12, 31)
+
+    def setup():
+        note_path.write_text(initial_content, encoding="utf-8")
+        capsys.readouterr()
+
+    def run():
+        add_link_to_daily_note("20240101_新しい会議.md", recording_datetime)
+
+    benchmark.pedantic(run, setup=setup, rounds=50, iterations=1)
+
+
+@pytest.fixture(scope="module")
+def large_audio_dir(tmp_path_factory):
+    """5万ファイルを含む取り込みディレクトリ"""
+    directory = tmp_path_factory.mktemp("audio_inbox")
+    extensions = [".wav", ".WAV", ".mp3", ".m4a", ".txt"]
+    for index, name in enumerate(recording_names(AUDIO_DIR_FILES)):
+        (directory / (pathlib.Path(name).stem + extensions[index % len(extensions)])).touch()
+    return directory
+
+
+def test_get_audio_files(benchmark, file_manager, large_audio_dir):
+    """5万ファイルのディレクトリからの音声ファイル列挙"""
+    result = benchmark.pedantic(file_manager.get_audio_files, args=(str(large_audio_dir),), rounds=5, iterations=1)
+    assert len(result) == AUDIO_DIR_FILES * 4 // 5
+
+
+def test_save_markdown_collisions(benchmark, config, capsys):
+    """同名の議事録が多数ある場合の保存（重複名の解決、毎回ディレクトリの読み込みから）"""
+    output_dir = pathlib.Path(config.markdown_output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "20240101_定例会議.md").touch()
+    for index in range(1, MARKDOWN_COLLISIONS):
+        (output_dir / f"20240101_定例会議_{index}.md").touch()
+    recording_datetime = datetime.datetime(2024, 1, 1, 10, 0)
+    saved = []
+    managers = []
+
+    def setup():
+        for path in saved:
+            pathlib.Path(path).unlink()
+        saved.clear()
+        # 名前インデックスは FileManager（MarkdownWriter）ごとに保持されるため、毎回作り直す
+        managers[:] = [FileManager(config)]
+        capsys.readouterr()
+
+    def run():
+        saved.append(managers[0].save_markdown("## 要約\n本文", "定例会議", recording_datetime))
+
+    benchmark.pedantic(run, setup=setup, rounds=30, iterations=1)
+
+
+@pytest.fixture(scope="module")
+def synthetic_audio():
+    """10分間の合成PCM（16kHz・モノラル・16bit）"""
+    frame_rate = 16000
+    frame_count = frame_rate * SYNTHETIC_AUDIO_MS // 1000
+    raw_data = bytes(range(256)) * (frame_count * 2 // 256)
+    return AudioSegment(data=raw_data, sample_width=2, frame_rate=frame_rate, channels=1)
+
+
+def test_chunk_slicing_and_speed_change(benchmark, audio_processor, synthetic_audio, tmp_path, capsys):
+    """チャンクの切り出しと倍速変換・WAV書き出し"""
+    chunk_ms = 2 * 60 * 1000
+    output_path = tmp_path / "chunk_fast.wav"
+
+    def run():
+        for start_ms in range(0, len(synthetic_audio), chunk_ms):
+            audio_processor._export_fast_segment(synthetic_audio[start_ms:start_ms + chunk_ms], output_path)
+        capsys.readouterr()
+
+    benchmark.pedantic(run, rounds=5, iterations=1)
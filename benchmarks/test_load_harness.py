@@ -0,0 +1,34 @@
+"""
+負荷試験ハーネスの小さなシナリオ（5秒の録音2件）を予算チェック付きで実行
+
+実行例:
+    python -m pytest benchmarks/test_load_harness.py
+"""
+
+import json
+import pathlib
+import subprocess
+import sys
+
+HARNESS_PATH = pathlib.Path(__file__).resolve().parent / "load_harness.py"
+BUDGETS_PATH = pathlib.Path(__file__).resolve().parent / "load_budgets.json"
+
+
+def test_smoke_scenario_meets_budgets(tmp_path):
+    """smoke シナリオが load_budgets.json の予算内に収まり、全ファイルを処理すること"""
+    output_path = tmp_path / "report.json"
+    result = subprocess.run(
+        [sys.executable, str(HARNESS_PATH), "--scenario", "smoke", "--check-budgets", "--output", str(output_path)],
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "All budgets met." in result.stdout
+
+    with open(BUDGETS_PATH, "r", encoding="utf-8") as f:
+        budgets = json.load(f)["smoke"]["budgets"]
+    with open(output_path, "r", encoding="utf-8") as f:
+        results = json.load(f)["results"]
+    # API呼び出し数は上限ではなく、チャンク1つのファイルごとの upload・generate（文字起こし・要約・タイトル）・delete の実数
+    for key in ("api_calls.upload", "api_calls.generate", "api_calls.delete", "files.success"):
+        assert results[key] == budgets[key], key
+    assert results["files.error"] == 0
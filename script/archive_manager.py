@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+音声アーカイブ - 処理済みの録音を低優先度のプロセスでOpus/FLACに変換し、元ファイルとの対応を記録
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import os
+import pathlib
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+from config_manager import ConfigManager
+
+# コーデックごとの ffmpeg の出力設定と拡張子
+CODECS = {
+    "opus": (".opus", ["-c:a", "libopus", "-application", "voip"]),
+    "flac": (".flac", ["-c:a", "flac", "-compression_level", "8"]),
+}
+
+
+def _lower_priority(nice: int):
+    """ワーカープロセスの優先度を下げる（プロセスプールの初期化用）"""
+    try:
+        os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+
+
+def _file_sha256(path: pathlib.Path) -> str:
+    """ファイル内容のSHA-256ハッシュを計算"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def probe_duration(path: pathlib.Path) -> float:
+    """ffprobe で音声の長さ（秒）を取得"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1",
+         str(path)],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip())
+
+
+def transcode_for_archive(source: str, codec: str, bitrate: str) -> dict:
+    """録音をアーカイブ形式の一時ファイルに変換し、元の録音と変換結果の長さを返す（プロセスプールのワーカー用）"""
+    source_path = pathlib.Path(source)
+    suffix, codec_args = CODECS[codec]
+    temp_path = source_path.with_name(f".{source_path.name}.archive{suffix}")
+
+    bitrate_args = ["-b:a", bitrate] if codec == "opus" else []
+    try:
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", str(source_path), "-vn"]
+            + codec_args + bitrate_args + [str(temp_path)],
+            capture_output=True, text=True, check=True,
+        )
+        source_duration = probe_duration(source_path)
+        archive_duration = probe_duration(temp_path)
+        return {
+            "source": str(source_path),
+            "temp_path": str(temp_path),
+            "codec": codec,
+            "source_duration_s": source_duration,
+            "archive_duration_s": archive_duration,
+            "archive_size": temp_path.stat().st_size,
+            "archive_sha256": _file_sha256(temp_path),
+        }
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+class ArchiveManager:
+    """処理済みの録音のアーカイブ変換と、元ファイルのハッシュからアーカイブへの対応表
+
+    変換はバックグラウンドの低優先度プロセスプールで行い、長さが一致したものだけ
+    対応表に記録してから元ファイルを削除する（変換・確認に失敗した場合は元ファイルを残す）。
+    """
+
+    DURATION_TOLERANCE_S = 0.5
+
+    def __init__(self, index_path: str, codec: str = "opus", bitrate: str = "32k", workers: int = 1,
+                 nice: int = 19, extensions: tuple = (".wav",), transcoder=transcode_for_archive):
+        """初期化"""
+        if codec not in CODECS:
+            raise ValueError(f"Unknown ARCHIVE_CODEC: {codec} (expected one of {', '.join(CODECS)})")
+        self.codec = codec
+        self.bitrate = bitrate
+        self.workers = workers
+        self.nice = nice
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.transcoder = transcoder
+        self.stats = {"archived": 0, "archive_failures": 0, "archive_bytes_saved": 0}
+        self._pending = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+        if index_path != ":memory:":
+            pathlib.Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(index_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS archives ("
+            " original_sha256 TEXT PRIMARY KEY,"
+            " original_name TEXT NOT NULL,"
+            " original_size INTEGER NOT NULL,"
+            " archive_path TEXT NOT NULL,"
+            " archive_sha256 TEXT NOT NULL,"
+            " archive_size INTEGER NOT NULL,"
+            " codec TEXT NOT NULL,"
+            " duration_s REAL NOT NULL,"
+            " archived_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_archives_archive_sha256 ON archives (archive_sha256)")
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: ConfigManager) -> Optional["ArchiveManager"]:
+        """設定から作成（無効の場合は None）"""
+        if not config.archive_enabled:
+            return None
+        return cls(
+            config.archive_index_path, codec=config.archive_codec, bitrate=config.archive_opus_bitrate,
+            workers=config.archive_workers, nice=config.archive_nice,
+            extensions=tuple(extension.strip() for extension in config.archive_extensions.split(",") if extension.strip()),
+        )
+
+    def should_archive(self, path: pathlib.Path) -> bool:
+        """アーカイブ対象の形式か"""
+        return path.suffix.lower() in self.extensions
+
+    def submit(self, path: pathlib.Path, original_sha256: Optional[str] = None):
+        """変換をプロセスプールに投入"""
+        if not self.should_archive(path):
+            return
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_lower_priority, initargs=(self.nice,)
+            )
+        future = self._executor.submit(self.transcoder, str(path), self.codec, self.bitrate)
+        with self._lock:
+            self._pending[future] = (path, original_sha256)
+        print(f"Queued archival transcoding ({self.codec}): {path.name}")
+
+    def collect(self, wait: bool = False):
+        """完了した変換を確認・記録し、元ファイルを削除（wait=True なら全件の完了を待つ）"""
+        with self._lock:
+            futures = list(self._pending)
+        if wait:
+            concurrent.futures.wait(futures)
+        for future in futures:
+            if not future.done():
+                continue
+            with self._lock:
+                path, original_sha256 = self._pending.pop(future)
+            try:
+                self._finish(path, original_sha256, future.result())
+            except Exception as e:
+                self.stats["archive_failures"] += 1
+                print(f"Warning: Archival transcoding failed for {path.name}; keeping the original: {e}")
+
+    def _finish(self, path: pathlib.Path, original_sha256: Optional[str], result: dict):
+        """長さを確認し、対応表に記録してから元ファイルを削除"""
+        temp_path = pathlib.Path(result["temp_path"])
+        try:
+            if abs(result["archive_duration_s"] - result["source_duration_s"]) > self.DURATION_TOLERANCE_S:
+                raise ValueError(
+                    f"duration mismatch (source {result['source_duration_s']:.2f}s,"
+                    f" archive {result['archive_duration_s']:.2f}s)"
+                )
+            original_size = path.stat().st_size
+            original_sha256 = original_sha256 or _file_sha256(path)
+            # 重複ファイル名の処理
+            suffix = CODECS[result["codec"]][0]
+            archive_path = path.with_suffix(suffix)
+            counter = 1
+            while archive_path.exists():
+                archive_path = path.with_name(f"{path.stem}_{counter}{suffix}")
+                counter += 1
+            os.replace(temp_path, archive_path)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO archives (original_sha256, original_name, original_size, archive_path,"
+                " archive_sha256, archive_size, codec, duration_s, archived_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (original_sha256, path.name, original_size, str(archive_path), result["archive_sha256"],
+                 result["archive_size"], result["codec"], result["source_duration_s"], time.time())
+            )
+            self._connection.commit()
+        path.unlink()
+        self.stats["archived"] += 1
+        self.stats["archive_bytes_saved"] += original_size - result["archive_size"]
+        print(f"Archived {path.name} -> {archive_path.name} ({original_size:,} -> {result['archive_size']:,} bytes)")
+
+    def lookup(self, sha256: str) -> Optional[dict]:
+        """元ファイルまたはアーカイブのハッシュから対応を検索"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT original_sha256, original_name, original_size, archive_path, archive_sha256, archive_size,"
+                " codec, duration_s, archived_at FROM archives WHERE original_sha256 = ? OR archive_sha256 = ?",
+                (sha256, sha256)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("original_sha256", "original_name", "original_size", "archive_path", "archive_sha256",
+                "archive_size", "codec", "duration_s", "archived_at")
+        return dict(zip(keys, row))
+
+    def close(self):
+        """残りの変換の完了を待って終了"""
+        if self._pending:
+            print(f"Waiting for {len(self._pending)} archival transcoding job(s)...")
+        self.collect(wait=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+        with self._lock:
+            self._connection.close()
+
+
+def main():
+    """既存の処理済みファイルのアーカイブ・対応の検索コマンド"""
+    parser = argparse.ArgumentParser(description="Archive processed recordings and look up archived originals.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = subparsers.add_parser("backfill", help="Archive recordings already in a directory.")
+    backfill_parser.add_argument("directory", nargs="?", help="Directory to archive (default: PROCESSED_FILES_DIR).")
+
+    lookup_parser = subparsers.add_parser("lookup", help="Find the archive of an original (by SHA-256 or file).")
+    lookup_parser.add_argument("target", help="SHA-256 of the original or archive, or a path to either file.")
+    args = parser.parse_args()
+
+    config = ConfigManager()
+    config.archive_enabled = True
+    archive_manager = ArchiveManager.from_config(config)
+
+    if args.command == "lookup":
+        target = pathlib.Path(args.target)
+        sha256 = _file_sha256(target) if target.is_file() else args.target
+        entry = archive_manager.lookup(sha256)
+        archive_manager.close()
+        if entry is None:
+            print(f"No archive entry for {sha256}")
+            sys.exit(1)
+        for key, value in entry.items():
+            print(f"{key}: {value}")
+        return
+
+    directory = pathlib.Path(args.directory or config.processed_files_dir or "")
+    if not directory.is_dir():
+        print(f"Error: Directory not found: {directory}")
+        sys.exit(1)
+    for path in sorted(directory.iterdir()):
+        if path.is_file() and archive_manager.should_archive(path):
+            archive_manager.submit(path)
+    archive_manager.close()
+    print(
+        f"Archived {archive_manager.stats['archived']} file(s), {archive_manager.stats['archive_failures']} failed, "
+        f"{archive_manager.stats['archive_bytes_saved'] / 1024 / 1024:.1f} MB saved."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,50 @@
 音声処理クラス - 文字起こし・要約・ファイル名生成
 """
 
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import glob
+import hashlib
+import io
+import os
 import pathlib
 import tempfile
+import threading
+import time
+import types
 import re
 from typing import Optional, Tuple
 
-import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from pydub import AudioSegment
 
+from batch_backend import BatchRequest, BatchResult
 from config_manager import ConfigManager
+from gemini_client import GeminiClient
+from speed_calibrator import SpeedCalibrator
+from summary_cache import SummaryCache
+from usage_ledger import UsageLedger
+
+
+# ストリーミングを途中出力から再開する一時的なエラー（それ以外のエラーは再試行せずに送出）
+TRANSIENT_STREAM_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class TranscriptionIncompleteError(ValueError):
+    """文字起こしが出力上限で途切れた、または空だった場合の例外"""
+
+    def __init__(self, message: str, reason: str, partial_text: str = ""):
+        super().__init__(message)
+        self.reason = reason
+        self.partial_text = partial_text
 
 
 class AudioProcessor:
@@ -21,13 +55,197 @@ class AudioProcessor:
     # 定数
     CHUNK_MAX_DURATION_MS = 20 * 60 * 1000  # 20分
     OVERLAP_MS = 1 * 60 * 1000  # 1分
+    MIN_SPLIT_CHUNK_MS = 2 * 60 * 1000  # 再分割する最小チャンク長（2分）
+    SPLIT_OVERLAP_MS = 10 * 1000  # 再分割時のオーバーラップ（10秒）
+    MAX_SPLIT_DEPTH = 3
     MAX_FILENAME_LENGTH = 50
+    WAV_HEADER_BYTES = 44  # チャンクのサイズ見積もりに使うWAVヘッダ長
+    SILENCE_WINDOW_MS = 100  # 無音判定の窓幅
+    SILENCE_MIN_MS = 1500  # 圧縮対象とする無音区間の最小長
+    SILENCE_KEEP_MS = 300  # 圧縮時に無音区間の前後に残す長さ
+    SILENCE_THRESHOLD_DB = 16  # セグメント全体の平均音量からこれだけ小さい窓を無音とみなす
+    MAX_STREAM_ATTEMPTS = 3  # ストリーミング中断時の再開を含む最大試行回数
+    CONTINUATION_CONTEXT_CHARS = 2000  # 再開時に渡す途中出力の末尾文字数
+    TRANSCRIPTION_PROMPT = "この音声ファイルを文字起こししてください。"
+    CONTINUATION_NOTE = (
+        "\n\n以下はこの依頼に対する途中までの出力です。"
+        "この続きから出力を再開し、既に出力した部分は繰り返さないでください。\n\n---\n{partial}\n---"
+    )
+    BATCH_TITLE_NOTE = (
+        "\n\n要約の出力後、最後の行に「ファイル名: 」に続けて、要約内容の最も重要なトピックを反映した"
+        "具体的で短い日本語のファイル名を一つだけ出力してください。"
+        "ファイル名は{max_length}文字以内の一つの連続した文字列とし、日本語、英数字、アンダースコア、"
+        "ハイフンのみを使用して、拡張子は含めないでください。"
+    )
+    BATCH_TITLE_LINE_PATTERN = re.compile(r"^[*_\s]*ファイル名[*_\s]*[:：][*_\s]*(.+?)[*_\s]*$")
     
-    def __init__(self, config: ConfigManager):
+    def __init__(self, config: ConfigManager, summary_cache: Optional[SummaryCache] = None,
+                 client: Optional[GeminiClient] = None, usage_ledger: Optional[UsageLedger] = None,
+                 speed_calibrator: Optional[SpeedCalibrator] = None):
         """初期化"""
         self.config = config
-        self.model = genai.GenerativeModel("gemini-1.5-flash")
-        genai.configure(api_key=config.google_api_key)
+        # 処理設定（予算ガバナーがファイルごとに変更する）
+        self.model_name = "gemini-1.5-flash"
+        self.speed_multiplier = config.audio_speed_multiplier
+        self.silence_compression = config.silence_compression_enabled
+        # API呼び出しはクライアント経由で行う（記録・再生レイヤーへの差し替えが可能）
+        self.client = client if client is not None else GeminiClient.from_config(config)
+        # 要約・タイトル生成結果のキャッシュ（None の場合は無効）
+        self.summary_cache = summary_cache
+        # トークン使用量・推定料金の日別台帳（None の場合は記録しない）
+        self.usage_ledger = usage_ledger
+        # 録音ごとの倍速の自動調整（None の場合は speed_multiplier をそのまま使う）
+        self.speed_calibrator = speed_calibrator
+        # 実行全体のメトリクス（リトライ回数・再分割回数など）
+        self.metrics = collections.Counter()
+        # API呼び出しごとの生成時間（最初のトークンまでの時間・合計時間）
+        self.call_timings = []
+        # 処理中ファイルの処理記録（ProcessingRecord、ステージ別計測に使用）
+        self.record = None
+        # 並列アップロード中のチャンク数の上限（メモリ上のバッファ数を制限）
+        self._upload_slots = threading.BoundedSemaphore(config.upload_parallelism)
+        # バッチモードで準備した録音ごとの (長さ, 文字起こしキャッシュのパス)（保存処理で録音を再デコードしない）
+        self._batch_transcription_plans = {}
+    
+    def reset_metrics(self):
+        """実行メトリクスをリセット"""
+        self.metrics.clear()
+        self.call_timings.clear()
+    
+    def _stage(self, name: str):
+        """処理記録が設定されていればステージの計測を開始"""
+        if self.record is None:
+            return contextlib.nullcontext()
+        return self.record.stage(name)
+    
+    def _record_usage(self, usage_metadata, label: str, cost_ratio: float = 1.0, model_name: Optional[str] = None) -> dict:
+        """レスポンスのトークン使用量をメトリクスと使用量台帳に加算（cost_ratio はバッチ割引などの料金倍率）"""
+        usage = {
+            "prompt_tokens": getattr(usage_metadata, "prompt_token_count", 0) or 0,
+            "candidates_tokens": getattr(usage_metadata, "candidates_token_count", 0) or 0,
+            "total_tokens": getattr(usage_metadata, "total_token_count", 0) or 0,
+        }
+        self.metrics.update(usage)
+        if self.usage_ledger is not None:
+            try:
+                cost = self.usage_ledger.add(
+                    model_name or self.model_name, label.split(":", 1)[0], usage["prompt_tokens"], usage["candidates_tokens"],
+                    cost_ratio=cost_ratio
+                )
+                self.metrics["estimated_cost_usd"] += cost
+            except Exception as e:
+                print(f"Warning: Failed to record API usage: {e}")
+        return usage
+    
+    @staticmethod
+    def _extract_response_text(response) -> Tuple[str, Optional[str]]:
+        """レスポンスからテキストと終了理由を取り出す"""
+        if not response.candidates:
+            return "", None
+        candidate = response.candidates[0]
+        finish_reason = getattr(candidate, "finish_reason", None)
+        finish_reason = getattr(finish_reason, "name", finish_reason)
+        if finish_reason is not None:
+            finish_reason = str(finish_reason)
+        parts = candidate.content.parts if candidate.content else []
+        text = "".join(getattr(part, "text", "") for part in parts)
+        return text, finish_reason
+    
+    @staticmethod
+    def _partial_path(output_path: pathlib.Path) -> pathlib.Path:
+        """ストリーミング途中の出力を書き込むファイルパス"""
+        return output_path.with_name(output_path.name + ".partial")
+    
+    def _continuation_contents(self, contents, partial_text: str):
+        """途中までの出力を添えて続きから生成させるリクエストを作成"""
+        note = self.CONTINUATION_NOTE.format(partial=partial_text[-self.CONTINUATION_CONTEXT_CHARS:])
+        if isinstance(contents, str):
+            return contents + note
+        contents = list(contents)
+        contents[0] = contents[0] + note
+        return contents
+    
+    def _stream_generate(self, contents, partial_path: Optional[pathlib.Path], label: str) -> Tuple[str, Optional[str]]:
+        """generate_content をストリーミングで呼び出し、受信したテキストを逐次追記
+
+        partial_path を指定した場合は受信したテキストをそのファイルに追記し、
+        既存の途中出力があればその続きから生成を再開する。
+        一時的なエラー（TRANSIENT_STREAM_ERRORS）で中断した場合だけ、途中出力から再試行する。
+        """
+        received = []
+        finish_reason = None
+        usage = {}
+        for attempt in range(1, self.MAX_STREAM_ATTEMPTS + 1):
+            request_contents = contents
+            partial_text = self._read_partial(partial_path, received)
+            if partial_text:
+                if attempt == 1:
+                    # 前回の実行の途中出力
+                    print(f"Resuming {label} from partial output ({len(partial_text)} chars): {partial_path}")
+                    self.metrics["stream_resumes"] += 1
+                request_contents = self._continuation_contents(contents, partial_text)
+
+            start_time = time.perf_counter()
+            first_token_time = None
+            output_file = open(partial_path, "a", encoding="utf-8") if partial_path is not None else None
+            usage_metadata = None
+            try:
+                self.metrics["api_generate_calls"] += 1
+                response = self.client.generate_content(self.model_name, request_contents, stream=True)
+                for chunk in response:
+                    if getattr(chunk, "usage_metadata", None):
+                        usage_metadata = chunk.usage_metadata
+                    text, chunk_finish_reason = self._extract_response_text(chunk)
+                    if chunk_finish_reason and chunk_finish_reason != "FINISH_REASON_UNSPECIFIED":
+                        finish_reason = chunk_finish_reason
+                    if not text:
+                        continue
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter()
+                    if output_file is not None:
+                        output_file.write(text)
+                        output_file.flush()
+                    else:
+                        received.append(text)
+                break
+            except TRANSIENT_STREAM_ERRORS as e:
+                if attempt >= self.MAX_STREAM_ATTEMPTS:
+                    raise
+                print(f"Warning: Streaming for {label} interrupted ({e}). Retrying from partial output ({attempt}/{self.MAX_STREAM_ATTEMPTS})...")
+                self.metrics["stream_resumes"] += 1
+            finally:
+                if output_file is not None:
+                    output_file.close()
+                if usage_metadata is not None:
+                    usage = self._record_usage(usage_metadata, label)
+                self._record_call_timing(label, start_time, first_token_time, usage)
+
+        return self._read_partial(partial_path, received), finish_reason
+    
+    @staticmethod
+    def _read_partial(partial_path: Optional[pathlib.Path], received: list) -> str:
+        """これまでに受信したテキストを取得"""
+        if partial_path is None:
+            return "".join(received)
+        if not partial_path.exists():
+            return ""
+        with open(partial_path, "r", encoding="utf-8") as f:
+            return f.read()
+    
+    def _record_call_timing(self, label: str, start_time: float, first_token_time: Optional[float],
+                            usage: Optional[dict] = None):
+        """API呼び出しの生成時間とトークン使用量を記録"""
+        end_time = time.perf_counter()
+        timing = {
+            "label": label,
+            "time_to_first_token_s": round(first_token_time - start_time, 3) if first_token_time else None,
+            "total_s": round(end_time - start_time, 3),
+        }
+        if usage:
+            timing.update(usage)
+        self.call_timings.append(timing)
+        ttft = f"{timing['time_to_first_token_s']:.2f}s" if first_token_time else "n/a"
+        print(f"Generation timing [{label}]: first token {ttft}, total {timing['total_s']:.2f}s")
     
     def extract_recording_datetime_from_filename(self, filename: str) -> Optional[datetime.datetime]:
         """録音ファイル名から日時を抽出"""
@@ -68,71 +286,258 @@ class AudioProcessor:
             print(f"Error extracting datetime from filename '{filename}' with pattern '{pattern}': {e}")
             return None
     
-    def create_fast_audio(self, audio_file_path: str, temp_dir: pathlib.Path) -> pathlib.Path:
-        """音声ファイルを指定倍速に変換"""
-        audio = AudioSegment.from_file(audio_file_path)
-        
-        # 指定倍速に変換
-        fast_audio = audio._spawn(
-            audio.raw_data, 
-            overrides={"frame_rate": int(audio.frame_rate * self.config.audio_speed_multiplier)}
-        )
-        
-        # 一時ファイル名を生成
-        original_name = pathlib.Path(audio_file_path).stem
-        fast_audio_path = temp_dir / f"{original_name}_fast.wav"
-        
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        fast_audio.export(fast_audio_path, format="wav")
-        print(f"Created {self.config.audio_speed_multiplier}x speed audio: {fast_audio_path}")
-        
-        return fast_audio_path
-    
-    def transcribe_chunk(self, audio_chunk_path: pathlib.Path, transcription_output_path: pathlib.Path) -> str:
-        """単一音声チャンクの文字起こし"""
-        print(f"Uploading chunk: {audio_chunk_path}...")
-        audio_file_part = genai.upload_file(path=audio_chunk_path)
+    def transcribe_chunk(self, audio_chunk, transcription_output_path: pathlib.Path,
+                         chunk_name: Optional[str] = None, kind: str = "transcribe") -> str:
+        """単一音声チャンクの文字起こし
+
+        audio_chunk にはファイルパスまたはWAVを保持したバイナリバッファを指定する。
+        出力上限による途切れ・空レスポンスの場合は結果を保存せず
+        TranscriptionIncompleteError を送出する。
+        """
+        if isinstance(audio_chunk, io.IOBase):
+            chunk_name = chunk_name or "buffer"
+            chunk_size = audio_chunk.seek(0, io.SEEK_END)
+            audio_chunk.seek(0)
+            print(f"Uploading chunk from buffer: {chunk_name} ({chunk_size} bytes)...")
+            with self._stage("upload"):
+                audio_file_part = self.client.upload_file(audio_chunk, mime_type="audio/wav")
+        else:
+            chunk_name = chunk_name or pathlib.Path(audio_chunk).name
+            chunk_size = pathlib.Path(audio_chunk).stat().st_size
+            print(f"Uploading chunk: {audio_chunk}...")
+            with self._stage("upload"):
+                audio_file_part = self.client.upload_file(audio_chunk)
+        self.metrics["api_upload_calls"] += 1
+        self.metrics["bytes_uploaded"] += chunk_size
         print(f"Completed upload: {audio_file_part.name}")
 
         print(f"Transcribing chunk {audio_file_part.name}...")
-        response = self.model.generate_content(
-            ["この音声ファイルを文字起こししてください。", audio_file_part]
-        )
-        print(f"Deleting uploaded chunk from API: {audio_file_part.name}")
-        genai.delete_file(audio_file_part.name)
+        partial_path = self._partial_path(transcription_output_path)
+        try:
+            with self._stage("generate"):
+                transcription_text, finish_reason = self._stream_generate(
+                    [self.TRANSCRIPTION_PROMPT, audio_file_part], partial_path, f"{kind}:{chunk_name}"
+                )
+        finally:
+            # 生成に失敗した場合もアップロードしたファイルは削除する
+            self._delete_uploaded_file(audio_file_part.name)
+        self.metrics["chunks_transcribed"] += 1
 
-        transcription_text = ""
-        if response.candidates and response.candidates[0].content.parts:
-            transcription_text = response.candidates[0].content.parts[0].text
-        else:
-            print(f"Warning: Transcription for chunk {audio_chunk_path} returned no text.")
+        if finish_reason == "MAX_TOKENS" or not transcription_text.strip():
+            # 途中結果はキャッシュとして残さない
+            partial_path.unlink(missing_ok=True)
+        if finish_reason == "MAX_TOKENS":
+            self.metrics["truncated_responses"] += 1
+            raise TranscriptionIncompleteError(
+                f"Transcription for chunk {chunk_name} was truncated at the output token limit.",
+                reason="truncated",
+                partial_text=transcription_text,
+            )
+        if not transcription_text.strip():
+            self.metrics["empty_responses"] += 1
+            raise TranscriptionIncompleteError(
+                f"Transcription for chunk {chunk_name} returned no text (finish_reason={finish_reason}).",
+                reason="empty",
+            )
 
-        # 文字起こし結果を保存
+        os.replace(partial_path, transcription_output_path)
+        print(f"Transcription for chunk saved to: {transcription_output_path}")
+        return transcription_text
+    
+    def _delete_uploaded_file(self, name: str):
+        """アップロードしたファイルを削除（クライアントが UploadedFileManager の場合はキューに積むだけ）"""
+        print(f"Deleting uploaded chunk from API: {name}")
+        try:
+            with self._stage("delete"):
+                self.client.delete_file(name)
+            self.metrics["api_delete_calls"] += 1
+        except Exception as e:
+            print(f"Warning: Failed to delete uploaded file {name}: {e}")
+    
+    def _save_chunk_transcription(self, transcription_text: str, transcription_output_path: pathlib.Path):
+        """チャンクの文字起こし結果を保存"""
         try:
             with open(transcription_output_path, "w", encoding="utf-8") as f:
                 f.write(transcription_text)
             print(f"Transcription for chunk saved to: {transcription_output_path}")
         except IOError as e:
-            print(f"Error saving transcription for chunk {audio_chunk_path} to {transcription_output_path}: {e}")
+            print(f"Error saving transcription for chunk to {transcription_output_path}: {e}")
+    
+    def _export_fast_segment(self, segment: AudioSegment, output):
+        """音声セグメントを指定倍速に変換して書き出し（output はパスまたはバイナリバッファ）"""
+        fast_segment = segment._spawn(
+            segment.raw_data,
+            overrides={"frame_rate": int(segment.frame_rate * self.speed_multiplier)}
+        )
+        with self._stage("export"):
+            fast_segment.export(output, format="wav")
+    
+    def _compress_silence(self, segment: AudioSegment) -> AudioSegment:
+        """長い無音区間を前後 SILENCE_KEEP_MS だけ残して削除"""
+        if len(segment) < self.SILENCE_MIN_MS or segment.dBFS == float("-inf"):
+            return segment
+        threshold = segment.dBFS - self.SILENCE_THRESHOLD_DB
+        window = self.SILENCE_WINDOW_MS
+
+        kept_ranges = []
+        keep_start = 0
+        silence_start = None
+        for position in range(0, len(segment) + window, window):
+            is_silent = position < len(segment) and segment[position:position + window].dBFS < threshold
+            if is_silent:
+                if silence_start is None:
+                    silence_start = position
+                continue
+            if silence_start is not None:
+                silence_end = min(position, len(segment))
+                if silence_end - silence_start >= self.SILENCE_MIN_MS:
+                    kept_ranges.append((keep_start, silence_start + self.SILENCE_KEEP_MS))
+                    keep_start = silence_end - self.SILENCE_KEEP_MS
+                silence_start = None
+        if not kept_ranges:
+            return segment
+        kept_ranges.append((keep_start, len(segment)))
+
+        compressed = segment._spawn(b"".join(segment[start:end].raw_data for start, end in kept_ranges))
+        self.metrics["silence_removed_ms"] += len(segment) - len(compressed)
+        return compressed
+    
+    def _encode_fast_segment(self, segment: AudioSegment, spill_dir: pathlib.Path) -> io.IOBase:
+        """音声セグメントを倍速WAVとしてバッファに書き出し（上限を超える場合のみ一時ファイル）"""
+        if self.silence_compression:
+            segment = self._compress_silence(segment)
+        max_bytes = int(self.config.chunk_memory_buffer_max_mb * 1024 * 1024)
+        expected_bytes = len(segment.raw_data) + self.WAV_HEADER_BYTES
+        if expected_bytes <= max_bytes:
+            buffer = io.BytesIO()
+            self.metrics["chunks_buffered_in_memory"] += 1
+        else:
+            spill_dir.mkdir(parents=True, exist_ok=True)
+            buffer = tempfile.TemporaryFile(dir=spill_dir)
+        self._export_fast_segment(segment, buffer)
+        if not isinstance(buffer, io.BytesIO):
+            self.metrics["temp_disk_bytes_written"] += buffer.seek(0, io.SEEK_END)
+        buffer.seek(0)
+        return buffer
+    
+    def _save_chunk_buffer(self, buffer: io.IOBase, chunk_audio_file_path: pathlib.Path):
+        """再開時に同じ音声を使えるようにバッファをチャンクファイルとして保存"""
+        buffer.seek(0)
+        temp_path = chunk_audio_file_path.with_name(chunk_audio_file_path.name + ".tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                written = 0
+                for block in iter(lambda: buffer.read(1024 * 1024), b""):
+                    written += f.write(block)
+            os.replace(temp_path, chunk_audio_file_path)
+            self.metrics["temp_disk_bytes_written"] += written
+            print(f"Saved audio chunk for resume: {chunk_audio_file_path}")
+        except IOError as e:
+            print(f"Warning: Could not save audio chunk {chunk_audio_file_path} for resume: {e}")
+    
+    def _transcribe_fast_segment(self, segment: AudioSegment, chunk_audio_file_path: pathlib.Path,
+                                 transcription_output_path: pathlib.Path) -> str:
+        """倍速に変換したセグメントを文字起こし
 
-        return transcription_text
+        チャンクはメモリ上のバッファからアップロードし、途中出力を残して失敗した場合
+        （次回の再開で同じ音声が必要な場合）のみ chunk_audio_file_path に保存する。
+        """
+        if chunk_audio_file_path.exists():
+            print(f"{self.speed_multiplier}x speed audio chunk {chunk_audio_file_path} already exists.")
+            return self.transcribe_chunk(chunk_audio_file_path, transcription_output_path)
+
+        print(f"Encoding {self.speed_multiplier}x speed audio chunk {chunk_audio_file_path.name} ({len(segment)}ms)")
+        buffer = self._encode_fast_segment(segment, chunk_audio_file_path.parent)
+        try:
+            return self.transcribe_chunk(buffer, transcription_output_path, chunk_audio_file_path.name)
+        except TranscriptionIncompleteError:
+            raise
+        except Exception:
+            if self._partial_path(transcription_output_path).exists():
+                self._save_chunk_buffer(buffer, chunk_audio_file_path)
+            raise
+        finally:
+            buffer.close()
+    
+    def _transcribe_segment(self, segment: AudioSegment, chunk_dir: pathlib.Path, label: str, depth: int = 0) -> str:
+        """音声セグメントを文字起こし（途切れ・空の場合はそのセグメントだけ再分割）"""
+        chunk_audio_file_path = chunk_dir / f"chunk_{label}_fast.wav"
+        chunk_transcription_file_path = chunk_dir / f"chunk_{label}_transcription.txt"
+
+        if chunk_transcription_file_path.exists():
+            print(f"Found existing transcription for chunk {label}: {chunk_transcription_file_path}")
+            try:
+                with open(chunk_transcription_file_path, "r", encoding="utf-8") as f:
+                    transcription = f.read()
+                self.metrics["transcription_cache_hits"] += 1
+                return transcription
+            except IOError as e:
+                print(f"Error reading existing transcription {chunk_transcription_file_path}: {e}. Retranscribing.")
+
+        try:
+            print(f"Transcribing {self.speed_multiplier}x speed chunk {label}")
+            return self._transcribe_fast_segment(segment, chunk_audio_file_path, chunk_transcription_file_path)
+        except TranscriptionIncompleteError as e:
+            print(f"Warning: {e}")
+            if depth >= self.MAX_SPLIT_DEPTH or len(segment) < self.MIN_SPLIT_CHUNK_MS:
+                # これ以上分割できない場合は得られた部分結果を採用
+                print(f"Warning: Chunk {label} cannot be split further; keeping {e.reason} result.")
+                if e.partial_text:
+                    self._save_chunk_transcription(e.partial_text, chunk_transcription_file_path)
+                return e.partial_text
+
+        transcription = self._resplit_segment(segment, chunk_dir, label, depth)
+        self._save_chunk_transcription(transcription, chunk_transcription_file_path)
+        return transcription
+    
+    def _resplit_segment(self, segment: AudioSegment, chunk_dir: pathlib.Path, label: str, depth: int) -> str:
+        """失敗したセグメントを2分割して再文字起こし"""
+        self.metrics["chunk_splits"] += 1
+        duration_ms = len(segment)
+        middle_ms = duration_ms // 2
+        sub_ranges = [
+            (0, min(duration_ms, middle_ms + self.SPLIT_OVERLAP_MS // 2)),
+            (max(0, middle_ms - self.SPLIT_OVERLAP_MS // 2), duration_ms),
+        ]
+        print(f"Re-splitting chunk {label} ({duration_ms}ms) into {len(sub_ranges)} sub-chunks...")
+
+        sub_transcriptions = []
+        for index, (start_ms, end_ms) in enumerate(sub_ranges, start=1):
+            self.metrics["chunk_retries"] += 1
+            sub_transcriptions.append(
+                self._transcribe_segment(segment[start_ms:end_ms], chunk_dir, f"{label}-{index}", depth + 1)
+            )
+        return "\n\n".join(filter(None, sub_transcriptions))
     
     def transcribe_audio(self, audio_file_path: str, temp_chunk_dir_path: Optional[pathlib.Path]) -> str:
         """音声ファイルの文字起こし（チャンク分割対応）"""
+        plan = self._batch_transcription_plans.pop(str(audio_file_path), None)
+        if plan is not None:
+            transcription = self.read_cached_transcription(audio_file_path, plan)
+            if transcription is not None:
+                duration_ms, _ = plan
+                if self.record is not None:
+                    self.record.audio_duration_s = round(duration_ms / 1000, 3)
+                self.metrics["transcription_cache_hits"] += len(plan[1])
+                return transcription
+
         print(f"Loading audio file: {audio_file_path}...")
         try:
-            audio = AudioSegment.from_file(audio_file_path)
+            with self._stage("decode"):
+                audio = AudioSegment.from_file(audio_file_path)
         except Exception as e:
             raise ValueError(f"Could not read audio file {audio_file_path}. Ensure ffmpeg is installed if using non-wav/mp3. Error: {e}")
 
         duration_ms = len(audio)
         print(f"Audio duration: {duration_ms / 1000 / 60:.2f} minutes")
+        if self.record is not None:
+            self.record.audio_duration_s = round(duration_ms / 1000, 3)
 
-        # 高速音声用の一時ディレクトリを作成
+        # 短い音声用の作業ディレクトリ（再開用チャンクと再分割時のチャンクを置く）
         if temp_chunk_dir_path is not None:
-            fast_audio_temp_dir = temp_chunk_dir_path / "fast_audio"
+            short_audio_dir = temp_chunk_dir_path
         else:
-            fast_audio_temp_dir = pathlib.Path(audio_file_path).parent / "fast_audio_temp"
+            short_audio_dir = pathlib.Path(audio_file_path).parent / "fast_audio_temp"
 
         # 短い音声用キャッシュファイルパス
         short_transcription_cache = None
@@ -143,127 +548,266 @@ class AudioProcessor:
                 pathlib.Path(audio_file_path).stem + "_transcription.txt"
             )
 
-        fast_audio_path = None
-        try:
-            if duration_ms <= self.CHUNK_MAX_DURATION_MS:
-                # キャッシュがあれば再利用
-                if short_transcription_cache.exists():
-                    print(f"Found cached transcription: {short_transcription_cache}")
-                    with open(short_transcription_cache, "r", encoding="utf-8") as f:
-                        return f.read()
-                
-                print(f"Audio is short enough, creating {self.config.audio_speed_multiplier}x speed version and transcribing directly.")
-                
-                # 高速音声を作成
-                fast_audio_path = self.create_fast_audio(audio_file_path, fast_audio_temp_dir)
-                
-                print(f"Uploading {self.config.audio_speed_multiplier}x speed file: {fast_audio_path}...")
-                audio_file_full = genai.upload_file(path=fast_audio_path)
-                print(f"Completed upload: {audio_file_full.name}")
-
-                print(f"Transcribing {self.config.audio_speed_multiplier}x speed audio...")
-                response = self.model.generate_content(
-                    ["この音声ファイルを文字起こししてください。", audio_file_full]
-                )
-                print(f"Deleting uploaded file from API: {audio_file_full.name}")
-                genai.delete_file(audio_file_full.name)
-                
-                if response.candidates and response.candidates[0].content.parts:
-                    transcription = response.candidates[0].content.parts[0].text
-                    # キャッシュとして保存
-                    try:
-                        with open(short_transcription_cache, "w", encoding="utf-8") as f:
-                            f.write(transcription)
-                        print(f"Transcription cached to: {short_transcription_cache}")
-                    except Exception as e:
-                        print(f"Warning: Failed to cache transcription: {e}")
-                    return transcription
-                else:
-                    raise ValueError("Direct transcription failed or returned an empty response.")
-        finally:
-            # 高速音声の一時ファイルをクリーンアップ
-            if fast_audio_path and fast_audio_path.exists():
-                try:
-                    fast_audio_path.unlink()
-                    print(f"Deleted {self.config.audio_speed_multiplier}x speed temporary file: {fast_audio_path}")
-                except Exception as e:
-                    print(f"Warning: Failed to delete {self.config.audio_speed_multiplier}x speed temporary file {fast_audio_path}: {e}")
+        if duration_ms <= self.CHUNK_MAX_DURATION_MS:
+            # キャッシュがあれば再利用
+            if short_transcription_cache.exists():
+                print(f"Found cached transcription: {short_transcription_cache}")
+                self.metrics["transcription_cache_hits"] += 1
+                with open(short_transcription_cache, "r", encoding="utf-8") as f:
+                    return f.read()
             
-            # 高速音声用一時ディレクトリをクリーンアップ（空の場合のみ）
-            if fast_audio_temp_dir.exists():
+            with self._calibrated_speed(audio, audio_file_path, short_audio_dir):
+                print(f"Audio is short enough, creating {self.speed_multiplier}x speed version and transcribing directly.")
+                
+                # 読み込み済みの音声から高速音声を作成して文字起こし（ファイルの再デコードはしない）
+                fast_audio_path = short_audio_dir / f"{pathlib.Path(audio_file_path).stem}_fast.wav"
                 try:
-                    fast_audio_temp_dir.rmdir()
-                    print(f"Deleted {self.config.audio_speed_multiplier}x speed temporary directory: {fast_audio_temp_dir}")
-                except OSError:
-                    pass
+                    transcription = self._transcribe_fast_segment(audio, fast_audio_path, short_transcription_cache)
+                except TranscriptionIncompleteError as e:
+                    # 途切れ・空の場合はこの音声だけを分割して再文字起こし
+                    print(f"Warning: {e} Re-splitting audio.")
+                    short_audio_dir.mkdir(parents=True, exist_ok=True)
+                    transcription = self._resplit_segment(audio, short_audio_dir, "full", 0)
+                    if not transcription.strip():
+                        raise ValueError("Direct transcription failed or returned an empty response.")
+                    self._save_chunk_transcription(transcription, short_transcription_cache)
+            fast_audio_path.unlink(missing_ok=True)
+            return transcription
 
         # 長い音声ファイルの処理
-        return self._transcribe_long_audio(audio, audio_file_path, temp_chunk_dir_path)
+        with self._calibrated_speed(audio, audio_file_path, temp_chunk_dir_path):
+            return self._transcribe_long_audio(audio, audio_file_path, temp_chunk_dir_path)
     
-    def _transcribe_long_audio(self, audio: AudioSegment, audio_file_path: str, temp_chunk_dir_path: pathlib.Path) -> str:
-        """長い音声ファイルのチャンク分割処理"""
-        print(f"Audio is long, creating {self.config.audio_speed_multiplier}x speed version and splitting into chunks with overlap into {temp_chunk_dir_path}...")
-        temp_chunk_dir_path.mkdir(parents=True, exist_ok=True)
+    @contextlib.contextmanager
+    def _calibrated_speed(self, audio: AudioSegment, audio_file_path: str, work_dir: pathlib.Path):
+        """録音ごとに選択した倍速を、この録音の処理中だけ適用"""
+        base_speed = self.speed_multiplier
+        self.speed_multiplier = self._select_speed(audio, audio_file_path, work_dir)
+        try:
+            yield
+        finally:
+            self.speed_multiplier = base_speed
+    
+    def _select_speed(self, audio: AudioSegment, audio_file_path: str, work_dir: pathlib.Path) -> float:
+        """倍速の自動調整が有効なら録音ごとの倍速を選択（保存済みの結果があれば再利用）
 
-        chunk_audio_files = []
-        chunk_transcription_files = []
-        all_transcriptions = []
+        予算ガバナーが倍速を引き上げている間は新たな調整（追加のAPI呼び出し）を行わず、
+        保存済みの結果がある場合も引き上げ後の倍速を下回らないようにする。
+        """
+        base_speed = self.speed_multiplier
+        if self.speed_calibrator is None:
+            return base_speed
+        budget_boost = base_speed > self.config.audio_speed_multiplier
+        if self.record is not None and self.record.source_hash:
+            content_hash = self.record.source_hash
+        else:
+            content_hash = self._file_hash(audio_file_path)
 
-        start_ms = 0
-        chunk_id = 0
-        duration_ms = len(audio)
-        
-        while start_ms < duration_ms:
-            end_ms = min(start_ms + self.CHUNK_MAX_DURATION_MS, duration_ms)
-            chunk_id += 1
-
-            chunk_audio_file_path = temp_chunk_dir_path / f"chunk_{chunk_id}_fast.wav"
-            chunk_transcription_file_path = temp_chunk_dir_path / f"chunk_{chunk_id}_transcription.txt"
-            chunk_audio_files.append(chunk_audio_file_path)
-            chunk_transcription_files.append(chunk_transcription_file_path)
-
-            # Export audio chunk if it doesn't exist
-            if not chunk_audio_file_path.exists():
-                print(f"Exporting {self.config.audio_speed_multiplier}x speed audio chunk {chunk_id}: {start_ms}ms to {end_ms}ms to {chunk_audio_file_path}")
-                current_chunk_segment = audio[start_ms:end_ms]
-                # 指定倍速に変換
-                current_chunk_segment = current_chunk_segment._spawn(
-                    current_chunk_segment.raw_data, 
-                    overrides={"frame_rate": int(current_chunk_segment.frame_rate * self.config.audio_speed_multiplier)}
+        cached = self.speed_calibrator.lookup(content_hash, self.model_name)
+        if cached is not None:
+            speed, scores = cached
+            self.metrics["speed_calibration_cache_hits"] += 1
+        elif budget_boost or not self.speed_calibrator.should_calibrate(audio):
+            return base_speed
+        else:
+            with self._stage("calibrate"):
+                sample = self.speed_calibrator.build_sample(audio)
+                if sample is None:
+                    return base_speed
+                print(f"Calibrating speed multiplier with a {len(sample) / 1000:.0f}s sample...")
+                speed, scores = self.speed_calibrator.calibrate(
+                    sample, lambda segment, candidate: self._transcribe_calibration_sample(segment, candidate, work_dir)
                 )
-                current_chunk_segment.export(chunk_audio_file_path, format="wav")
-            else:
-                print(f"{self.config.audio_speed_multiplier}x speed audio chunk {chunk_audio_file_path} already exists.")
+            if speed is None:
+                return base_speed
+            self.speed_calibrator.store(content_hash, self.model_name, speed, scores)
+            self.metrics["speed_calibrations"] += 1
 
-            # Check for existing transcription or transcribe
-            if chunk_transcription_file_path.exists():
-                print(f"Found existing transcription for chunk {chunk_id}: {chunk_transcription_file_path}")
-                try:
-                    with open(chunk_transcription_file_path, "r", encoding="utf-8") as f:
-                        transcription_part = f.read()
-                except IOError as e:
-                    print(f"Error reading existing transcription {chunk_transcription_file_path}: {e}. Retranscribing.")
-                    transcription_part = self.transcribe_chunk(chunk_audio_file_path, chunk_transcription_file_path)
-            else:
-                print(f"Transcribing {self.config.audio_speed_multiplier}x speed chunk {chunk_id}: {chunk_audio_file_path}")
-                transcription_part = self.transcribe_chunk(chunk_audio_file_path, chunk_transcription_file_path)
-
-            all_transcriptions.append(transcription_part)
+        if budget_boost:
+            speed = max(speed, base_speed)
+        if self.record is not None:
+            self.record.speed_calibration = {"speed_multiplier": speed, "scores": scores, "cached": cached is not None}
+        print(f"Using calibrated speed multiplier {speed}x (scores: {scores})")
+        return speed
+    
+    def _transcribe_calibration_sample(self, sample: AudioSegment, speed: float, work_dir: pathlib.Path) -> str:
+        """調整用サンプルを指定倍速で文字起こし（結果は作業ディレクトリに残し、再開時に再利用）"""
+        calibration_dir = work_dir / "calibration"
+        calibration_dir.mkdir(parents=True, exist_ok=True)
+        output_path = calibration_dir / f"sample_{speed}x_transcription.txt"
+        if output_path.exists():
+            with open(output_path, "r", encoding="utf-8") as f:
+                return f.read()
 
+        base_speed = self.speed_multiplier
+        self.speed_multiplier = speed
+        try:
+            buffer = self._encode_fast_segment(sample, calibration_dir)
+        finally:
+            self.speed_multiplier = base_speed
+        try:
+            self.metrics["speed_calibration_calls"] += 1
+            return self.transcribe_chunk(buffer, output_path, output_path.name, kind="calibrate")
+        finally:
+            buffer.close()
+    
+    @staticmethod
+    def _file_hash(file_path: str) -> str:
+        """ファイル内容のSHA-256ハッシュを計算（倍速の調整結果のキー）"""
+        hasher = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+    
+    def _chunk_ranges(self, duration_ms: int) -> list:
+        """長い音声をオーバーラップ付きで分割するチャンクの範囲（開始ms, 終了ms）のリスト"""
+        ranges = []
+        start_ms = 0
+        while start_ms < duration_ms:
+            end_ms = min(start_ms + self.CHUNK_MAX_DURATION_MS, duration_ms)
+            ranges.append((start_ms, end_ms))
             if end_ms == duration_ms:
                 break
             start_ms = max(0, end_ms - self.OVERLAP_MS)
-            if start_ms >= duration_ms:
-                break
+        return ranges
+    
+    def _transcribe_long_audio(self, audio: AudioSegment, audio_file_path: str, temp_chunk_dir_path: pathlib.Path) -> str:
+        """長い音声ファイルのチャンク分割処理"""
+        print(f"Audio is long, creating {self.speed_multiplier}x speed version and splitting into chunks with overlap into {temp_chunk_dir_path}...")
+        temp_chunk_dir_path.mkdir(parents=True, exist_ok=True)
 
-        expected_cost_reduction = int((1 - (1 / self.config.audio_speed_multiplier)) * 100)
-        print(f"Processed {len(all_transcriptions)} {self.config.audio_speed_multiplier}x speed chunks. Expected ~{expected_cost_reduction}% API cost reduction.")
+        all_transcriptions = []
+        for chunk_id, (start_ms, end_ms) in enumerate(self._chunk_ranges(len(audio)), start=1):
+            print(f"Processing chunk {chunk_id}: {start_ms}ms to {end_ms}ms")
+            transcription_part = self._transcribe_segment(
+                audio[start_ms:end_ms], temp_chunk_dir_path, str(chunk_id)
+            )
+            all_transcriptions.append(transcription_part)
+
+        print(f"Processed {len(all_transcriptions)} {self.speed_multiplier}x speed chunks.")
         full_transcription = "\n\n".join(filter(None, all_transcriptions))
         return full_transcription
     
-    def build_enhanced_prompt(self, base_template: str, transcription_text: str, recording_datetime: Optional[datetime.datetime] = None) -> str:
-        """コンテキスト情報を含む拡張プロンプトを構築"""
-        context_files = self.config.get_context_files()
+    def build_batch_transcription_requests(self, audio_file_path: str, temp_chunk_dir_path: pathlib.Path,
+                                           upload_executor: concurrent.futures.Executor) -> list:
+        """文字起こしが未完了のチャンクを upload_executor で並列にアップロードし、バッチ用リクエストの Future を返す
+
+        出力パスは通常処理のキャッシュと同じ（短い音声は full_transcription.txt、
+        長い音声は chunk_<番号>_transcription.txt）ため、結果の保存後は通常処理がそのまま再利用する。
+        メモリ上のチャンクは UPLOAD_PARALLELISM 個まで（アップロード完了を待ってから次を作成）。
+        """
+        try:
+            audio = AudioSegment.from_file(audio_file_path)
+        except Exception as e:
+            raise ValueError(f"Could not read audio file {audio_file_path}. Ensure ffmpeg is installed if using non-wav/mp3. Error: {e}")
+
+        audio_name = pathlib.Path(audio_file_path).name
+        duration_ms = len(audio)
+        if duration_ms <= self.CHUNK_MAX_DURATION_MS:
+            targets = [("full", 0, duration_ms, temp_chunk_dir_path / "full_transcription.txt")]
+        else:
+            targets = [
+                (str(chunk_id), start_ms, end_ms, temp_chunk_dir_path / f"chunk_{chunk_id}_transcription.txt")
+                for chunk_id, (start_ms, end_ms) in enumerate(self._chunk_ranges(duration_ms), start=1)
+            ]
+
+        temp_chunk_dir_path.mkdir(parents=True, exist_ok=True)
+        self._batch_transcription_plans[str(audio_file_path)] = (duration_ms, [target[3] for target in targets])
+        targets = [target for target in targets if not target[3].exists()]
+        if not targets:
+            return []
+        futures = []
+        with self._calibrated_speed(audio, audio_file_path, temp_chunk_dir_path):
+            for label, start_ms, end_ms, output_path in targets:
+                self._upload_slots.acquire()
+                try:
+                    buffer = self._encode_fast_segment(audio[start_ms:end_ms], temp_chunk_dir_path)
+                except Exception:
+                    self._upload_slots.release()
+                    raise
+                # モデルはこの録音の設定（アップロード中に次の録音の設定に切り替わるため、ここで確定する）
+                futures.append(upload_executor.submit(
+                    self._upload_batch_chunk, buffer, f"{audio_name}|{label}|{start_ms}|{end_ms}", output_path,
+                    self.model_name
+                ))
+        return futures
+    
+    def read_cached_transcription(self, audio_file_path: str, plan: Optional[tuple] = None) -> Optional[str]:
+        """バッチモードで準備した録音の文字起こしを、録音をデコードせずにキャッシュから組み立てる（未完了のチャンクがあれば None）"""
+        plan = plan or self._batch_transcription_plans.get(str(audio_file_path))
+        if plan is None:
+            return None
+        transcriptions = []
+        for output_path in plan[1]:
+            try:
+                with open(output_path, "r", encoding="utf-8") as f:
+                    transcriptions.append(f.read())
+            except IOError:
+                return None
+        return "\n\n".join(filter(None, transcriptions))
+    
+    def _upload_batch_chunk(self, buffer: io.IOBase, key: str, output_path: pathlib.Path, model_name: str) -> tuple:
+        """チャンクをアップロードしてバッチ用リクエストを作成（ワーカースレッドで実行）"""
+        try:
+            chunk_size = buffer.seek(0, io.SEEK_END)
+            buffer.seek(0)
+            uploaded = self.client.upload_file(buffer, mime_type="audio/wav")
+        finally:
+            buffer.close()
+            self._upload_slots.release()
+        request = BatchRequest(key, model_name, [self.TRANSCRIPTION_PROMPT, uploaded])
+        return request, output_path, uploaded.name, chunk_size
+    
+    def collect_batch_uploads(self, futures: list) -> list:
+        """アップロードの完了を待ち、(リクエスト, 出力パス, アップロード名) のリストを返す（失敗分は通常処理に回す）"""
+        entries = []
+        for future in futures:
+            try:
+                request, output_path, upload_name, chunk_size = future.result()
+            except Exception as e:
+                self.metrics["batch_upload_failures"] += 1
+                print(f"Warning: Batch upload failed; the chunk will be transcribed interactively: {e}")
+                continue
+            self.metrics["api_upload_calls"] += 1
+            self.metrics["bytes_uploaded"] += chunk_size
+            entries.append((request, output_path, upload_name))
+        return entries
+    
+    def _record_batch_usage(self, result: BatchResult, label: str, cost_ratio: float, model_name: Optional[str]):
+        """バッチ結果のトークン使用量を記録"""
+        self.metrics["batch_results"] += 1
+        if result.usage:
+            self._record_usage(types.SimpleNamespace(**result.usage), label, cost_ratio, model_name)
+    
+    def apply_batch_transcription(self, result: Optional[BatchResult], output_path: pathlib.Path,
+                                  cost_ratio: float = 1.0, model_name: Optional[str] = None) -> bool:
+        """バッチの文字起こし結果をチャンクのキャッシュとして保存（途切れ・空・失敗の場合は保存しない）
+
+        model_name はリクエストを作成したときのモデル（使用量の記録に使う、省略時は現在のモデル）。
+        """
+        if result is None:
+            self.metrics["batch_missing_results"] += 1
+            print(f"Warning: No batch result for {output_path.name}; it will be transcribed interactively.")
+            return False
+        self._record_batch_usage(result, f"batch_transcribe:{output_path.name}", cost_ratio, model_name)
+        if not result.ok:
+            self.metrics["batch_failed_results"] += 1
+            reason = result.error or f"finish_reason={result.finish_reason}"
+            print(f"Warning: Batch transcription for {output_path.name} was not usable ({reason}); it will be transcribed interactively.")
+            return False
+        partial_path = self._partial_path(output_path)
+        with open(partial_path, "w", encoding="utf-8") as f:
+            f.write(result.text)
+        os.replace(partial_path, output_path)
+        self.metrics["chunks_transcribed"] += 1
+        return True
+    
+    def build_enhanced_prompt(self, base_template: str, transcription_text: str, recording_datetime: Optional[datetime.datetime] = None,
+                              context_files: Optional[dict] = None) -> str:
+        """コンテキスト情報を含む拡張プロンプトを構築（context_files を省略した場合はファイルから読み込む）"""
+        if context_files is None:
+            context_files = self.config.get_context_files()
         
         # 日時情報を設定
         event_date = ""
@@ -286,23 +830,106 @@ class AudioProcessor:
         
         return enhanced_prompt
     
-    def summarize_text(self, text: str, prompt_template: str, recording_datetime: Optional[datetime.datetime] = None) -> str:
-        """文字起こしテキストの要約"""
-        print("Building enhanced prompt with context information...")
+    def compute_summary_hash(self, transcription_text: str, prompt_template: str,
+                             context_files: Optional[dict] = None) -> str:
+        """要約の入力（文字起こし・プロンプト・コンテキスト）のハッシュを計算（context_files を省略した場合はファイルから読み込む）"""
+        hasher = hashlib.sha256()
+        if context_files is None:
+            context_files = self.config.get_context_files()
+        for part in [transcription_text, prompt_template] + [context_files[key] for key in sorted(context_files)]:
+            encoded = part.encode("utf-8")
+            hasher.update(len(encoded).to_bytes(8, "big"))
+            hasher.update(encoded)
+        return hasher.hexdigest()
+    
+    def _cache_key(self, kind: str, *parts: str, model_name: Optional[str] = None) -> str:
+        """キャッシュキーを生成（種別・モデル名・入力の組み合わせのハッシュ）"""
+        hasher = hashlib.sha256()
+        for part in (kind, model_name or self.model_name) + parts:
+            encoded = part.encode("utf-8")
+            hasher.update(len(encoded).to_bytes(8, "big"))
+            hasher.update(encoded)
+        return hasher.hexdigest()
+    
+    def _cache_get(self, cache_key: str, kind: str) -> Optional[str]:
+        """キャッシュから結果を取得"""
+        if self.summary_cache is None:
+            return None
+        value = self.summary_cache.get(cache_key)
+        if value is None:
+            self.metrics[f"{kind}_cache_misses"] += 1
+            return None
+        self.metrics[f"{kind}_cache_hits"] += 1
+        print(f"Using cached {kind} result.")
+        return value
+    
+    def _cache_put(self, cache_key: str, kind: str, value: str):
+        """キャッシュに結果を保存"""
+        if self.summary_cache is None:
+            return
+        try:
+            self.summary_cache.put(cache_key, kind, value)
+        except Exception as e:
+            print(f"Warning: Failed to store {kind} result in cache: {e}")
+    
+    def _summary_cache_key(self, text: str, prompt_template: str,
+                           recording_datetime: Optional[datetime.datetime], context_files: dict) -> str:
+        """要約のキャッシュキー"""
+        return self._cache_key(
+            "summary",
+            self.compute_summary_hash(text, prompt_template, context_files),
+            recording_datetime.isoformat() if recording_datetime else "",
+        )
+    
+    def summarize_text(self, text: str, prompt_template: str, recording_datetime: Optional[datetime.datetime] = None,
+                       draft_path: Optional[pathlib.Path] = None, context_files: Optional[dict] = None) -> str:
+        """文字起こしテキストの要約
+
+        draft_path を指定した場合、生成中の要約をMarkdown下書きとして逐次書き込む。
+        context_files を省略した場合はコンテキストファイルを1回だけ読み込み、プロンプトとキャッシュキーの両方に使う。
+        """
+        if context_files is None:
+            context_files = self.config.get_context_files()
         
-        enhanced_prompt = self.build_enhanced_prompt(prompt_template, text, recording_datetime)
+        # 入力（文字起こし・プロンプト・コンテキスト・モデル・録音日時）が同じならキャッシュを利用
+        cache_key = self._summary_cache_key(text, prompt_template, recording_datetime, context_files)
+        cached_summary = self._cache_get(cache_key, "summary")
+        if cached_summary is not None:
+            return cached_summary
+        
+        print("Building enhanced prompt with context information...")
+        enhanced_prompt = self.build_enhanced_prompt(prompt_template, text, recording_datetime, context_files)
         
         print("Summarizing text...")
-        response = self.model.generate_content(enhanced_prompt)
-        if response.candidates and response.candidates[0].content.parts:
-            return response.candidates[0].content.parts[0].text
-        else:
+        partial_path = self._summary_partial_path(draft_path, cache_key) if draft_path is not None else None
+        summary, finish_reason = self._stream_generate(enhanced_prompt, partial_path, "summarize")
+        if not summary.strip():
             raise ValueError("Summarization failed or returned an empty response.")
+        if finish_reason == "MAX_TOKENS":
+            print("Warning: Summary was truncated at the output token limit.")
+        if partial_path is not None:
+            os.replace(partial_path, draft_path)
+            print(f"Summary draft saved to: {draft_path}")
+        if finish_reason != "MAX_TOKENS":
+            self._cache_put(cache_key, "summary", summary)
+        return summary
     
-    def generate_filename_from_summary(self, summary_text: str) -> Optional[str]:
-        """要約からファイル名を生成"""
-        print("Generating filename from summary...")
-        prompt = (
+    @staticmethod
+    def _summary_partial_path(draft_path: pathlib.Path, cache_key: str) -> pathlib.Path:
+        """要約の途中出力のパス（入力のハッシュを含め、入力が変わった場合の古い途中出力は削除）"""
+        partial_path = draft_path.with_name(f"{draft_path.name}.{cache_key[:16]}.partial")
+        stale_paths = [draft_path.with_name(draft_path.name + ".partial")]
+        if draft_path.parent.exists():
+            stale_paths.extend(draft_path.parent.glob(f"{glob.escape(draft_path.name)}.*.partial"))
+        for stale_path in stale_paths:
+            if stale_path != partial_path and stale_path.exists():
+                print(f"Discarding summary draft for different input: {stale_path}")
+                stale_path.unlink(missing_ok=True)
+        return partial_path
+    
+    def _title_prompt(self, summary_text: str) -> str:
+        """要約からファイル名を生成するプロンプト"""
+        return (
             f"以下の要約内容の最も重要なトピックを反映した、具体的で短い日本語のファイル名を**一つだけ作成**してください。"
             f"ファイル名は、{self.MAX_FILENAME_LENGTH}文字以内の**一つの連続した文字列**とし、日本語、英数字、アンダースコア、ハイフンのみを使用してください。"
             f"拡張子は含めないでください。\n\n"
@@ -310,11 +937,22 @@ class AudioProcessor:
             f"要約内容:\n{summary_text[:1000]}"
             f"\n\n作成ファイル名:"
         )
+    
+    def generate_filename_from_summary(self, summary_text: str) -> Optional[str]:
+        """要約からファイル名を生成"""
+        print("Generating filename from summary...")
+        prompt = self._title_prompt(summary_text)
+        cache_key = self._cache_key("title", prompt)
+        cached_name = self._cache_get(cache_key, "title")
+        if cached_name is not None:
+            return cached_name
+        
         try:
-            response = self.model.generate_content(prompt)
-            if response.candidates and response.candidates[0].content.parts:
-                suggested_name = response.candidates[0].content.parts[0].text.strip()
+            suggested_name, _ = self._stream_generate(prompt, None, "title")
+            suggested_name = suggested_name.strip()
+            if suggested_name:
                 print(f"API suggested filename: {suggested_name}")
+                self._cache_put(cache_key, "title", suggested_name)
                 return suggested_name
             else:
                 print("Warning: Filename generation returned no suggestion.")
@@ -323,6 +961,48 @@ class AudioProcessor:
             print(f"Error during filename generation: {e}")
             return None
     
+    def build_batch_summary_request(self, key: str, text: str, prompt_template: str,
+                                    recording_datetime: Optional[datetime.datetime] = None) -> Optional[Tuple[BatchRequest, str]]:
+        """要約とファイル名を1回で生成するバッチ用リクエストとキャッシュキーを作成（キャッシュ済みの場合は None）"""
+        context_files = self.config.get_context_files()
+        cache_key = self._summary_cache_key(text, prompt_template, recording_datetime, context_files)
+        if self.summary_cache is not None and self.summary_cache.get(cache_key) is not None:
+            return None
+        prompt = (
+            self.build_enhanced_prompt(prompt_template, text, recording_datetime, context_files)
+            + self.BATCH_TITLE_NOTE.format(max_length=self.MAX_FILENAME_LENGTH)
+        )
+        return BatchRequest(key, self.model_name, prompt), cache_key
+    
+    def split_batch_title(self, text: str) -> Tuple[str, Optional[str]]:
+        """要約とファイル名をまとめた出力を要約本文とファイル名に分ける"""
+        lines = text.rstrip().split("\n")
+        match = self.BATCH_TITLE_LINE_PATTERN.match(lines[-1]) if lines else None
+        if match is None:
+            return text, None
+        return "\n".join(lines[:-1]).rstrip() + "\n", match.group(1).strip()
+    
+    def apply_batch_summary(self, result: Optional[BatchResult], cache_key: str, cost_ratio: float = 1.0,
+                            model_name: Optional[str] = None) -> bool:
+        """バッチの要約・ファイル名をキャッシュに保存（通常処理の要約・タイトル生成がキャッシュから取得する）
+
+        model_name はリクエストを作成したときのモデル（ファイル名のキャッシュキーと使用量の記録に使う）。
+        """
+        if result is None:
+            self.metrics["batch_missing_results"] += 1
+            return False
+        self._record_batch_usage(result, "batch_summarize", cost_ratio, model_name)
+        if not result.ok:
+            self.metrics["batch_failed_results"] += 1
+            reason = result.error or f"finish_reason={result.finish_reason}"
+            print(f"Warning: Batch summary for {result.key} was not usable ({reason}); it will be summarized interactively.")
+            return False
+        summary, title = self.split_batch_title(result.text)
+        self._cache_put(cache_key, "summary", summary)
+        if title:
+            self._cache_put(self._cache_key("title", self._title_prompt(summary), model_name=model_name), "title", title)
+        return True
+    
     def sanitize_filename(self, filename_suggestion: str) -> str:
         """ファイル名のサニタイズ"""
         if not filename_suggestion:
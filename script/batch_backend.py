@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+バッチ実行バックエンド - 生成リクエストをまとめて1つのジョブとして投入・結果取得
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Optional
+
+from config_manager import ConfigManager
+from rate_limiter import RateLimiter
+
+# ジョブの状態
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class BatchJobNotFoundError(KeyError):
+    """ジョブが見つからない（期限切れ・別プロセスのローカルジョブなど）場合の例外"""
+
+
+class BatchRequest:
+    """バッチに含める1件の生成リクエスト"""
+
+    def __init__(self, key: str, model_name: str, contents):
+        """初期化（contents は文字列、またはテキストとアップロード済みファイルのリスト）"""
+        self.key = key
+        self.model_name = model_name
+        self.contents = contents
+
+
+class BatchResult:
+    """1件のリクエストの結果"""
+
+    def __init__(self, key: str, text: str = "", finish_reason: Optional[str] = None,
+                 usage: Optional[dict] = None, error: Optional[str] = None):
+        """初期化"""
+        self.key = key
+        self.text = text
+        self.finish_reason = finish_reason
+        self.usage = usage or {}
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """テキストが最後まで生成されたか"""
+        return self.error is None and bool(self.text.strip()) and self.finish_reason != "MAX_TOKENS"
+
+
+class BatchBackend:
+    """バッチジョブの投入・状態確認・結果取得のインターフェース"""
+
+    name = "base"
+    # 通常のAPI呼び出しに対する料金の倍率（使用量台帳の推定料金に反映）
+    cost_ratio = 1.0
+
+    def submit(self, requests: list, display_name: str) -> str:
+        """リクエストをまとめて投入し、ジョブIDを返す"""
+        raise NotImplementedError
+
+    def poll(self, job_id: str) -> str:
+        """ジョブの状態（JOB_PENDING / JOB_RUNNING / JOB_SUCCEEDED / JOB_FAILED）を返す"""
+        raise NotImplementedError
+
+    def fetch_results(self, job_id: str) -> dict:
+        """完了したジョブの結果をリクエストのキーごとに返す"""
+        raise NotImplementedError
+
+
+def create_batch_backend(config: ConfigManager, client) -> BatchBackend:
+    """設定からバッチバックエンドを作成"""
+    if config.batch_backend == "gemini":
+        return GeminiBatchBackend(config.google_api_key, cost_ratio=config.batch_cost_ratio)
+    if config.batch_backend == "local":
+        return LocalBatchBackend(client, config.batch_local_requests_per_minute)
+    raise ValueError(f"Unknown BATCH_BACKEND: {config.batch_backend} (expected 'local' or 'gemini')")
+
+
+class LocalBatchBackend(BatchBackend):
+    """ジョブをバックグラウンドスレッドで1件ずつ通常のAPI呼び出しとして実行するローカルの代替実装
+
+    レート制限を低めに設定すると、通常処理のためのリクエスト枠を残したままバックログを消化できる。
+    ジョブはプロセス内にのみ存在するため、別の実行から再開することはできない。
+    """
+
+    name = "local"
+
+    def __init__(self, client, requests_per_minute: float = 0.0):
+        """初期化"""
+        self.client = client
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, requests: list, display_name: str) -> str:
+        """ジョブを作成してバックグラウンドで実行開始"""
+        job_id = f"local-{uuid.uuid4().hex[:12]}"
+        job = {"state": JOB_PENDING, "results": {}, "display_name": display_name}
+        with self._lock:
+            self._jobs[job_id] = job
+        thread = threading.Thread(target=self._run, args=(job, list(requests)), name=job_id, daemon=True)
+        thread.start()
+        return job_id
+
+    def _run(self, job: dict, requests: list):
+        """リクエストを順に実行"""
+        job["state"] = JOB_RUNNING
+        for request in requests:
+            self.rate_limiter.acquire()
+            try:
+                response = self.client.generate_content(request.model_name, request.contents, stream=False)
+                job["results"][request.key] = _result_from_sdk_response(request.key, response)
+            except Exception as e:
+                job["results"][request.key] = BatchResult(request.key, error=str(e))
+        job["state"] = JOB_SUCCEEDED
+
+    def _get_job(self, job_id: str) -> dict:
+        """ジョブを取得"""
+        with self._lock:
+            if job_id not in self._jobs:
+                raise BatchJobNotFoundError(f"Unknown local batch job: {job_id}")
+            return self._jobs[job_id]
+
+    def poll(self, job_id: str) -> str:
+        """ジョブの状態を返す"""
+        return self._get_job(job_id)["state"]
+
+    def fetch_results(self, job_id: str) -> dict:
+        """ジョブの結果を返す"""
+        return dict(self._get_job(job_id)["results"])
+
+
+def _result_from_sdk_response(key: str, response) -> BatchResult:
+    """SDK のレスポンスをバッチ結果に変換"""
+    if not response.candidates:
+        return BatchResult(key, error="No candidates in response")
+    candidate = response.candidates[0]
+    finish_reason = getattr(candidate, "finish_reason", None)
+    finish_reason = getattr(finish_reason, "name", finish_reason)
+    parts = candidate.content.parts if candidate.content else []
+    usage_metadata = getattr(response, "usage_metadata", None)
+    usage = {}
+    if usage_metadata:
+        usage = {
+            "prompt_token_count": getattr(usage_metadata, "prompt_token_count", 0) or 0,
+            "candidates_token_count": getattr(usage_metadata, "candidates_token_count", 0) or 0,
+            "total_token_count": getattr(usage_metadata, "total_token_count", 0) or 0,
+        }
+    return BatchResult(
+        key, "".join(getattr(part, "text", "") for part in parts),
+        str(finish_reason) if finish_reason is not None else None, usage
+    )
+
+
+class GeminiBatchBackend(BatchBackend):
+    """Gemini API のバッチモード（batchGenerateContent、インラインリクエスト）を使うバックエンド"""
+
+    name = "gemini"
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+    STATE_MAP = {
+        "BATCH_STATE_PENDING": JOB_PENDING,
+        "BATCH_STATE_RUNNING": JOB_RUNNING,
+        "BATCH_STATE_SUCCEEDED": JOB_SUCCEEDED,
+        "BATCH_STATE_FAILED": JOB_FAILED,
+        "BATCH_STATE_CANCELLED": JOB_FAILED,
+        "BATCH_STATE_EXPIRED": JOB_FAILED,
+    }
+
+    def __init__(self, api_key: str, cost_ratio: float = 0.5, timeout_s: float = 60.0):
+        """初期化"""
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY is required for the gemini batch backend.")
+        self.api_key = api_key
+        self.cost_ratio = cost_ratio
+        self.timeout_s = timeout_s
+
+    def _call(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        """REST API を呼び出し"""
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(
+            f"{self.BASE_URL}/{path}", data=data, method=method,
+            headers={"Content-Type": "application/json", "x-goog-api-key": self.api_key}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout_s) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode("utf-8", errors="replace")
+            if e.code == 404:
+                raise BatchJobNotFoundError(f"Batch job not found: {path}")
+            raise IOError(f"Batch API {method} {path} failed ({e.code}): {detail}")
+
+    @staticmethod
+    def _to_parts(contents) -> list:
+        """リクエストの内容を REST 形式の parts に変換"""
+        items = [contents] if isinstance(contents, str) else list(contents)
+        parts = []
+        for item in items:
+            if isinstance(item, str):
+                parts.append({"text": item})
+            else:
+                parts.append({"file_data": {"mime_type": item.mime_type, "file_uri": item.uri}})
+        return parts
+
+    def submit(self, requests: list, display_name: str) -> str:
+        """インラインリクエストのバッチジョブを作成"""
+        model_names = {request.model_name for request in requests}
+        if len(model_names) != 1:
+            raise ValueError("All requests in a batch job must use the same model.")
+        body = {"batch": {
+            "display_name": display_name,
+            "input_config": {"requests": {"requests": [
+                {
+                    "request": {"contents": [{"role": "user", "parts": self._to_parts(request.contents)}]},
+                    "metadata": {"key": request.key},
+                }
+                for request in requests
+            ]}},
+        }}
+        operation = self._call("POST", f"models/{model_names.pop()}:batchGenerateContent", body)
+        return operation["name"]
+
+    def _get(self, job_id: str) -> dict:
+        """ジョブの情報を取得"""
+        return self._call("GET", job_id)
+
+    def poll(self, job_id: str) -> str:
+        """ジョブの状態を返す"""
+        job = self._get(job_id)
+        state = job.get("metadata", {}).get("state") or job.get("state")
+        return self.STATE_MAP.get(state, JOB_RUNNING)
+
+    def fetch_results(self, job_id: str) -> dict:
+        """インラインの結果をキーごとに変換"""
+        job = self._get(job_id)
+        output = job.get("response") or job.get("metadata", {}).get("output") or {}
+        inlined = output.get("inlinedResponses", {})
+        if isinstance(inlined, dict):
+            inlined = inlined.get("inlinedResponses", [])
+
+        results = {}
+        for item in inlined:
+            key = item.get("metadata", {}).get("key")
+            if key is None:
+                continue
+            if "error" in item:
+                results[key] = BatchResult(key, error=json.dumps(item["error"], ensure_ascii=False))
+                continue
+            response = item.get("response", {})
+            candidates = response.get("candidates") or []
+            if not candidates:
+                results[key] = BatchResult(key, error="No candidates in response")
+                continue
+            parts = candidates[0].get("content", {}).get("parts", [])
+            usage = response.get("usageMetadata", {})
+            results[key] = BatchResult(
+                key, "".join(part.get("text", "") for part in parts), candidates[0].get("finishReason"),
+                {
+                    "prompt_token_count": usage.get("promptTokenCount", 0),
+                    "candidates_token_count": usage.get("candidatesTokenCount", 0),
+                    "total_token_count": usage.get("totalTokenCount", 0),
+                }
+            )
+        return results
+
+
+class BatchJobStore:
+    """投入済みジョブの情報（ジョブID・結果の保存先・アップロード済みファイル）を保存し、中断後に再開できるようにする
+
+    ジョブごとに投入したワーカー（ホスト名・PID・WORKER_ID）を記録したファイルを作成し、
+    回収するのは自分が投入したジョブと、投入したワーカーが終了しているジョブだけにする
+    （同じ STATE_DIR を共有する複数のワーカーが互いのジョブを回収・上書きしない）。
+    他のホストのジョブは、プロセスの生存を確認できないため stale_after_s 経過後に引き継ぐ（0以下なら引き継がない）。
+    """
+
+    def __init__(self, state_dir: str, worker_id: Optional[str] = None, stale_after_s: float = 172800.0):
+        """初期化"""
+        self.directory = pathlib.Path(state_dir) / "batch_jobs"
+        self.stale_after_s = stale_after_s
+        self.owner = {"host": socket.gethostname(), "pid": os.getpid(), "worker_id": worker_id}
+
+    @classmethod
+    def from_config(cls, config: ConfigManager) -> "BatchJobStore":
+        """設定から作成"""
+        return cls(config.state_dir, worker_id=config.worker_id, stale_after_s=config.batch_takeover_age_s)
+
+    def _path(self, phase: str, job_id: str) -> pathlib.Path:
+        """ジョブごとの保存先"""
+        digest = hashlib.sha256(job_id.encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"{phase}-{digest}.json"
+
+    def _read(self, path: pathlib.Path) -> Optional[dict]:
+        """ジョブ情報を読み込み（読めない場合は None）"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (IOError, ValueError) as e:
+            print(f"Warning: Could not read batch job state {path}: {e}")
+            return None
+
+    def _write(self, path: pathlib.Path, job: dict):
+        """ジョブ情報を書き込み（一時ファイル経由で置き換え）"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, path)
+
+    def save(self, phase: str, job: dict):
+        """ジョブ情報を投入したワーカーの情報とともに保存"""
+        job = dict(job, owner=self.owner, saved_at=time.time())
+        self._write(self._path(phase, job["job_id"]), job)
+
+    def _is_mine_or_abandoned(self, job: dict) -> bool:
+        """自分が投入したジョブ、または投入したワーカーが終了しているジョブか"""
+        owner = job.get("owner")
+        if not owner:
+            # ワーカー情報のない（以前の形式の）ジョブ
+            return True
+        if owner.get("host") == self.owner["host"] and owner.get("pid") == self.owner["pid"]:
+            return True
+        if self.owner["worker_id"] and owner.get("worker_id") == self.owner["worker_id"]:
+            # 同じ WORKER_ID のワーカーが再起動した場合
+            return True
+        if owner.get("host") == self.owner["host"]:
+            try:
+                os.kill(owner.get("pid"), 0)
+            except ProcessLookupError:
+                return True
+            except (PermissionError, TypeError):
+                return False
+            return False
+        if self.stale_after_s <= 0:
+            return False
+        return time.time() - job.get("saved_at", 0) > self.stale_after_s
+
+    def claim(self, phase: str) -> list:
+        """回収するジョブ（自分のジョブと、終了したワーカーから引き継いだジョブ）の一覧
+
+        引き継ぎはファイルの rename で行うため、同時に複数のワーカーが同じジョブを引き継ぐことはない。
+        """
+        if not self.directory.exists():
+            return []
+        jobs = []
+        for path in sorted(self.directory.glob(f"{phase}*.json")):
+            if path.stem != phase and not path.stem.startswith(f"{phase}-"):
+                continue
+            job = self._read(path)
+            if job is None or not self._is_mine_or_abandoned(job):
+                continue
+            if job.get("owner") != self.owner:
+                claimed_path = path.with_name(f"{path.name}.{os.getpid()}.claim")
+                try:
+                    os.rename(path, claimed_path)
+                except FileNotFoundError:
+                    # 他のワーカーが先に引き継いだ
+                    continue
+                print(f"Adopting {phase} batch job {job.get('job_id')} from a finished worker.")
+                self.save(phase, job)
+                claimed_path.unlink(missing_ok=True)
+                job = self._read(self._path(phase, job["job_id"]))
+                if job is None:
+                    continue
+            jobs.append(job)
+        return jobs
+
+    def referenced_uploads(self) -> set:
+        """投入済みのジョブ（他のワーカーの分も含む）が参照しているアップロード済みファイル名（結果の回収まで削除しない）"""
+        uploads = set()
+        if not self.directory.exists():
+            return uploads
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            job = self._read(path)
+            if job is not None:
+                uploads.update(job.get("uploads", []))
+        return uploads
+
+    def clear(self, phase: str, job: dict):
+        """ジョブ情報を削除"""
+        self._path(phase, job["job_id"]).unlink(missing_ok=True)
+
+
+def wait_for_job(backend: BatchBackend, job_id: str, poll_interval_s: float, timeout_s: float = 0.0) -> str:
+    """ジョブが完了するまで定期的に状態を確認（timeout_s が0なら無期限）"""
+    start_time = time.monotonic()
+    last_state = None
+    while True:
+        state = backend.poll(job_id)
+        if state != last_state:
+            print(f"Batch job {job_id}: {state}")
+            last_state = state
+        if state in (JOB_SUCCEEDED, JOB_FAILED):
+            return state
+        if timeout_s > 0 and time.monotonic() - start_time > timeout_s:
+            raise TimeoutError(f"Batch job {job_id} did not finish within {timeout_s:.0f}s")
+        time.sleep(poll_interval_s)
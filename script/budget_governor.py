@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+予算ガバナー - 月間予算の消化率に応じて処理設定（倍速・無音圧縮・モデル・後回し）を調整
+"""
+
+import datetime
+import re
+from typing import Callable, Optional
+
+from config_manager import ConfigManager
+from usage_ledger import UsageLedger
+
+
+class GovernorDecision:
+    """1ファイルの処理に適用する設定"""
+
+    def __init__(self, speed_multiplier: float, silence_compression: bool, model_name: str,
+                 defer_low_priority: bool, spend_ratio: float):
+        """初期化"""
+        self.speed_multiplier = speed_multiplier
+        self.silence_compression = silence_compression
+        self.model_name = model_name
+        self.defer_low_priority = defer_low_priority
+        self.spend_ratio = spend_ratio
+
+    def apply_to(self, audio_processor) -> bool:
+        """AudioProcessor に設定を適用（変更があった場合は True）"""
+        changed = (
+            self.speed_multiplier != audio_processor.speed_multiplier
+            or self.silence_compression != audio_processor.silence_compression
+            or self.model_name != audio_processor.model_name
+        )
+        audio_processor.speed_multiplier = self.speed_multiplier
+        audio_processor.silence_compression = self.silence_compression
+        audio_processor.model_name = self.model_name
+        return changed
+
+    def to_dict(self) -> dict:
+        """処理記録用の辞書に変換"""
+        return {
+            "spend_ratio": round(self.spend_ratio, 4),
+            "speed_multiplier": self.speed_multiplier,
+            "silence_compression": self.silence_compression,
+            "model": self.model_name,
+            "defer_low_priority": self.defer_low_priority,
+        }
+
+
+class BudgetGovernor:
+    """月初からの推定料金と月間予算の比率に応じて段階的にコストを下げるクラス
+
+    - 比率が soft_limit_ratio 未満: 通常の設定
+    - soft_limit_ratio 以上: 無音圧縮を有効にし、倍速を max_speed_multiplier に向けて比率に応じて引き上げ
+    - soft_limit_ratio と 1.0 の中間以上: fallback_model に切り替え
+    - 1.0 以上（予算超過）: 低優先度のファイルを後回し（処理せず次回以降に残す）
+    """
+
+    SPEED_STEP = 0.25
+
+    def __init__(self, ledger: UsageLedger, monthly_budget_usd: float, base_speed_multiplier: float,
+                 base_model_name: str, base_silence_compression: bool = False,
+                 soft_limit_ratio: float = 0.8, max_speed_multiplier: float = 3.0,
+                 fallback_model: Optional[str] = None, low_priority_pattern: Optional[str] = None,
+                 today: Callable[[], datetime.date] = datetime.date.today):
+        """初期化"""
+        if not 0 < soft_limit_ratio < 1:
+            raise ValueError("BUDGET_SOFT_LIMIT_RATIO must be between 0 and 1.")
+        self.ledger = ledger
+        self.monthly_budget_usd = monthly_budget_usd
+        self.base_speed_multiplier = base_speed_multiplier
+        self.base_model_name = base_model_name
+        self.base_silence_compression = base_silence_compression
+        self.soft_limit_ratio = soft_limit_ratio
+        self.max_speed_multiplier = max(max_speed_multiplier, base_speed_multiplier)
+        self.fallback_model = fallback_model or None
+        self.low_priority_pattern = re.compile(low_priority_pattern) if low_priority_pattern else None
+        self.today = today
+
+    @classmethod
+    def from_config(cls, config: ConfigManager, ledger: Optional[UsageLedger],
+                    base_model_name: str) -> Optional["BudgetGovernor"]:
+        """設定からガバナーを作成（予算未設定・台帳なしの場合は None）"""
+        if ledger is None or config.monthly_budget_usd <= 0:
+            return None
+        return cls(
+            ledger, config.monthly_budget_usd, config.audio_speed_multiplier, base_model_name,
+            base_silence_compression=config.silence_compression_enabled,
+            soft_limit_ratio=config.budget_soft_limit_ratio,
+            max_speed_multiplier=config.budget_max_speed_multiplier,
+            fallback_model=config.budget_fallback_model,
+            low_priority_pattern=config.low_priority_filename_pattern,
+        )
+
+    def spend_ratio(self) -> float:
+        """月間予算に対する当月の推定料金の比率"""
+        return self.ledger.month_to_date_cost(self.today()) / self.monthly_budget_usd
+
+    def decide(self) -> GovernorDecision:
+        """現在の消化率から適用する設定を決定"""
+        ratio = self.spend_ratio()
+        speed = self.base_speed_multiplier
+        silence_compression = self.base_silence_compression
+        model_name = self.base_model_name
+
+        if ratio >= self.soft_limit_ratio:
+            silence_compression = True
+            progress = min(1.0, (ratio - self.soft_limit_ratio) / (1.0 - self.soft_limit_ratio))
+            target = self.base_speed_multiplier + (self.max_speed_multiplier - self.base_speed_multiplier) * progress
+            # 倍速は段階的に引き上げ（上限は max_speed_multiplier）
+            speed = min(self.max_speed_multiplier, max(speed, round(target / self.SPEED_STEP) * self.SPEED_STEP))
+        if self.fallback_model and ratio >= (self.soft_limit_ratio + 1.0) / 2:
+            model_name = self.fallback_model
+
+        return GovernorDecision(speed, silence_compression, model_name, ratio >= 1.0, ratio)
+
+    def is_low_priority(self, filename: str) -> bool:
+        """後回しにできる低優先度のファイルか"""
+        return self.low_priority_pattern is not None and self.low_priority_pattern.search(filename) is not None
+
+    def apply(self, audio_processor, filename: str) -> Optional[GovernorDecision]:
+        """ファイルの処理前に設定を適用（後回しにする場合は None）"""
+        decision = self.decide()
+        if decision.defer_low_priority and self.is_low_priority(filename):
+            print(
+                f"Budget exceeded ({decision.spend_ratio:.0%} of ${self.monthly_budget_usd:.2f}); "
+                f"deferring low-priority file: {filename}"
+            )
+            return None
+
+        if decision.apply_to(audio_processor):
+            print(
+                f"Budget governor ({decision.spend_ratio:.0%} of ${self.monthly_budget_usd:.2f} used): "
+                f"speed={decision.speed_multiplier}x, silence_compression={decision.silence_compression}, "
+                f"model={decision.model_name}"
+            )
+        return decision
@@ -27,12 +27,77 @@ class ConfigManager:
         
         # 一時ディレクトリ設定
         self.temp_chunk_base_dir = os.getenv("TEMP_CHUNK_BASE_DIR", ".tmp_chunks")
+        # アップロード用チャンクをメモリ上に保持する上限（MB、超える場合は一時ディレクトリに書き出す）
+        self.chunk_memory_buffer_max_mb = float(os.getenv("CHUNK_MEMORY_BUFFER_MAX_MB", "256"))
+        
+        # 永続状態（キャッシュ等）の保存ディレクトリ
+        self.state_dir = os.getenv("STATE_DIR", ".state")
+        
+        # 要約キャッシュ設定
+        self.summary_cache_path = os.getenv(
+            "SUMMARY_CACHE_PATH", os.path.join(self.state_dir, "summary_cache.sqlite3")
+        )
+        self.summary_cache_max_entries = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "1000"))
+        self.summary_cache_enabled = os.getenv("SUMMARY_CACHE_DISABLED", "false").lower() != "true"
+        
+        # Gemini API 記録・再生（カセット）設定: off / record / replay
+        self.gemini_cassette_mode = os.getenv("GEMINI_CASSETTE_MODE", "off").lower()
+        self.gemini_cassette_dir = os.getenv(
+            "GEMINI_CASSETTE_DIR", os.path.join(self.state_dir, "cassettes")
+        )
+        self.replay_latency_ms = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+        self.replay_error_rate = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+        
+        # アップロード設定（再開可能プロトコルでのチャンク送信と、独立したアップロードの並列数）
+        self.resumable_upload_enabled = os.getenv("RESUMABLE_UPLOAD_ENABLED", "true").lower() == "true"
+        self.upload_base_url = os.getenv("UPLOAD_BASE_URL", "https://generativelanguage.googleapis.com")
+        self.upload_chunk_size_mb = float(os.getenv("UPLOAD_CHUNK_SIZE_MB", "8"))
+        self.upload_max_attempts = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "5"))
+        self.upload_parallelism = max(1, int(os.getenv("UPLOAD_PARALLELISM", "3")))
+        # アップロード済みファイルの台帳（削除されずに残ったファイルを次回起動時に削除）
+        self.upload_ledger_path = os.getenv(
+            "UPLOAD_LEDGER_PATH", os.path.join(self.state_dir, "uploads.sqlite3")
+        )
+        self.upload_orphan_max_age_s = float(os.getenv("UPLOAD_ORPHAN_MAX_AGE_S", str(6 * 3600)))
+        
+        # 全文検索インデックス設定
+        self.search_index_path = os.getenv(
+            "SEARCH_INDEX_PATH", os.path.join(self.state_dir, "search_index.sqlite3")
+        )
+        self.search_index_enabled = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+        
+        # 複数ワーカーでの処理の排他（共有ディレクトリのリースファイル）
+        self.lease_enabled = os.getenv("LEASE_ENABLED", "false").lower() == "true"
+        self.lease_dir = os.getenv("LEASE_DIR")
+        self.lease_ttl_s = float(os.getenv("LEASE_TTL_S", "300"))
+        self.lease_heartbeat_s = float(os.getenv("LEASE_HEARTBEAT_S", "30"))
+        self.worker_id = os.getenv("WORKER_ID")
+        
+        # バッチモード（--batch）設定: local（通常のAPIを低レートで実行）/ gemini（Gemini API のバッチモード）
+        self.batch_backend = os.getenv("BATCH_BACKEND", "local").lower()
+        self.batch_poll_interval_s = float(os.getenv("BATCH_POLL_INTERVAL_S", "60"))
+        self.batch_timeout_s = float(os.getenv("BATCH_TIMEOUT_S", "86400"))
+        # 他のホストが投入したジョブを引き継ぐまでの時間（0以下なら引き継がない）
+        self.batch_takeover_age_s = float(os.getenv("BATCH_TAKEOVER_AGE_S", "172800"))
+        self.batch_local_requests_per_minute = float(os.getenv("BATCH_LOCAL_REQUESTS_PER_MINUTE", "6"))
+        self.batch_cost_ratio = float(os.getenv("BATCH_COST_RATIO", "0.5"))
         
         # 処理済みファイル移動先
         self.processed_files_dir = os.getenv("PROCESSED_FILES_DIR")
         if not self.processed_files_dir and self.audio_dest_dir:
             self.processed_files_dir = os.path.join(self.audio_dest_dir, "done")
         
+        # 処理済みの録音のアーカイブ変換（議事録の保存後に低優先度のプロセスでOpus/FLACに変換）
+        self.archive_enabled = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+        self.archive_codec = os.getenv("ARCHIVE_CODEC", "opus").lower()
+        self.archive_opus_bitrate = os.getenv("ARCHIVE_OPUS_BITRATE", "32k")
+        self.archive_workers = max(1, int(os.getenv("ARCHIVE_WORKERS", "1")))
+        self.archive_nice = int(os.getenv("ARCHIVE_NICE", "19"))
+        self.archive_extensions = os.getenv("ARCHIVE_EXTENSIONS", ".wav,.aif,.aiff")
+        self.archive_index_path = os.getenv(
+            "ARCHIVE_INDEX_PATH", os.path.join(self.state_dir, "archive_index.sqlite3")
+        )
+        
         # ログファイル設定
         self.log_file_path = os.getenv("LOG_FILE_PATH")
         if not self.log_file_path and self.processed_log_file:
@@ -47,10 +112,38 @@ class ConfigManager:
         # 録音ファイル設定
         self.recording_filename_pattern = os.getenv("RECORDING_FILENAME_PATTERN")
         self.audio_speed_multiplier = float(os.getenv("AUDIO_SPEED_MULTIPLIER", "2.0"))
+        # 長い無音区間を短縮してからアップロード（予算ガバナーが自動で有効にする場合もある）
+        self.silence_compression_enabled = os.getenv("SILENCE_COMPRESSION_ENABLED", "false").lower() == "true"
+        # 録音ごとの倍速の自動調整（サンプルを複数の倍速で文字起こしし、一致度が十分な最も速い倍速を選択）
+        self.speed_calibration_enabled = os.getenv("SPEED_CALIBRATION_ENABLED", "false").lower() == "true"
+        self.speed_calibration_candidates = os.getenv("SPEED_CALIBRATION_CANDIDATES", "1.5,2.0,2.5,3.0")
+        self.speed_calibration_sample_s = float(os.getenv("SPEED_CALIBRATION_SAMPLE_S", "30"))
+        self.speed_calibration_samples = int(os.getenv("SPEED_CALIBRATION_SAMPLES", "3"))
+        self.speed_calibration_min_agreement = float(os.getenv("SPEED_CALIBRATION_MIN_AGREEMENT", "0.85"))
+        self.speed_calibration_min_duration_s = float(os.getenv("SPEED_CALIBRATION_MIN_DURATION_S", "1800"))
+        self.speed_calibration_path = os.getenv(
+            "SPEED_CALIBRATION_PATH", os.path.join(self.state_dir, "speed_calibration.sqlite3")
+        )
+        
+        # API使用量の台帳と予算ガバナー設定
+        self.usage_ledger_path = os.getenv(
+            "USAGE_LEDGER_PATH", os.path.join(self.state_dir, "usage_ledger.sqlite3")
+        )
+        self.model_prices = os.getenv("MODEL_PRICES")
+        self.monthly_budget_usd = float(os.getenv("MONTHLY_BUDGET_USD", "0"))
+        self.budget_soft_limit_ratio = float(os.getenv("BUDGET_SOFT_LIMIT_RATIO", "0.8"))
+        self.budget_max_speed_multiplier = float(os.getenv("BUDGET_MAX_SPEED_MULTIPLIER", "3.0"))
+        self.budget_fallback_model = os.getenv("BUDGET_FALLBACK_MODEL", "gemini-1.5-flash-8b")
+        self.low_priority_filename_pattern = os.getenv("LOW_PRIORITY_FILENAME_PATTERN")
         
         # 議事録ファイル名フォーマット設定
         self.markdown_filename_format = os.getenv("MARKDOWN_FILENAME_FORMAT", "{date}_{title}")
         
+        # 文字起こしアーカイブ設定（再要約用に文字起こし結果を保存）
+        self.transcript_archive_dir = os.getenv("TRANSCRIPT_ARCHIVE_DIR")
+        if not self.transcript_archive_dir and self.markdown_output_dir:
+            self.transcript_archive_dir = os.path.join(self.markdown_output_dir, ".transcripts")
+        
         # Obsidianデイリーノート設定
         self.obsidian_daily_notes_dir = os.getenv("OBSIDIAN_DAILY_NOTES_DIR")
         self.daily_note_filename_pattern = os.getenv("DAILY_NOTE_FILENAME_PATTERN", "%Y-%m-%d.md")
@@ -62,7 +155,7 @@ class ConfigManager:
         """必須設定の検証"""
         missing = []
         
-        if not self.google_api_key:
+        if not self.google_api_key and self.gemini_cassette_mode != "replay":
             missing.append("GOOGLE_API_KEY")
         if not self.markdown_output_dir:
             missing.append("MARKDOWN_OUTPUT_DIR")
@@ -4,22 +4,30 @@
 """
 
 import datetime
+import hashlib
 import pathlib
 import shutil
 import tempfile
-from typing import Optional
+from typing import Optional, Tuple
 
 import yaml
 
 from config_manager import ConfigManager
+from markdown_writer import MarkdownWriter
 
 
 class FileManager:
     """ファイル操作を担当するクラス"""
     
-    def __init__(self, config: ConfigManager):
+    def __init__(self, config: ConfigManager, search_index=None, archive_manager=None):
         """初期化"""
         self.config = config
+        # 全文検索インデックス（None の場合は更新しない）
+        self.search_index = search_index
+        # 処理済みの録音のアーカイブ変換（None の場合は移動のみ）
+        self.archive_manager = archive_manager
+        # 議事録の書き込み（出力ディレクトリの名前インデックスを保持）
+        self.markdown_writer = MarkdownWriter(config.markdown_output_dir or ".")
     
     def create_temp_chunk_directory(self, audio_file_path: str) -> pathlib.Path:
         """音声チャンク用の一時ディレクトリを作成"""
@@ -39,7 +47,8 @@ class FileManager:
                 print(f"Warning: Failed to clean up temp directory {temp_dir}: {e}")
     
     def save_markdown(self, summary_text: str, filename_suggestion: str, 
-                     recording_datetime: Optional[datetime.datetime] = None) -> str:
+                     recording_datetime: Optional[datetime.datetime] = None,
+                     extra_frontmatter: Optional[dict] = None) -> str:
         """Markdownファイルの保存"""
         # ファイル名のサニタイズ
         sanitized_title = self._sanitize_filename(filename_suggestion)
@@ -55,37 +64,120 @@ class FileManager:
         filename_format = self.config.markdown_filename_format
         final_filename = filename_format.format(date=date_str, title=sanitized_title)
         
-        # 出力パスの決定
-        output_dir = pathlib.Path(self.config.markdown_output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        markdown_file_path = output_dir / f"{final_filename}.md"
-        
-        # 重複ファイル名の処理
-        counter = 1
-        original_path = markdown_file_path
-        while markdown_file_path.exists():
-            # 重複時は元のフォーマットに_番号を追加
-            duplicate_filename = filename_format.format(date=date_str, title=f"{sanitized_title}_{counter}")
-            markdown_file_path = original_path.parent / f"{duplicate_filename}.md"
-            counter += 1
+        # 重複時は元のフォーマットに_番号を追加した名前を順に試す
+        def candidate_names():
+            yield f"{final_filename}.md"
+            counter = 1
+            while True:
+                yield f"{filename_format.format(date=date_str, title=f'{sanitized_title}_{counter}')}.md"
+                counter += 1
         
         # YAMLフロントマターの作成（元のタイトルを使用）
         yaml_frontmatter = self._create_yaml_frontmatter(
             filename_suggestion, recording_datetime
         )
+        if extra_frontmatter:
+            yaml_frontmatter.update(extra_frontmatter)
         
         # Markdownコンテンツの作成
-        markdown_content = f"---\n{yaml.dump(yaml_frontmatter, allow_unicode=True, default_flow_style=False)}---\n\n{summary_text}"
+        markdown_content = self._build_markdown_content(yaml_frontmatter, summary_text)
         
-        # ファイルの保存
+        # ファイルの保存（名前を排他的に確保し、一時ファイル経由で書き込み）
         try:
-            with open(markdown_file_path, "w", encoding="utf-8") as f:
-                f.write(markdown_content)
+            markdown_file_path = self.markdown_writer.write_new(candidate_names(), markdown_content)
             print(f"Markdown saved to: {markdown_file_path}")
+            self._index_note(str(markdown_file_path), yaml_frontmatter, summary_text)
             return str(markdown_file_path)
         except IOError as e:
-            raise IOError(f"Failed to save markdown to {markdown_file_path}: {e}")
+            raise IOError(f"Failed to save markdown to {self.markdown_writer.output_dir}: {e}")
+    
+    def _build_markdown_content(self, frontmatter: dict, body: str) -> str:
+        """フロントマターと本文からMarkdownコンテンツを作成"""
+        return f"---\n{yaml.dump(frontmatter, allow_unicode=True, default_flow_style=False)}---\n\n{body}"
+    
+    def read_markdown(self, markdown_path: str) -> Tuple[dict, str]:
+        """Markdownファイルをフロントマターと本文に分けて読み込み"""
+        with open(markdown_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return self.split_frontmatter(content)
+    
+    @staticmethod
+    def split_frontmatter(content: str) -> Tuple[dict, str]:
+        """Markdownコンテンツをフロントマターと本文に分割"""
+        if not content.startswith("---\n"):
+            return {}, content
+        end_index = content.find("\n---\n", 4)
+        if end_index == -1:
+            return {}, content
+        
+        frontmatter = yaml.safe_load(content[4:end_index + 1]) or {}
+        body = content[end_index + len("\n---\n"):]
+        if body.startswith("\n"):
+            body = body[1:]
+        return frontmatter, body
+    
+    def update_markdown(self, markdown_path: str, summary_text: str, title: Optional[str] = None,
+                        extra_frontmatter: Optional[dict] = None) -> str:
+        """既存のMarkdownファイルの本文とフロントマターを更新（ファイル名は維持）"""
+        frontmatter, _ = self.read_markdown(markdown_path)
+        if title:
+            frontmatter["title"] = title
+        frontmatter["updated"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if extra_frontmatter:
+            frontmatter.update(extra_frontmatter)
+        
+        try:
+            self.markdown_writer.write_atomic(markdown_path, self._build_markdown_content(frontmatter, summary_text))
+            print(f"Markdown updated: {markdown_path}")
+            self._index_note(str(markdown_path), frontmatter, summary_text)
+            return str(markdown_path)
+        except IOError as e:
+            raise IOError(f"Failed to update markdown {markdown_path}: {e}")
+    
+    def get_transcript_path(self, markdown_path: str) -> Optional[pathlib.Path]:
+        """議事録に対応する文字起こしアーカイブのパスを取得"""
+        if not self.config.transcript_archive_dir:
+            return None
+        return pathlib.Path(self.config.transcript_archive_dir) / f"{pathlib.Path(markdown_path).stem}.txt"
+    
+    def save_transcript(self, transcription_text: str, markdown_path: str) -> Optional[str]:
+        """文字起こし結果を議事録と同じ名前でアーカイブに保存"""
+        transcript_path = self.get_transcript_path(markdown_path)
+        if transcript_path is None:
+            return None
+        
+        try:
+            transcript_path.parent.mkdir(parents=True, exist_ok=True)
+            self.markdown_writer.write_atomic(transcript_path, transcription_text)
+            print(f"Transcript archived to: {transcript_path}")
+        except IOError as e:
+            print(f"Warning: Failed to archive transcript to {transcript_path}: {e}")
+            return None
+        
+        if self.search_index is not None:
+            try:
+                self.search_index.index_transcript(str(transcript_path), transcription_text)
+            except Exception as e:
+                print(f"Warning: Failed to update search index for {transcript_path}: {e}")
+        return str(transcript_path)
+    
+    def _index_note(self, markdown_path: str, frontmatter: dict, body: str):
+        """議事録を全文検索インデックスに反映"""
+        if self.search_index is None:
+            return
+        try:
+            self.search_index.index_note(markdown_path, frontmatter, body)
+        except Exception as e:
+            print(f"Warning: Failed to update search index for {markdown_path}: {e}")
+    
+    def get_archived_transcripts(self) -> list:
+        """アーカイブ済みの文字起こしファイルを取得"""
+        if not self.config.transcript_archive_dir:
+            return []
+        archive_dir = pathlib.Path(self.config.transcript_archive_dir)
+        if not archive_dir.exists():
+            return []
+        return sorted(archive_dir.glob("*.txt"))
     
     def _create_yaml_frontmatter(self, title: str, 
                                 recording_datetime: Optional[datetime.datetime]) -> dict:
@@ -149,6 +241,15 @@ class FileManager:
         except IOError as e:
             print(f"Warning: Failed to write to log file: {e}")
     
+    @staticmethod
+    def compute_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+        """ファイル内容のSHA-256ハッシュを計算"""
+        hasher = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+    
     def ensure_directory_exists(self, directory_path: str):
         """ディレクトリの存在確認・作成"""
         path = pathlib.Path(directory_path)
@@ -170,12 +271,16 @@ class FileManager:
         
         return sorted(audio_files)
     
-    def move_processed_file(self, source_path: str, processed_dir: str):
-        """処理済みファイルの移動"""
+    def move_processed_file(self, source_path: str, processed_dir: str,
+                            source_hash: Optional[str] = None) -> Optional[pathlib.Path]:
+        """処理済みファイルの移動（移動先のパスを返す。失敗した場合は None）
+
+        アーカイブ変換が有効な場合は、移動後の録音の変換をバックグラウンドに投入する。
+        """
         source = pathlib.Path(source_path)
         if not source.exists():
             print(f"Warning: Source file does not exist: {source_path}")
-            return
+            return None
         
         processed_path = pathlib.Path(processed_dir)
         processed_path.mkdir(parents=True, exist_ok=True)
@@ -196,3 +301,13 @@ class FileManager:
             print(f"Moved processed file: {source} -> {destination}")
         except Exception as e:
             print(f"Warning: Failed to move processed file {source} to {destination}: {e}")
+            return None
+        
+        if self.archive_manager is not None:
+            # 完了済みの変換を先に反映してから投入（変換の失敗は処理全体の失敗にしない）
+            try:
+                self.archive_manager.collect()
+                self.archive_manager.submit(destination, source_hash)
+            except Exception as e:
+                print(f"Warning: Failed to queue archival transcoding for {destination.name}: {e}")
+        return destination
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Gemini APIクライアント - API呼び出しの集約と記録・再生（カセット）レイヤー
+"""
+
+import hashlib
+import io
+import json
+import pathlib
+import random
+import threading
+import time
+import types
+from typing import Optional
+
+import google.generativeai as genai
+
+from resumable_uploader import ResumableUploader
+
+
+class CassetteMissError(KeyError):
+    """再生モードで記録済みのレスポンスが見つからない場合の例外"""
+
+
+class ReplayInjectedError(ConnectionError):
+    """再生モードで疑似的に発生させた通信エラー"""
+
+
+class GeminiClient:
+    """upload_file / generate_content / delete_file を提供するクライアント"""
+
+    def __init__(self, api_key: Optional[str], uploader: Optional[ResumableUploader] = None):
+        """初期化（uploader を指定するとアップロードは再開可能プロトコルで行う）"""
+        genai.configure(api_key=api_key)
+        self.uploader = uploader
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """設定からクライアントを作成（カセットモードでは記録・再生レイヤーで包む）"""
+        mode = config.gemini_cassette_mode
+        if mode == "replay":
+            print(f"Gemini API replay mode: serving responses from {config.gemini_cassette_dir}")
+            return CassetteGeminiClient(
+                None, config.gemini_cassette_dir, "replay",
+                latency_ms=config.replay_latency_ms, error_rate=config.replay_error_rate
+            )
+        client = cls(config.google_api_key, ResumableUploader.from_config(config))
+        if mode == "record":
+            print(f"Gemini API record mode: saving responses to {config.gemini_cassette_dir}")
+            return CassetteGeminiClient(client, config.gemini_cassette_dir, "record")
+        return client
+
+    def _get_model(self, model_name: str):
+        """モデル名ごとに GenerativeModel を再利用"""
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def upload_file(self, path, mime_type: Optional[str] = None):
+        """ファイルをアップロード"""
+        if self.uploader is not None:
+            return self.uploader.upload(path, mime_type=mime_type)
+        return genai.upload_file(path=path, mime_type=mime_type)
+
+    def generate_content(self, model_name: str, contents, stream: bool = False):
+        """コンテンツを生成"""
+        return self._get_model(model_name).generate_content(contents, stream=stream)
+
+    def delete_file(self, name: str):
+        """アップロード済みファイルを削除"""
+        genai.delete_file(name)
+
+
+class CassetteGeminiClient:
+    """API呼び出しをカセット（ローカルのJSONファイル）に記録・再生するクライアント
+
+    リクエストは内容のハッシュ（アップロードはファイル内容、生成はモデル名と
+    テキスト・アップロード済みファイルの内容ハッシュ）をキーとして保存する。
+    """
+
+    def __init__(self, inner: Optional[GeminiClient], cassette_dir: str, mode: str,
+                 latency_ms: float = 0.0, error_rate: float = 0.0):
+        """初期化"""
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Record mode requires a live client.")
+        self.inner = inner
+        self.cassette_dir = pathlib.Path(cassette_dir)
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._file_hashes = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        (self.cassette_dir / "uploads").mkdir(parents=True, exist_ok=True)
+        (self.cassette_dir / "generate").mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _hash_file(path) -> str:
+        """アップロード対象の内容ハッシュを計算"""
+        hasher = hashlib.sha256()
+        if isinstance(path, io.IOBase):
+            position = path.tell()
+            for block in iter(lambda: path.read(1024 * 1024), b""):
+                hasher.update(block)
+            path.seek(position)
+        else:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+        return hasher.hexdigest()
+
+    def _request_key(self, model_name: str, contents) -> str:
+        """生成リクエストのキーを計算"""
+        items = [contents] if isinstance(contents, str) else list(contents)
+        normalized = [model_name]
+        with self._lock:
+            for item in items:
+                if isinstance(item, str):
+                    normalized.append(["text", item])
+                else:
+                    normalized.append(["file", self._file_hashes.get(getattr(item, "name", ""), repr(item))])
+        encoded = json.dumps(normalized, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _simulate_network(self, operation: str):
+        """再生モードで遅延とエラーを疑似的に発生"""
+        if self.mode != "replay":
+            return
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        if self.error_rate > 0 and self._random.random() < self.error_rate:
+            raise ReplayInjectedError(f"Injected replay error during {operation}")
+
+    @staticmethod
+    def _write_json(path: pathlib.Path, data: dict):
+        """カセットファイルを書き込み（一時ファイル経由で置き換え）"""
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        temp_path.replace(path)
+
+    def _load_json(self, path: pathlib.Path, description: str) -> dict:
+        """カセットファイルを読み込み"""
+        if not path.exists():
+            raise CassetteMissError(f"No recorded {description} in cassette: {path.name}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def upload_file(self, path, mime_type: Optional[str] = None):
+        """ファイルをアップロード（記録）または記録済みのファイル情報を返す（再生）"""
+        content_hash = self._hash_file(path)
+        cassette_path = self.cassette_dir / "uploads" / f"{content_hash}.json"
+
+        if self.mode == "replay":
+            self._simulate_network("upload_file")
+            data = self._load_json(cassette_path, "upload")
+            uploaded = types.SimpleNamespace(
+                name=f"files/replay-{content_hash[:16]}", uri=data.get("uri"),
+                display_name=data.get("display_name"), mime_type=data.get("mime_type")
+            )
+        else:
+            uploaded = self.inner.upload_file(path, mime_type=mime_type)
+            self._write_json(cassette_path, {
+                "name": uploaded.name,
+                "uri": getattr(uploaded, "uri", None),
+                "display_name": getattr(uploaded, "display_name", None),
+                "mime_type": getattr(uploaded, "mime_type", mime_type),
+            })
+
+        with self._lock:
+            self._file_hashes[uploaded.name] = content_hash
+        return uploaded
+
+    def generate_content(self, model_name: str, contents, stream: bool = False):
+        """コンテンツを生成（記録）または記録済みのレスポンスを返す（再生）"""
+        key = self._request_key(model_name, contents)
+        cassette_path = self.cassette_dir / "generate" / f"{key}.json"
+
+        if self.mode == "replay":
+            self._simulate_network("generate_content")
+            chunks = [_ReplayChunk(data) for data in self._load_json(cassette_path, "generation")["chunks"]]
+            return iter(chunks) if stream else _merge_chunks(chunks)
+
+        response = self.inner.generate_content(model_name, contents, stream=stream)
+        if not stream:
+            self._write_json(cassette_path, {"model": model_name, "chunks": [_chunk_to_dict(response)]})
+            return response
+        return self._record_stream(response, model_name, cassette_path)
+
+    def _record_stream(self, response, model_name: str, cassette_path: pathlib.Path):
+        """ストリーミングレスポンスをそのまま返しつつ、完了時にカセットへ保存"""
+        recorded = []
+        for chunk in response:
+            recorded.append(_chunk_to_dict(chunk))
+            yield chunk
+        self._write_json(cassette_path, {"model": model_name, "chunks": recorded})
+
+    def delete_file(self, name: str):
+        """アップロード済みファイルを削除（再生モードでは何もしない）"""
+        if self.mode == "replay":
+            self._simulate_network("delete_file")
+            return
+        self.inner.delete_file(name)
+
+
+def _chunk_to_dict(chunk) -> dict:
+    """レスポンス（チャンク）を保存用の辞書に変換"""
+    data = {"text": "", "finish_reason": None, "usage": None}
+    candidates = getattr(chunk, "candidates", None)
+    if candidates:
+        candidate = candidates[0]
+        finish_reason = getattr(candidate, "finish_reason", None)
+        data["finish_reason"] = str(getattr(finish_reason, "name", finish_reason)) if finish_reason is not None else None
+        parts = candidate.content.parts if candidate.content else []
+        data["text"] = "".join(getattr(part, "text", "") for part in parts)
+    usage = getattr(chunk, "usage_metadata", None)
+    if usage:
+        data["usage"] = {
+            "prompt_token_count": getattr(usage, "prompt_token_count", 0),
+            "candidates_token_count": getattr(usage, "candidates_token_count", 0),
+            "total_token_count": getattr(usage, "total_token_count", 0),
+        }
+    return data
+
+
+class _ReplayChunk:
+    """記録済みのチャンクを SDK のレスポンスと同じ属性で参照できるようにするクラス"""
+
+    def __init__(self, data: dict):
+        parts = [types.SimpleNamespace(text=data["text"])] if data.get("text") else []
+        self.candidates = [types.SimpleNamespace(
+            finish_reason=data.get("finish_reason"),
+            content=types.SimpleNamespace(parts=parts),
+        )]
+        usage = data.get("usage")
+        self.usage_metadata = types.SimpleNamespace(**usage) if usage else None
+
+    @property
+    def text(self) -> str:
+        return "".join(part.text for part in self.candidates[0].content.parts)
+
+
+def _merge_chunks(chunks: list) -> _ReplayChunk:
+    """ストリーミングで記録したチャンクを1つのレスポンスにまとめる"""
+    finish_reason = None
+    usage = None
+    for chunk in chunks:
+        if chunk.candidates[0].finish_reason:
+            finish_reason = chunk.candidates[0].finish_reason
+        if chunk.usage_metadata:
+            usage = vars(chunk.usage_metadata)
+    return _ReplayChunk({
+        "text": "".join(chunk.text for chunk in chunks),
+        "finish_reason": finish_reason,
+        "usage": usage,
+    })
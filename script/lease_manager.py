@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+リース管理 - 共有ディレクトリのリースファイルによる複数ワーカー間の処理の排他
+"""
+
+import json
+import os
+import pathlib
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+
+from config_manager import ConfigManager
+
+
+class Lease:
+    """1つの音声ファイルに対して取得したリース"""
+
+    def __init__(self, name: str, path: pathlib.Path, token: str):
+        """初期化"""
+        self.name = name
+        self.path = path
+        self.token = token
+        # ハートビートで更新できなかった（他のワーカーに回収された）場合に True
+        self.lost = False
+
+
+class LeaseManager:
+    """共有ディレクトリ（NAS等）に置くリースファイルで、同じ音声ファイルを複数のワーカーが処理しないようにするクラス
+
+    リースは O_EXCL によるファイル作成で取得し、保持中はハートビートでファイルの更新時刻を延長する。
+    更新時刻が ttl_s 以上前のリースは停止したワーカーのものとみなし、rename で1つのワーカーだけが回収する。
+    ホスト間の時刻は NTP 等で同期されていることを前提とする。
+    """
+
+    def __init__(self, lease_dir: str, worker_id: Optional[str] = None,
+                 ttl_s: float = 300.0, heartbeat_interval_s: float = 30.0):
+        """初期化"""
+        if heartbeat_interval_s >= ttl_s:
+            raise ValueError("Lease heartbeat interval must be shorter than the lease TTL.")
+        self.lease_dir = pathlib.Path(lease_dir)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.ttl_s = ttl_s
+        self.heartbeat_interval_s = heartbeat_interval_s
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._heartbeat_thread = None
+        self.lease_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: ConfigManager, processing_dir: pathlib.Path) -> Optional["LeaseManager"]:
+        """設定からリース管理を作成（無効の場合は None）"""
+        if not config.lease_enabled:
+            return None
+        lease_dir = config.lease_dir or str(pathlib.Path(processing_dir) / ".leases")
+        manager = cls(lease_dir, config.worker_id, config.lease_ttl_s, config.lease_heartbeat_s)
+        print(f"Lease coordination enabled: worker={manager.worker_id}, dir={manager.lease_dir}")
+        return manager
+
+    def _lease_path(self, name: str) -> pathlib.Path:
+        """音声ファイル名に対応するリースファイルのパス"""
+        return self.lease_dir / f"{name}.lease"
+
+    def _try_create(self, name: str) -> Optional[Lease]:
+        """リースファイルを排他作成（既に存在する場合は None）"""
+        path = self._lease_path(name)
+        token = uuid.uuid4().hex
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({
+                "worker": self.worker_id,
+                "token": token,
+                "acquired_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        return Lease(name, path, token)
+
+    def _is_stale(self, path: pathlib.Path) -> bool:
+        """リースの更新時刻が有効期限を過ぎているか"""
+        try:
+            return time.time() - path.stat().st_mtime > self.ttl_s
+        except FileNotFoundError:
+            return False
+
+    def _reclaim_stale(self, name: str) -> bool:
+        """期限切れのリースを回収（rename に成功した1ワーカーだけが回収できる）"""
+        path = self._lease_path(name)
+        if not self._is_stale(path):
+            return False
+        reclaimed_path = path.with_name(f"{path.name}.reclaimed-{uuid.uuid4().hex}")
+        try:
+            os.rename(path, reclaimed_path)
+        except FileNotFoundError:
+            # 他のワーカーが先に回収した
+            return False
+        if not self._is_stale(reclaimed_path):
+            # stat と rename の間に持ち主が更新した場合は元に戻す（新しいリースがあればそちらを優先）
+            try:
+                os.link(reclaimed_path, path)
+            except FileExistsError:
+                pass
+            reclaimed_path.unlink(missing_ok=True)
+            return False
+        reclaimed_path.unlink(missing_ok=True)
+        print(f"Reclaimed stale lease: {path.name}")
+        return True
+
+    def acquire(self, name: str) -> Optional[Lease]:
+        """音声ファイルのリースを取得（他のワーカーが保持中の場合は None）"""
+        lease = self._try_create(name)
+        if lease is None and self._reclaim_stale(name):
+            lease = self._try_create(name)
+        if lease is None:
+            return None
+        with self._lock:
+            self._held[name] = lease
+        self._ensure_heartbeat()
+        return lease
+
+    def _owns(self, lease: Lease) -> bool:
+        """リースファイルが自分の取得したものか確認"""
+        try:
+            with open(lease.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("token") == lease.token
+        except (OSError, ValueError):
+            return False
+
+    def renew(self, lease: Lease) -> bool:
+        """リースの有効期限を延長（回収されていた場合は lost にする）"""
+        if lease.lost:
+            return False
+        if not self._owns(lease):
+            lease.lost = True
+            print(f"Warning: Lease lost for {lease.name} (reclaimed by another worker).")
+            return False
+        try:
+            os.utime(lease.path)
+        except OSError as e:
+            print(f"Warning: Failed to renew lease for {lease.name}: {e}")
+            return False
+        return True
+
+    def release(self, lease: Lease):
+        """リースを解放（自分のリースの場合のみ削除）"""
+        with self._lock:
+            self._held.pop(lease.name, None)
+        if not lease.lost and self._owns(lease):
+            lease.path.unlink(missing_ok=True)
+
+    def _ensure_heartbeat(self):
+        """ハートビートスレッドを起動"""
+        with self._lock:
+            if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat_loop, name="lease-heartbeat", daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        """保持中のリースを定期的に延長"""
+        while not self._stop_event.wait(self.heartbeat_interval_s):
+            with self._lock:
+                leases = list(self._held.values())
+            for lease in leases:
+                self.renew(lease)
+
+    def close(self):
+        """ハートビートを停止し、保持中のリースをすべて解放"""
+        self._stop_event.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+        with self._lock:
+            leases = list(self._held.values())
+        for lease in leases:
+            self.release(lease)
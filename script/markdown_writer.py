@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Markdown書き込み - 出力ディレクトリの名前インデックスとアトミックな書き込み
+"""
+
+import contextlib
+import os
+import pathlib
+import stat
+import tempfile
+import threading
+from typing import Iterable
+
+
+class MarkdownWriter:
+    """出力ディレクトリへの重複しない名前の確保と、途中状態を残さない書き込みを行うクラス
+
+    既存のファイル名は最初の確保時に1回の scandir で読み込み、以降はメモリ上で更新する。
+    名前の確保は O_EXCL で行うため、他のプロセスと同じ名前を選ぶことはない。
+    """
+
+    def __init__(self, output_dir: str):
+        """初期化"""
+        self.output_dir = pathlib.Path(output_dir)
+        self._names = None
+        self._lock = threading.Lock()
+        self._defer_directory_sync = False
+        self._dirty_dirs = set()
+
+    def _load_index(self):
+        """既存のファイル名を読み込み（ロック取得済みで呼び出す）"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with os.scandir(self.output_dir) as entries:
+            self._names = {entry.name for entry in entries}
+
+    def reserve(self, candidate_names: Iterable[str]) -> pathlib.Path:
+        """候補の中から未使用の名前を順に探し、空ファイルを排他作成して確保"""
+        with self._lock:
+            if self._names is None:
+                self._load_index()
+            for name in candidate_names:
+                if name in self._names:
+                    continue
+                path = self.output_dir / name
+                try:
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                except FileExistsError:
+                    # 他のプロセスが作成した名前はインデックスに追加して次の候補へ
+                    self._names.add(name)
+                    continue
+                os.close(fd)
+                self._names.add(name)
+                return path
+        raise FileExistsError(f"No free file name available in {self.output_dir}")
+
+    def write_atomic(self, path, content: str):
+        """一時ファイルに書き込み fsync してから置き換え（途中まで書かれたファイルを残さない）"""
+        path = pathlib.Path(path)
+        fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            # mkstemp は 0600 で作成するため、既存ファイルの権限（新規の場合は umask に従った権限）に合わせる
+            os.fchmod(fd, _target_mode(path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(temp_name)
+            raise
+
+        with self._lock:
+            if self._names is not None and path.parent == self.output_dir:
+                self._names.add(path.name)
+            if self._defer_directory_sync:
+                self._dirty_dirs.add(path.parent)
+                return
+        _fsync_directory(path.parent)
+
+    def write_new(self, candidate_names: Iterable[str], content: str) -> pathlib.Path:
+        """未使用の名前を確保して内容を書き込み"""
+        path = self.reserve(candidate_names)
+        try:
+            self.write_atomic(path, content)
+        except BaseException:
+            # 確保した空ファイルを残さない
+            with contextlib.suppress(OSError):
+                path.unlink()
+            with self._lock:
+                self._names.discard(path.name)
+            raise
+        return path
+
+    @contextlib.contextmanager
+    def batch(self):
+        """ブロック内のディレクトリの fsync を終了時にまとめて実行"""
+        with self._lock:
+            self._defer_directory_sync = True
+        try:
+            yield self
+        finally:
+            self.sync()
+            with self._lock:
+                self._defer_directory_sync = False
+
+    def sync(self):
+        """保留中のディレクトリの fsync を実行"""
+        with self._lock:
+            dirty_dirs, self._dirty_dirs = self._dirty_dirs, set()
+        for directory in dirty_dirs:
+            _fsync_directory(directory)
+
+
+def _target_mode(path: pathlib.Path) -> int:
+    """置き換え後のファイルの権限（既存ファイルの権限、新規の場合は open(..., "w") と同じ権限）"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_current_umask()
+
+
+def _current_umask() -> int:
+    """現在の umask を取得"""
+    with _UMASK_LOCK:
+        mask = os.umask(0)
+        os.umask(mask)
+    return mask
+
+
+_UMASK_LOCK = threading.Lock()
+
+
+def _fsync_directory(directory: pathlib.Path):
+    """ディレクトリのエントリを永続化（対応していないOSでは何もしない）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+処理記録 - 音声ファイルごとの構造化ログ（JSONL）とステージ別計測
+"""
+
+import argparse
+import collections
+import contextlib
+import datetime
+import json
+import pathlib
+import sys
+import time
+from typing import Optional
+
+
+class ProcessingRecord:
+    """1つの録音ファイルの処理結果とステージ別の計測値"""
+
+    def __init__(self, source_path: str):
+        """初期化"""
+        self.source_name = pathlib.Path(source_path).name
+        self.source_hash = None
+        self.audio_duration_s = None
+        self.output_markdown = None
+        self.status = "pending"
+        self.error = None
+        self.stages = {}
+        self.counters = collections.Counter()
+        self.call_timings = []
+        self.profiler = None
+        self.governor = None
+        self.speed_calibration = None
+        self.total_wall_s = 0.0
+        self.total_cpu_s = 0.0
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """ステージの経過時間・CPU時間を計測（同名ステージは合算、profiler 設定時はプロファイルも収集）"""
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.span(name):
+                    yield
+        finally:
+            stage = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "count": 0})
+            stage["wall_s"] += time.perf_counter() - start_wall
+            stage["cpu_s"] += time.process_time() - start_cpu
+            stage["count"] += 1
+
+    def finish(self, status: str, error: Optional[str] = None):
+        """処理結果を確定"""
+        self.status = status
+        self.error = error
+        self.total_wall_s = time.perf_counter() - self._start_wall
+        self.total_cpu_s = time.process_time() - self._start_cpu
+
+    def to_dict(self) -> dict:
+        """JSONL出力用の辞書に変換"""
+        counters = self.counters
+        return {
+            "processed_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "source_audio": self.source_name,
+            "source_sha256": self.source_hash,
+            "output_markdown": self.output_markdown,
+            "status": self.status,
+            "error": self.error,
+            "audio_duration_s": self.audio_duration_s,
+            "chunk_count": counters["chunks_transcribed"],
+            "bytes_uploaded": counters["bytes_uploaded"],
+            "temp_disk_bytes_written": counters["temp_disk_bytes_written"],
+            "total_wall_s": round(self.total_wall_s, 3),
+            "total_cpu_s": round(self.total_cpu_s, 3),
+            "stages": {
+                name: {"wall_s": round(stage["wall_s"], 3), "cpu_s": round(stage["cpu_s"], 3), "count": stage["count"]}
+                for name, stage in self.stages.items()
+            },
+            "api_calls": {
+                "upload": counters["api_upload_calls"],
+                "generate": counters["api_generate_calls"],
+                "delete": counters["api_delete_calls"],
+            },
+            "tokens": {
+                "prompt": counters["prompt_tokens"],
+                "candidates": counters["candidates_tokens"],
+                "total": counters["total_tokens"],
+            },
+            "estimated_cost_usd": round(counters["estimated_cost_usd"], 6),
+            "governor": self.governor,
+            "speed_calibration": self.speed_calibration,
+            "cache_hits": {
+                "transcription": counters["transcription_cache_hits"],
+                "summary": counters["summary_cache_hits"],
+                "title": counters["title_cache_hits"],
+            },
+            "retries": {
+                "chunk_splits": counters["chunk_splits"],
+                "chunk_retries": counters["chunk_retries"],
+                "stream_resumes": counters["stream_resumes"],
+            },
+            "generation_timings": self.call_timings,
+        }
+
+
+class JsonlAppender:
+    """JSONLファイルへのバッファ付き追記（ファイルを開いたまま書き込む）"""
+
+    def __init__(self, file_path: str, flush_every: int = 1):
+        """初期化"""
+        self.file_path = pathlib.Path(file_path)
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.file_path, "a", encoding="utf-8", buffering=64 * 1024)
+
+    def append(self, record: dict):
+        """1レコードを追記"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """バッファをファイルに書き出し"""
+        self._file.flush()
+        self._pending = 0
+
+    def close(self):
+        """ファイルを閉じる"""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def percentile(values: list, fraction: float) -> float:
+    """線形補間によるパーセンタイル"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def load_records(log_file_path: str) -> list:
+    """JSONLログから処理記録を読み込み（旧形式の行は無視）"""
+    records = []
+    with open(log_file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "stages" in record:
+                records.append(record)
+    return records
+
+
+def main():
+    """処理記録の集計コマンド"""
+    parser = argparse.ArgumentParser(description="Aggregate per-stage latency percentiles from the processing JSONL log.")
+    parser.add_argument("log_file_path", help="Path to the processed log JSONL file.")
+    parser.add_argument("--status", default="success", help="Only aggregate records with this status ('all' for every record).")
+    args = parser.parse_args()
+
+    records = load_records(args.log_file_path)
+    if args.status != "all":
+        records = [record for record in records if record.get("status") == args.status]
+    if not records:
+        print("No matching records found.")
+        sys.exit(1)
+
+    series = collections.defaultdict(list)
+    for record in records:
+        series["total"].append(record.get("total_wall_s", 0.0))
+        for name, stage in record.get("stages", {}).items():
+            series[name].append(stage.get("wall_s", 0.0))
+
+    print(f"{len(records)} records ({args.status})")
+    print(f"{'stage':<14}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}{'sum':>12}")
+    for name, values in sorted(series.items(), key=lambda item: -sum(item[1])):
+        print(
+            f"{name:<14}{len(values):>6}{percentile(values, 0.5):>10.2f}{percentile(values, 0.9):>10.2f}"
+            f"{percentile(values, 0.99):>10.2f}{max(values):>10.2f}{sum(values):>12.2f}"
+        )
+
+    totals = collections.Counter()
+    for record in records:
+        totals.update({f"tokens.{key}": value for key, value in record.get("tokens", {}).items()})
+        totals.update({f"api_calls.{key}": value for key, value in record.get("api_calls", {}).items()})
+        totals["bytes_uploaded"] += record.get("bytes_uploaded", 0)
+        totals["temp_disk_bytes_written"] += record.get("temp_disk_bytes_written", 0)
+    print(", ".join(f"{key}={value}" for key, value in sorted(totals.items())))
+
+
+if __name__ == "__main__":
+    main()
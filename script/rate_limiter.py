@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+レート制限クラス - 複数ワーカーからのAPI呼び出し間隔を制御
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """1分あたりのリクエスト数を制限するクラス（スレッドセーフ）"""
+    
+    def __init__(self, requests_per_minute: float):
+        """初期化"""
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def acquire(self):
+        """次のリクエストが許可されるまで待機"""
+        if self.interval <= 0:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        
+        if wait_time > 0:
+            time.sleep(wait_time)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+再開可能アップロード - Files API の resumable プロトコルでチャンク単位にアップロードし、中断時は続きから再送
+"""
+
+import hashlib
+import http.client
+import io
+import json
+import mimetypes
+import os
+import pathlib
+import time
+import urllib.error
+import urllib.request
+from typing import Optional, Tuple
+
+from google.generativeai import protos
+
+from config_manager import ConfigManager
+
+# アップロードのチャンクは 256KiB の倍数である必要がある（最後のチャンクを除く）
+CHUNK_GRANULARITY = 256 * 1024
+
+
+class UploadSessionExpiredError(IOError):
+    """保存済みのアップロードセッションがサーバー側で失効していた場合の例外"""
+
+
+class ResumableUploader:
+    """Gemini Files API への再開可能アップロード
+
+    アップロード先URL（セッション）と送信済みバイト数を内容ハッシュごとに state_dir に保存するため、
+    通信が途中で切れた場合もプロセスを再起動した場合も、サーバーが受信済みの位置から再送する。
+    """
+
+    def __init__(self, api_key: Optional[str], state_dir: str, base_url: str = "https://generativelanguage.googleapis.com",
+                 chunk_size: int = 8 * 1024 * 1024, max_attempts: int = 5, timeout_s: float = 120.0,
+                 retry_delay_s: float = 1.0):
+        """初期化"""
+        self.api_key = api_key
+        self.session_dir = pathlib.Path(state_dir) / "upload_sessions"
+        self.base_url = base_url.rstrip("/")
+        self.chunk_size = max(CHUNK_GRANULARITY, chunk_size // CHUNK_GRANULARITY * CHUNK_GRANULARITY)
+        self.max_attempts = max_attempts
+        self.timeout_s = timeout_s
+        self.retry_delay_s = retry_delay_s
+
+    @classmethod
+    def from_config(cls, config: ConfigManager) -> Optional["ResumableUploader"]:
+        """設定からアップローダーを作成（無効の場合は None）"""
+        if not config.resumable_upload_enabled:
+            return None
+        return cls(
+            config.google_api_key, config.state_dir, base_url=config.upload_base_url,
+            chunk_size=int(config.upload_chunk_size_mb * 1024 * 1024),
+            max_attempts=config.upload_max_attempts,
+        )
+
+    def _request(self, url: str, headers: dict, data: bytes = b"") -> Tuple[int, object, bytes]:
+        """POST リクエストを送信し、(ステータス, ヘッダ, 本文) を返す"""
+        request_headers = dict(headers)
+        if self.api_key:
+            request_headers["x-goog-api-key"] = self.api_key
+        request = urllib.request.Request(url, data=data, headers=request_headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout_s) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    @staticmethod
+    def _is_retryable(status: int) -> bool:
+        """再試行すべきステータスか"""
+        return status == 429 or status >= 500
+
+    def _session_path(self, content_hash: str) -> pathlib.Path:
+        """セッション情報の保存先"""
+        return self.session_dir / f"{content_hash}.json"
+
+    def _load_session(self, content_hash: str, size: int, mime_type: str) -> Optional[dict]:
+        """保存済みのセッションを読み込み（内容が一致しない場合は None）"""
+        path = self._session_path(content_hash)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                session = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if session.get("size") != size or session.get("mime_type") != mime_type:
+            return None
+        return session
+
+    def _save_session(self, content_hash: str, session: dict):
+        """セッション情報を保存（一時ファイル経由で置き換え）"""
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        path = self._session_path(content_hash)
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(session, f)
+        os.replace(temp_path, path)
+
+    def _start_session(self, size: int, mime_type: str, display_name: Optional[str]) -> str:
+        """アップロードセッションを開始し、アップロード先URLを返す"""
+        metadata = {"file": {"display_name": display_name}} if display_name else {}
+        status, headers, body = self._request(
+            f"{self.base_url}/upload/v1beta/files",
+            {
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(size),
+                "X-Goog-Upload-Header-Content-Type": mime_type,
+                "Content-Type": "application/json",
+            },
+            json.dumps(metadata).encode("utf-8"),
+        )
+        upload_url = headers.get("X-Goog-Upload-URL") if headers else None
+        if status != 200 or not upload_url:
+            raise IOError(f"Failed to start upload session ({status}): {body[:500]!r}")
+        return upload_url
+
+    def _query_offset(self, upload_url: str) -> Tuple[int, Optional[object]]:
+        """サーバーが受信済みのバイト数を問い合わせ（完了済みの場合はファイル情報も返す）"""
+        status, headers, body = self._request(upload_url, {"X-Goog-Upload-Command": "query"})
+        if status in (404, 410):
+            raise UploadSessionExpiredError(f"Upload session expired ({status})")
+        if status != 200:
+            raise IOError(f"Failed to query upload session ({status}): {body[:500]!r}")
+        if headers.get("X-Goog-Upload-Status") == "final":
+            return int(headers.get("X-Goog-Upload-Size-Received", 0)), self._parse_file(body)
+        return int(headers.get("X-Goog-Upload-Size-Received", 0)), None
+
+    @staticmethod
+    def _parse_file(body: bytes) -> protos.File:
+        """完了レスポンスからファイル情報を取り出す（generate_content にそのまま渡せる SDK の File）"""
+        data = json.loads(body.decode("utf-8")).get("file", {})
+        return protos.File(
+            name=data.get("name"), uri=data.get("uri"), mime_type=data.get("mimeType"),
+            display_name=data.get("displayName"), size_bytes=int(data.get("sizeBytes", 0) or 0),
+            state=data.get("state") or "STATE_UNSPECIFIED",
+        )
+
+    @staticmethod
+    def _open_source(source):
+        """パスまたはバイナリバッファを読み込み用に開く（閉じる必要があるかも返す）"""
+        if isinstance(source, io.IOBase):
+            return source, False
+        return open(source, "rb"), True
+
+    @staticmethod
+    def _hash_source(stream) -> Tuple[str, int]:
+        """内容のハッシュとサイズを計算"""
+        hasher = hashlib.sha256()
+        stream.seek(0)
+        size = 0
+        for block in iter(lambda: stream.read(1024 * 1024), b""):
+            hasher.update(block)
+            size += len(block)
+        stream.seek(0)
+        return hasher.hexdigest(), size
+
+    def upload(self, source, mime_type: Optional[str] = None, display_name: Optional[str] = None):
+        """ファイルまたはバッファをアップロードし、ファイル情報を返す"""
+        if mime_type is None:
+            mime_type = mimetypes.guess_type(str(source))[0] if not isinstance(source, io.IOBase) else None
+            mime_type = mime_type or "application/octet-stream"
+        if display_name is None and not isinstance(source, io.IOBase):
+            display_name = pathlib.Path(source).name
+
+        stream, should_close = self._open_source(source)
+        try:
+            content_hash, size = self._hash_source(stream)
+            return self._upload_stream(stream, content_hash, size, mime_type, display_name)
+        finally:
+            if should_close:
+                stream.close()
+
+    def _upload_stream(self, stream, content_hash: str, size: int, mime_type: str, display_name: Optional[str]):
+        """セッションを再利用または開始し、受信済みの位置からチャンクを送信"""
+        session = self._load_session(content_hash, size, mime_type)
+        offset = None
+        if session is not None:
+            print(f"Resuming upload session for {display_name or content_hash[:12]} (offset {session.get('offset', 0)}/{size})")
+
+        attempt = 0
+        while True:
+            try:
+                if session is None:
+                    session = {"upload_url": self._start_session(size, mime_type, display_name),
+                               "size": size, "mime_type": mime_type, "offset": 0}
+                    self._save_session(content_hash, session)
+                    offset = 0
+                if offset is None:
+                    # 前回の送信がどこまで届いたかはサーバーに問い合わせる
+                    offset, uploaded = self._query_offset(session["upload_url"])
+                    if uploaded is not None:
+                        self._session_path(content_hash).unlink(missing_ok=True)
+                        return uploaded
+                uploaded, offset = self._send_chunks(stream, session, content_hash, offset, size)
+                if uploaded is not None:
+                    self._session_path(content_hash).unlink(missing_ok=True)
+                    return uploaded
+            except UploadSessionExpiredError as e:
+                print(f"Warning: {e}; starting a new upload session.")
+                self._session_path(content_hash).unlink(missing_ok=True)
+                session = None
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise IOError(f"Upload failed after {attempt} attempts (session saved for resume): {e}")
+                print(f"Warning: Upload interrupted ({e}). Resuming ({attempt}/{self.max_attempts})...")
+                offset = None
+                time.sleep(self.retry_delay_s * 2 ** (attempt - 1))
+
+    def _send_chunks(self, stream, session: dict, content_hash: str, offset: int, size: int):
+        """offset から順にチャンクを送信（完了時はファイル情報、途中の場合は None と次の位置を返す）"""
+        while True:
+            stream.seek(offset)
+            data = stream.read(self.chunk_size)
+            last = offset + len(data) >= size
+            status, headers, body = self._request(
+                session["upload_url"],
+                {
+                    "X-Goog-Upload-Command": "upload, finalize" if last else "upload",
+                    "X-Goog-Upload-Offset": str(offset),
+                    "Content-Length": str(len(data)),
+                },
+                data,
+            )
+            if status in (404, 410):
+                raise UploadSessionExpiredError(f"Upload session expired ({status})")
+            if self._is_retryable(status):
+                raise IOError(f"Upload chunk failed with status {status}")
+            if status != 200:
+                raise ValueError(f"Upload rejected ({status}): {body[:500]!r}")
+            if last:
+                return self._parse_file(body), size
+            offset += len(data)
+            session["offset"] = offset
+            self._save_session(content_hash, session)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+再要約スクリプト - アーカイブ済みの文字起こしから議事録を再生成
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import pathlib
+import sys
+from typing import Optional
+
+from config_manager import ConfigManager
+from audio_processor import AudioProcessor
+from file_manager import FileManager
+from summary_cache import SummaryCache
+from usage_ledger import UsageLedger
+from search_index import SearchIndex
+from rate_limiter import RateLimiter
+
+
+def parse_recording_datetime(value) -> Optional[datetime.datetime]:
+    """フロントマターの録音日時を datetime に変換"""
+    if isinstance(value, datetime.datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def resummarize_transcript(transcript_path: pathlib.Path, prompt_template: str,
+                           audio_processor: AudioProcessor, file_manager: FileManager,
+                           rate_limiter: RateLimiter, force: bool = False, dry_run: bool = False) -> str:
+    """1件の文字起こしから要約とタイトルを再生成し、議事録を更新"""
+    markdown_path = pathlib.Path(file_manager.config.markdown_output_dir) / f"{transcript_path.stem}.md"
+    if not markdown_path.exists():
+        print(f"Skipping {transcript_path.name}: markdown not found ({markdown_path})")
+        return "missing"
+    
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        transcription = f.read()
+    
+    frontmatter, _ = file_manager.read_markdown(str(markdown_path))
+    context_files = file_manager.config.get_context_files()
+    summary_hash = audio_processor.compute_summary_hash(transcription, prompt_template, context_files)
+    if not force and frontmatter.get("summary_hash") == summary_hash:
+        print(f"Unchanged: {markdown_path.name}")
+        return "unchanged"
+    
+    if dry_run:
+        print(f"Would resummarize: {markdown_path.name}")
+        return "pending"
+    
+    recording_datetime = parse_recording_datetime(frontmatter.get("recording_datetime"))
+    
+    rate_limiter.acquire()
+    summary = audio_processor.summarize_text(
+        transcription, prompt_template, recording_datetime, context_files=context_files
+    )
+    
+    rate_limiter.acquire()
+    title = audio_processor.generate_filename_from_summary(summary)
+    
+    file_manager.update_markdown(
+        str(markdown_path), summary, title,
+        extra_frontmatter={"summary_hash": summary_hash}
+    )
+    return "updated"
+
+
+def main():
+    """メイン処理関数"""
+    parser = argparse.ArgumentParser(
+        description="Regenerate summaries and titles of existing minutes from archived transcripts."
+    )
+    parser.add_argument(
+        "--summary_prompt_file_path",
+        help="Path to the summary prompt template file (default: SUMMARY_PROMPT_FILE_PATH).",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Number of parallel workers."
+    )
+    parser.add_argument(
+        "--requests_per_minute", type=float, default=30,
+        help="Maximum API requests per minute across all workers (0 = unlimited).",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Resummarize even if the input hash is unchanged."
+    )
+    parser.add_argument(
+        "--dry_run", action="store_true", help="Only list notes that would be resummarized."
+    )
+    parser.add_argument(
+        "--no_summary_cache", action="store_true",
+        help="Bypass the summary/title cache and always call the API.",
+    )
+    args = parser.parse_args()
+
+    try:
+        config = ConfigManager()
+        config.validate_required_settings()
+        
+        prompt_file_path = args.summary_prompt_file_path or config.summary_prompt_file_path
+        if not prompt_file_path:
+            raise ValueError("Summary prompt file is not specified (--summary_prompt_file_path or SUMMARY_PROMPT_FILE_PATH).")
+        with open(prompt_file_path, "r", encoding="utf-8") as f:
+            prompt_template = f.read()
+        
+        summary_cache = SummaryCache.from_config(config, bypass=args.no_summary_cache)
+        audio_processor = AudioProcessor(config, summary_cache, usage_ledger=UsageLedger.from_config(config))
+        file_manager = FileManager(config, SearchIndex.from_config(config))
+        rate_limiter = RateLimiter(args.requests_per_minute)
+        
+        transcripts = file_manager.get_archived_transcripts()
+        if not transcripts:
+            print(f"No archived transcripts found in {config.transcript_archive_dir}")
+            return
+        
+        print(f"Found {len(transcripts)} archived transcripts")
+        
+        results = {}
+        # ディレクトリの fsync は最後にまとめて実行
+        with file_manager.markdown_writer.batch(), \
+                concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {
+                executor.submit(
+                    resummarize_transcript, transcript_path, prompt_template,
+                    audio_processor, file_manager, rate_limiter, args.force, args.dry_run
+                ): transcript_path
+                for transcript_path in transcripts
+            }
+            for future in concurrent.futures.as_completed(futures):
+                transcript_path = futures[future]
+                try:
+                    status = future.result()
+                except Exception as e:
+                    status = "error"
+                    error_msg = f"Error resummarizing {transcript_path.name}: {e}"
+                    print(error_msg)
+                    file_manager.save_log(error_msg, "error")
+                results[status] = results.get(status, 0) + 1
+        
+        summary_line = ", ".join(f"{key}={value}" for key, value in sorted(results.items()))
+        print(f"\nResummarization completed: {summary_line}")
+        file_manager.save_log(f"Resummarization completed: {summary_line}", "info")
+        
+    except Exception as e:
+        print(f"Fatal error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
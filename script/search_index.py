@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+全文検索インデックス - 議事録と文字起こしのSQLite FTS5インデックス
+"""
+
+import argparse
+import concurrent.futures
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+from typing import Optional
+
+from config_manager import ConfigManager
+from file_manager import FileManager
+
+
+def _format_tags(tags) -> str:
+    """タグをインデックス用の文字列に変換"""
+    if isinstance(tags, (list, tuple)):
+        return " ".join(str(tag) for tag in tags)
+    return str(tags) if tags else ""
+
+
+def _load_note_document(markdown_path: str) -> Optional[tuple]:
+    """議事録ファイルを読み込みインデックス用の行を作成（並列再構築のワーカー用）"""
+    try:
+        with open(markdown_path, "r", encoding="utf-8") as f:
+            frontmatter, body = FileManager.split_frontmatter(f.read())
+    except Exception as e:
+        print(f"Warning: Could not read {markdown_path} for indexing: {e}")
+        return None
+    return (
+        str(markdown_path), "minutes",
+        str(frontmatter.get("title") or pathlib.Path(markdown_path).stem),
+        _format_tags(frontmatter.get("tags")),
+        str(frontmatter.get("recording_datetime") or ""),
+        body,
+    )
+
+
+def _load_transcript_document(transcript_path: str) -> Optional[tuple]:
+    """文字起こしファイルを読み込みインデックス用の行を作成（並列再構築のワーカー用）"""
+    try:
+        with open(transcript_path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except Exception as e:
+        print(f"Warning: Could not read {transcript_path} for indexing: {e}")
+        return None
+    return (str(transcript_path), "transcript", pathlib.Path(transcript_path).stem, "", "", text)
+
+
+class SearchIndex:
+    """議事録・文字起こしの全文検索インデックス（trigramトークナイザで日本語に対応）
+
+    FTS5 の UNINDEXED 列での検索は全件走査になるため、パスから FTS の rowid への対応を
+    通常のテーブル（docs）に保持し、更新時は rowid で削除する。
+    """
+
+    # trigram トークナイザは3文字未満の語をインデックス検索できない
+    MIN_FTS_QUERY_LENGTH = 3
+    # bm25 の列ごとの重み（path, kind, title, tags, recording_datetime, body）
+    BM25_WEIGHTS = (0.0, 0.0, 10.0, 5.0, 2.0, 1.0)
+
+    def __init__(self, index_path: str):
+        """初期化"""
+        self.index_path = pathlib.Path(index_path)
+        self._lock = threading.Lock()
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS notes USING fts5("
+            " path UNINDEXED, kind UNINDEXED, title, tags, recording_datetime, body,"
+            " tokenize = 'trigram')"
+        )
+        has_docs = self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'docs'"
+        ).fetchone() is not None
+        self._connection.execute("CREATE TABLE IF NOT EXISTS docs (path TEXT PRIMARY KEY, doc_rowid INTEGER NOT NULL)")
+        if not has_docs:
+            # 対応表のない既存のインデックスは一度だけ対応表を作成
+            self._connection.execute("INSERT OR REPLACE INTO docs (path, doc_rowid) SELECT path, rowid FROM notes")
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: ConfigManager) -> Optional["SearchIndex"]:
+        """設定からインデックスを作成（無効化・FTS5非対応の場合は None）"""
+        if not config.search_index_enabled:
+            return None
+        try:
+            return cls(config.search_index_path)
+        except sqlite3.Error as e:
+            print(f"Warning: Could not open search index {config.search_index_path}: {e}")
+            return None
+
+    def _upsert(self, document: tuple):
+        """1件のドキュメントを置き換え登録（ロック取得済みで呼び出す）"""
+        row = self._connection.execute("SELECT doc_rowid FROM docs WHERE path = ?", (document[0],)).fetchone()
+        if row is not None:
+            self._connection.execute("DELETE FROM notes WHERE rowid = ?", row)
+        cursor = self._connection.execute(
+            "INSERT INTO notes (path, kind, title, tags, recording_datetime, body) VALUES (?, ?, ?, ?, ?, ?)",
+            document
+        )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO docs (path, doc_rowid) VALUES (?, ?)", (document[0], cursor.lastrowid)
+        )
+
+    def index_note(self, markdown_path: str, frontmatter: dict, body: str):
+        """議事録をインデックスに登録・更新"""
+        document = (
+            str(markdown_path), "minutes",
+            str(frontmatter.get("title") or pathlib.Path(markdown_path).stem),
+            _format_tags(frontmatter.get("tags")),
+            str(frontmatter.get("recording_datetime") or ""),
+            body,
+        )
+        with self._lock:
+            self._upsert(document)
+            self._connection.commit()
+
+    def index_transcript(self, transcript_path: str, transcription_text: str):
+        """文字起こしをインデックスに登録・更新"""
+        document = (str(transcript_path), "transcript", pathlib.Path(transcript_path).stem, "", "", transcription_text)
+        with self._lock:
+            self._upsert(document)
+            self._connection.commit()
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """検索してスコア順のヒットを返す"""
+        terms = query.split()
+        if not terms:
+            return []
+
+        columns = "path, kind, title, recording_datetime"
+        if all(len(term) >= self.MIN_FTS_QUERY_LENGTH for term in terms):
+            match_query = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+            weights = ", ".join(str(weight) for weight in self.BM25_WEIGHTS)
+            sql = (
+                f"SELECT {columns}, snippet(notes, 5, '[', ']', '…', 16), bm25(notes, {weights}) AS score"
+                " FROM notes WHERE notes MATCH ? ORDER BY score LIMIT ?"
+            )
+            params = (match_query, limit)
+        else:
+            # 短い語はインデックスを使わない部分一致検索にフォールバック
+            conditions = " AND ".join("(title LIKE ? OR tags LIKE ? OR body LIKE ?)" for _ in terms)
+            sql = (
+                f"SELECT {columns}, substr(body, 1, 80), 0.0 AS score"
+                f" FROM notes WHERE {conditions} ORDER BY recording_datetime DESC LIMIT ?"
+            )
+            params = tuple(f"%{term}%" for term in terms for _ in range(3)) + (limit,)
+
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [
+            {"path": row[0], "kind": row[1], "title": row[2], "recording_datetime": row[3],
+             "snippet": row[4], "score": row[5]}
+            for row in rows
+        ]
+
+    def rebuild(self, markdown_dir: str, transcript_dir: Optional[str] = None, workers: int = 4) -> int:
+        """既存の議事録・文字起こしからインデックスを並列で再構築"""
+        markdown_paths = [str(path) for path in pathlib.Path(markdown_dir).glob("*.md")]
+        transcript_paths = []
+        if transcript_dir and pathlib.Path(transcript_dir).exists():
+            transcript_paths = [str(path) for path in pathlib.Path(transcript_dir).glob("*.txt")]
+
+        documents = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            documents.extend(executor.map(_load_note_document, markdown_paths, chunksize=64))
+            documents.extend(executor.map(_load_transcript_document, transcript_paths, chunksize=64))
+        documents = [document for document in documents if document is not None]
+
+        with self._lock:
+            self._connection.execute("DELETE FROM notes")
+            self._connection.execute("DELETE FROM docs")
+            self._connection.executemany(
+                "INSERT INTO notes (path, kind, title, tags, recording_datetime, body) VALUES (?, ?, ?, ?, ?, ?)",
+                documents
+            )
+            self._connection.execute("INSERT INTO docs (path, doc_rowid) SELECT path, rowid FROM notes")
+            self._connection.execute("INSERT INTO notes (notes) VALUES ('optimize')")
+            self._connection.commit()
+        return len(documents)
+
+    def close(self):
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._connection.close()
+
+
+def main():
+    """検索・再構築コマンド"""
+    parser = argparse.ArgumentParser(description="Full-text search over generated minutes and transcripts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search_parser = subparsers.add_parser("search", help="Search the index.")
+    search_parser.add_argument("query", help="Search words (space separated, all must match).")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of hits.")
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild the index from MARKDOWN_OUTPUT_DIR.")
+    rebuild_parser.add_argument("--workers", type=int, default=4, help="Number of parallel parser processes.")
+    args = parser.parse_args()
+
+    config = ConfigManager()
+    search_index = SearchIndex(config.search_index_path)
+
+    if args.command == "rebuild":
+        if not config.markdown_output_dir:
+            print("Error: MARKDOWN_OUTPUT_DIR is not set.")
+            sys.exit(1)
+        start_time = time.perf_counter()
+        count = search_index.rebuild(config.markdown_output_dir, config.transcript_archive_dir, args.workers)
+        print(f"Indexed {count} documents in {time.perf_counter() - start_time:.2f}s: {config.search_index_path}")
+        return
+
+    start_time = time.perf_counter()
+    hits = search_index.search(args.query, args.limit)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    for hit in hits:
+        print(f"{hit['recording_datetime'] or '-':19}  [{hit['kind']}] {hit['title']}")
+        print(f"    {hit['path']}")
+        print(f"    {hit['snippet'].replace(chr(10), ' ')}")
+    print(f"{len(hits)} hits in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
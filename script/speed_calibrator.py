@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+倍速の自動調整 - 録音の一部を複数の倍速で文字起こしし、最も遅い倍速との一致度から録音ごとの倍速を選択
+"""
+
+import difflib
+import json
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from pydub import AudioSegment
+
+from config_manager import ConfigManager
+
+# 一致度の計算で無視する文字（空白・句読点・記号）
+NORMALIZE_PATTERN = re.compile(r"[\W_]+")
+
+
+def transcription_agreement(reference: str, text: str) -> float:
+    """2つの文字起こしの一致度（0.0〜1.0、空白・句読点を除いた文字単位）"""
+    reference = NORMALIZE_PATTERN.sub("", reference)
+    text = NORMALIZE_PATTERN.sub("", text)
+    if not reference or not text:
+        return 0.0
+    return difflib.SequenceMatcher(None, reference, text, autojunk=False).ratio()
+
+
+class SpeedCalibrator:
+    """録音ごとの倍速の選択と、内容ハッシュ・モデルごとの結果の保存
+
+    録音全体から等間隔に sample_count 箇所（各 sample_s 秒）を切り出してつなげたサンプルを、
+    候補の倍速の遅い順に文字起こしする。最も遅い倍速の結果との一致度が min_agreement 以上の
+    最も速い倍速を選択する（一致度が下回った時点で、より速い倍速は試さない）。
+    """
+
+    SAMPLE_GAP_MS = 500  # サンプル同士の間に挟む無音
+    SILENT_SAMPLE_DB = 16  # 録音全体の平均音量からこれだけ小さいサンプルは使わない
+
+    def __init__(self, db_path: str, candidates: tuple = (1.5, 2.0, 2.5, 3.0), sample_s: float = 30.0,
+                 sample_count: int = 3, min_agreement: float = 0.85, min_duration_s: float = 1800.0):
+        """初期化"""
+        self.candidates = tuple(sorted(set(candidates)))
+        if len(self.candidates) < 2:
+            raise ValueError("SPEED_CALIBRATION_CANDIDATES needs at least two speeds.")
+        self.sample_ms = int(sample_s * 1000)
+        self.sample_count = max(1, sample_count)
+        self.min_agreement = min_agreement
+        self.min_duration_ms = int(min_duration_s * 1000)
+        self._lock = threading.Lock()
+
+        if db_path != ":memory:":
+            pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS calibrations ("
+            " content_hash TEXT NOT NULL,"
+            " model_name TEXT NOT NULL,"
+            " speed_multiplier REAL NOT NULL,"
+            " scores TEXT NOT NULL,"
+            " calibrated_at REAL NOT NULL,"
+            " PRIMARY KEY (content_hash, model_name))"
+        )
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: ConfigManager) -> Optional["SpeedCalibrator"]:
+        """設定から作成（無効の場合は None）"""
+        if not config.speed_calibration_enabled:
+            return None
+        candidates = tuple(float(value) for value in config.speed_calibration_candidates.split(",") if value.strip())
+        return cls(
+            config.speed_calibration_path, candidates=candidates, sample_s=config.speed_calibration_sample_s,
+            sample_count=config.speed_calibration_samples, min_agreement=config.speed_calibration_min_agreement,
+            min_duration_s=config.speed_calibration_min_duration_s,
+        )
+
+    def lookup(self, content_hash: str, model_name: str) -> Optional[Tuple[float, dict]]:
+        """保存済みの (倍速, 倍速ごとの一致度) を取得"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT speed_multiplier, scores FROM calibrations WHERE content_hash = ? AND model_name = ?",
+                (content_hash, model_name)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def store(self, content_hash: str, model_name: str, speed_multiplier: float, scores: dict):
+        """倍速の選択結果を保存"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO calibrations (content_hash, model_name, speed_multiplier, scores, calibrated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (content_hash, model_name, speed_multiplier, json.dumps(scores), time.time())
+            )
+            self._connection.commit()
+
+    def should_calibrate(self, audio: AudioSegment) -> bool:
+        """調整の費用に見合う長さの録音か"""
+        return len(audio) >= self.min_duration_ms
+
+    def build_sample(self, audio: AudioSegment) -> Optional[AudioSegment]:
+        """録音全体から等間隔に切り出したサンプルをつなげる（ほぼ無音の箇所は除く）"""
+        duration_ms = len(audio)
+        sample_ms = min(self.sample_ms, duration_ms // self.sample_count)
+        if sample_ms <= 0 or audio.dBFS == float("-inf"):
+            return None
+        threshold = audio.dBFS - self.SILENT_SAMPLE_DB
+        gap = AudioSegment.silent(duration=self.SAMPLE_GAP_MS, frame_rate=audio.frame_rate)
+        sample = None
+        for index in range(1, self.sample_count + 1):
+            start_ms = max(0, duration_ms * index // (self.sample_count + 1) - sample_ms // 2)
+            segment = audio[start_ms:start_ms + sample_ms]
+            if segment.dBFS < threshold:
+                continue
+            sample = segment if sample is None else sample + gap + segment
+        return sample
+
+    def calibrate(self, sample: AudioSegment, transcribe: Callable[[AudioSegment, float], str]) -> Tuple[Optional[float], dict]:
+        """サンプルを候補の倍速で文字起こしし、(選択した倍速, 倍速ごとの一致度) を返す
+
+        transcribe(サンプル, 倍速) は文字起こし結果を返す（失敗時は例外）。
+        最も遅い倍速で文字起こしできなかった場合、倍速は None。
+        """
+        reference_speed = self.candidates[0]
+        try:
+            reference = transcribe(sample, reference_speed)
+        except Exception as e:
+            print(f"Warning: Speed calibration failed at {reference_speed}x: {e}")
+            return None, {}
+        if not NORMALIZE_PATTERN.sub("", reference):
+            return None, {}
+
+        chosen = reference_speed
+        scores = {str(reference_speed): 1.0}
+        for speed in self.candidates[1:]:
+            try:
+                score = transcription_agreement(reference, transcribe(sample, speed))
+            except Exception as e:
+                print(f"Warning: Speed calibration failed at {speed}x: {e}")
+                score = 0.0
+            scores[str(speed)] = round(score, 4)
+            print(f"Speed calibration: {speed}x agreement with {reference_speed}x = {score:.3f}")
+            if score < self.min_agreement:
+                break
+            chosen = speed
+        return chosen, scores
+
+    def close(self):
+        """データベースを閉じる"""
+        with self._lock:
+            self._connection.close()
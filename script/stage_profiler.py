@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+ステージ別プロファイラ - --profile 指定時にステージごとの cProfile と tracemalloc を収集
+"""
+
+import contextlib
+import cProfile
+import io
+import pathlib
+import pstats
+import re
+import tracemalloc
+
+# プロファイラ自身によるメモリ確保はレポートから除外する
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, contextlib.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+class StageProfiler:
+    """名前付きスパンごとに cProfile の統計とメモリ確保の差分を収集するクラス
+
+    同名のスパンは1つの cProfile.Profile に合算する。スパンが入れ子になった場合は
+    外側のプロファイラを一時停止し、内側のスパンの時間は内側にのみ計上する。
+    """
+
+    def __init__(self, top_n: int = 25, traceback_limit: int = 1):
+        """初期化"""
+        self.top_n = top_n
+        self._profiles = {}
+        self._allocations = {}
+        self._stack = []
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(traceback_limit)
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """スパン内の処理をプロファイル"""
+        if self._stack:
+            self._stack[-1].disable()
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        before = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        tracemalloc.reset_peak()
+        start_size = tracemalloc.get_traced_memory()[0]
+        self._stack.append(profile)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._stack.pop()
+            peak = tracemalloc.get_traced_memory()[1]
+            after = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+            self._record_allocations(name, before, after, peak - start_size)
+            if self._stack:
+                self._stack[-1].enable()
+
+    def _record_allocations(self, name: str, before, after, peak_growth: int):
+        """スパン前後のスナップショット差分を集計（同名スパンは合算）"""
+        entry = self._allocations.setdefault(name, {"count": 0, "peak_growth": 0, "lines": {}})
+        entry["count"] += 1
+        entry["peak_growth"] = max(entry["peak_growth"], peak_growth)
+        for stat in after.compare_to(before, "lineno"):
+            if stat.size_diff == 0:
+                continue
+            line = str(stat.traceback[0])
+            size_diff, count_diff = entry["lines"].get(line, (0, 0))
+            entry["lines"][line] = (size_diff + stat.size_diff, count_diff + stat.count_diff)
+
+    def allocation_report(self) -> str:
+        """ステージごとのメモリ確保の上位N件をテキストで作成"""
+        lines = []
+        for name, entry in self._allocations.items():
+            lines.append(
+                f"== {name} (calls={entry['count']}, peak growth={entry['peak_growth'] / 1024 / 1024:.1f} MiB)"
+            )
+            ranked = sorted(entry["lines"].items(), key=lambda item: -abs(item[1][0]))[:self.top_n]
+            for line, (size_diff, count_diff) in ranked:
+                lines.append(f"{size_diff / 1024:>+12.1f} KiB {count_diff:>+9d} blocks  {line}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def dump(self, output_dir) -> pathlib.Path:
+        """ステージ別の .pstats、全体の combined.pstats、メモリ確保レポートを書き出し"""
+        output_dir = pathlib.Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        combined = None
+        summary = io.StringIO()
+        for name, profile in self._profiles.items():
+            stage_file = re.sub(r"[^\w.-]", "_", name)
+            profile.dump_stats(str(output_dir / f"{stage_file}.pstats"))
+            stats = pstats.Stats(profile, stream=summary)
+            summary.write(f"== {name}\n")
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            if combined is None:
+                combined = pstats.Stats(profile)
+            else:
+                combined.add(profile)
+        if combined is not None:
+            combined.dump_stats(str(output_dir / "combined.pstats"))
+
+        with open(output_dir / "cpu_top.txt", "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        with open(output_dir / "allocations.txt", "w", encoding="utf-8") as f:
+            f.write(self.allocation_report())
+        return output_dir
+
+    def close(self):
+        """自分で開始した tracemalloc を停止"""
+        if self._started_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracemalloc = False
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+要約キャッシュクラス - 要約・タイトル生成結果の永続キャッシュ
+"""
+
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class SummaryCache:
+    """要約・タイトル生成結果をSQLiteに保存するLRUキャッシュ"""
+    
+    def __init__(self, cache_path: str, max_entries: int = 1000):
+        """初期化"""
+        self.cache_path = pathlib.Path(cache_path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS summary_cache ("
+            " cache_key TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_summary_cache_last_access ON summary_cache (last_access)"
+        )
+        self._connection.commit()
+    
+    @classmethod
+    def from_config(cls, config, bypass: bool = False) -> Optional["SummaryCache"]:
+        """設定からキャッシュを作成（無効化されている場合は None）"""
+        if bypass or not config.summary_cache_enabled:
+            print("Summary cache is disabled.")
+            return None
+        try:
+            return cls(config.summary_cache_path, config.summary_cache_max_entries)
+        except sqlite3.Error as e:
+            print(f"Warning: Could not open summary cache {config.summary_cache_path}: {e}")
+            return None
+    
+    def get(self, cache_key: str) -> Optional[str]:
+        """キャッシュから値を取得（ヒット時は最終アクセス時刻を更新）"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM summary_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE summary_cache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key)
+            )
+            self._connection.commit()
+            return row[0]
+    
+    def put(self, cache_key: str, kind: str, value: str):
+        """キャッシュに値を保存し、上限を超えた古いエントリを削除"""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO summary_cache (cache_key, kind, value, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (cache_key, kind, value, now, now)
+            )
+            self._evict()
+            self._connection.commit()
+    
+    def _evict(self):
+        """最終アクセスが古い順に上限を超えたエントリを削除"""
+        count = self._connection.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM summary_cache WHERE cache_key IN ("
+                " SELECT cache_key FROM summary_cache ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            print(f"Evicted {excess} old entries from summary cache")
+    
+    def close(self):
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._connection.close()
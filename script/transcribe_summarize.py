@@ -4,45 +4,357 @@
 """
 
 import argparse
+import concurrent.futures
 import sys
 import pathlib
 import datetime
+from typing import Optional
 
 from config_manager import ConfigManager
 from audio_processor import AudioProcessor
+from gemini_client import GeminiClient
+from uploaded_files import UploadedFileManager
 from file_manager import FileManager
+from summary_cache import SummaryCache
+from search_index import SearchIndex
+from speed_calibrator import SpeedCalibrator
+from archive_manager import ArchiveManager
 from daily_note_utils import add_link_to_daily_note
+from processing_record import ProcessingRecord, JsonlAppender
+from stage_profiler import StageProfiler
+from lease_manager import Lease, LeaseManager
+from usage_ledger import UsageLedger
+from budget_governor import BudgetGovernor, GovernorDecision
+from batch_backend import (
+    JOB_FAILED, BatchBackend, BatchJobNotFoundError, BatchJobStore, create_batch_backend, wait_for_job
+)
+
+
+def process_audio_file(audio_file: pathlib.Path, prompt_template: str, config: ConfigManager,
+                       audio_processor: AudioProcessor, file_manager: FileManager,
+                       processed_log: JsonlAppender, profile_dir: Optional[pathlib.Path] = None,
+                       lease: Optional[Lease] = None, governor_decision: Optional[GovernorDecision] = None) -> bool:
+    """1つの音声ファイルを処理し、処理記録をJSONLに追記（profile_dir 指定時はプロファイルも出力）"""
+    print(f"\n--- Processing file: {audio_file.name} ---")
+    
+    record = ProcessingRecord(str(audio_file))
+    if governor_decision is not None:
+        # バッチモードでは全ファイルの設定を先に決めるため、このファイルの設定を適用し直す
+        governor_decision.apply_to(audio_processor)
+        record.governor = governor_decision.to_dict()
+    if profile_dir is not None:
+        record.profiler = StageProfiler()
+    audio_processor.record = record
+    metrics_before = audio_processor.metrics.copy()
+    timings_before = len(audio_processor.call_timings)
+    
+    try:
+        with record.stage("hash"):
+            record.source_hash = file_manager.compute_file_hash(str(audio_file))
+        
+        # 一時ディレクトリの作成
+        temp_dir = file_manager.create_temp_chunk_directory(str(audio_file))
+        
+        # 録音日時の抽出
+        recording_datetime = audio_processor.extract_recording_datetime_from_filename(
+            audio_file.name
+        )
+        
+        # 文字起こし
+        transcription = audio_processor.transcribe_audio(
+            str(audio_file), temp_dir
+        )
+        
+        # 要約（コンテキストファイルは1回だけ読み込み、要約と入力ハッシュの両方に使う）
+        context_files = config.get_context_files()
+        with record.stage("summarize"):
+            summary = audio_processor.summarize_text(
+                transcription, prompt_template, recording_datetime,
+                draft_path=temp_dir / "summary_draft.md", context_files=context_files
+            )
+        
+        # ファイル名生成
+        with record.stage("title"):
+            filename_suggestion = audio_processor.generate_filename_from_summary(summary)
+        if not filename_suggestion:
+            filename_suggestion = f"summary_{audio_file.stem}"
+        
+        # リースを失った場合は他のワーカーが処理しているため保存しない
+        if lease is not None and lease.lost:
+            raise RuntimeError(f"Lease for {audio_file.name} was lost; another worker took over the file.")
+        
+        with record.stage("save"):
+            # Markdownファイルの保存（再要約判定用に入力ハッシュを記録）
+            summary_hash = audio_processor.compute_summary_hash(transcription, prompt_template, context_files)
+            markdown_path = file_manager.save_markdown(
+                summary, filename_suggestion, recording_datetime,
+                extra_frontmatter={"source_audio": audio_file.name, "summary_hash": summary_hash}
+            )
+            
+            # 文字起こし結果のアーカイブ（再要約ツール用）
+            file_manager.save_transcript(transcription, markdown_path)
+        record.output_markdown = pathlib.Path(markdown_path).name
+        
+        # デイリーノートへのリンク追加
+        if config.obsidian_daily_notes_dir:
+            with record.stage("daily_note"):
+                add_link_to_daily_note(markdown_path, recording_datetime)
+        
+        # 処理済みファイルの移動
+        if config.processed_files_dir:
+            with record.stage("move"):
+                file_manager.move_processed_file(
+                    str(audio_file), config.processed_files_dir, record.source_hash
+                )
+        
+        # ログ記録
+        file_manager.save_log(
+            f"Successfully processed {audio_file.name} -> {pathlib.Path(markdown_path).name}",
+            "info"
+        )
+        
+        print(f"Successfully processed: {audio_file.name}")
+        
+        # 一時ディレクトリのクリーンアップ（失敗時は途中結果を再開用に残す）
+        file_manager.cleanup_temp_directory(temp_dir)
+        record.finish("success")
+        return True
+        
+    except Exception as e:
+        error_msg = f"Error processing {audio_file.name}: {e}"
+        print(error_msg)
+        file_manager.save_log(error_msg, "error")
+        record.finish("error", str(e))
+        return False
+    
+    finally:
+        audio_processor.record = None
+        record.counters = audio_processor.metrics - metrics_before
+        record.call_timings = audio_processor.call_timings[timings_before:]
+        try:
+            processed_log.append(record.to_dict())
+        except (IOError, TypeError, ValueError) as e:
+            print(f"Warning: Failed to write processing record: {e}")
+        if record.profiler is not None:
+            try:
+                stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_dir = record.profiler.dump(profile_dir / f"{audio_file.stem}_{stamp}")
+                print(f"Profile written to: {output_dir}")
+            except (IOError, OSError) as e:
+                print(f"Warning: Failed to write profile: {e}")
+            finally:
+                record.profiler.close()
 
 
+def _process_files(audio_files: list, prompt_template: str, config: ConfigManager, audio_processor: AudioProcessor,
+                   file_manager: FileManager, processed_log: JsonlAppender, lease_manager: Optional[LeaseManager],
+                   budget_governor: Optional[BudgetGovernor], profile_dir: Optional[pathlib.Path] = None):
+    """音声ファイルを1つずつ処理"""
+    # ディレクトリの fsync は最後にまとめて実行
+    with file_manager.markdown_writer.batch():
+        for audio_file in audio_files:
+            lease = None
+            if lease_manager is not None:
+                # 他のワーカーが処理中・処理済みのファイルはスキップ
+                lease = lease_manager.acquire(audio_file.name)
+                if lease is None:
+                    print(f"Skipping {audio_file.name}: leased by another worker.")
+                    continue
+                if not audio_file.exists():
+                    lease_manager.release(lease)
+                    continue
+            try:
+                governor_decision = None
+                if budget_governor is not None:
+                    # 予算の消化率に応じて処理設定を調整（予算超過時は低優先度のファイルを後回し）
+                    governor_decision = budget_governor.apply(audio_processor, audio_file.name)
+                    if governor_decision is None:
+                        file_manager.save_log(f"Deferred {audio_file.name}: monthly budget exceeded", "info")
+                        continue
+                process_audio_file(
+                    audio_file, prompt_template, config, audio_processor, file_manager, processed_log,
+                    profile_dir, lease, governor_decision
+                )
+            finally:
+                if lease is not None:
+                    lease_manager.release(lease)
 
 
+def _submit_batch_job(phase: str, entries: list, backend: BatchBackend, job_store: BatchJobStore,
+                      audio_processor: AudioProcessor):
+    """リクエストをまとめて1つのジョブとして投入し、再開用にジョブ情報を保存
 
+    entries は (リクエスト, 結果の保存先, アップロード名またはNone) のリスト。
+    """
+    uploads = [upload_name for _, _, upload_name in entries if upload_name]
+    try:
+        job_id = backend.submit(
+            [request for request, _, _ in entries],
+            f"applaud-{phase}-{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        )
+    except Exception:
+        _delete_batch_uploads(uploads, audio_processor)
+        raise
+    job_store.save(phase, {
+        "backend": backend.name,
+        "job_id": job_id,
+        "submitted_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "targets": {request.key: str(target) for request, target, _ in entries},
+        # リクエストごとのモデル（ファイルごとに予算ガバナーの設定が異なる場合がある）
+        "models": {request.key: request.model_name for request, _, _ in entries},
+        "uploads": uploads,
+    })
+    audio_processor.metrics["batch_jobs_submitted"] += 1
+    audio_processor.metrics["batch_requests_submitted"] += len(entries)
+    print(f"Submitted batch job {job_id} ({phase}, {len(entries)} requests)")
+
+
+def _delete_batch_uploads(uploads: list, audio_processor: AudioProcessor):
+    """バッチ用にアップロードしたファイルを削除"""
+    for upload_name in uploads:
+        try:
+            audio_processor.client.delete_file(upload_name)
+            audio_processor.metrics["api_delete_calls"] += 1
+        except Exception as e:
+            print(f"Warning: Failed to delete uploaded file {upload_name}: {e}")
+
+
+def _collect_batch_job(phase: str, backend: BatchBackend, job_store: BatchJobStore,
+                       audio_processor: AudioProcessor, config: ConfigManager) -> bool:
+    """このワーカーのジョブ（終了したワーカーから引き継いだジョブを含む）の完了を待って結果を適用（期限内に完了しなかった場合は False）"""
+    for job in job_store.claim(phase):
+        if job.get("backend") != backend.name:
+            print(f"Warning: Discarding {phase} batch job {job.get('job_id')} submitted to the '{job.get('backend')}' backend.")
+            job_store.clear(phase, job)
+            continue
+
+        results = {}
+        try:
+            state = wait_for_job(backend, job["job_id"], config.batch_poll_interval_s, config.batch_timeout_s)
+            if state == JOB_FAILED:
+                print(f"Warning: Batch job {job['job_id']} failed; unfinished requests will be processed interactively.")
+            results = backend.fetch_results(job["job_id"])
+        except BatchJobNotFoundError as e:
+            print(f"Warning: {e}; unfinished requests will be processed interactively.")
+        except TimeoutError as e:
+            print(f"{e}. Run again with --batch to collect the results.")
+            return False
+
+        models = job.get("models", {})
+        for key, target in job["targets"].items():
+            if phase == "transcribe":
+                audio_processor.apply_batch_transcription(
+                    results.get(key), pathlib.Path(target), backend.cost_ratio, models.get(key)
+                )
+            else:
+                audio_processor.apply_batch_summary(results.get(key), target, backend.cost_ratio, models.get(key))
+        _delete_batch_uploads(job["uploads"], audio_processor)
+        job_store.clear(phase, job)
+    return True
+
+
+def run_batch(audio_files: list, prompt_template: str, config: ConfigManager, audio_processor: AudioProcessor,
+              file_manager: FileManager, processed_log: JsonlAppender, lease_manager: Optional[LeaseManager],
+              budget_governor: Optional[BudgetGovernor], profile_dir: Optional[pathlib.Path] = None):
+    """バックログの文字起こしと要約をそれぞれ1つのバッチジョブとして投入し、完了後に通常の保存処理を実行
+
+    バッチの結果は通常処理のキャッシュ（チャンクの文字起こし・要約キャッシュ）に保存するため、
+    保存処理では結果を再利用し、得られなかったチャンク・要約だけを通常のAPI呼び出しで処理する。
+    要約とファイル名は1回のリクエストでまとめて生成する。
+    """
+    backend = create_batch_backend(config, audio_processor.client)
+    job_store = BatchJobStore.from_config(config)
+    print(f"Batch mode: using the '{backend.name}' backend")
+
+    targets = []
+    try:
+        for audio_file in audio_files:
+            lease = None
+            if lease_manager is not None:
+                lease = lease_manager.acquire(audio_file.name)
+                if lease is None:
+                    print(f"Skipping {audio_file.name}: leased by another worker.")
+                    continue
+                if not audio_file.exists():
+                    lease_manager.release(lease)
+                    continue
+            governor_decision = None
+            if budget_governor is not None:
+                governor_decision = budget_governor.apply(audio_processor, audio_file.name)
+                if governor_decision is None:
+                    file_manager.save_log(f"Deferred {audio_file.name}: monthly budget exceeded", "info")
+                    if lease is not None:
+                        lease_manager.release(lease)
+                    continue
+            targets.append((audio_file, lease, governor_decision))
+
+        # 1. 文字起こし（前回中断したジョブがあれば先に回収）
+        if not _collect_batch_job("transcribe", backend, job_store, audio_processor, config):
+            return
+        upload_futures = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=config.upload_parallelism) as upload_executor:
+            for audio_file, _, governor_decision in targets:
+                if governor_decision is not None:
+                    governor_decision.apply_to(audio_processor)
+                temp_dir = file_manager.create_temp_chunk_directory(str(audio_file))
+                try:
+                    upload_futures.extend(audio_processor.build_batch_transcription_requests(
+                        str(audio_file), temp_dir, upload_executor
+                    ))
+                except Exception as e:
+                    print(f"Warning: Could not prepare batch transcription for {audio_file.name}: {e}")
+        entries = audio_processor.collect_batch_uploads(upload_futures)
+        if entries:
+            _submit_batch_job("transcribe", entries, backend, job_store, audio_processor)
+            if not _collect_batch_job("transcribe", backend, job_store, audio_processor, config):
+                return
+
+        # 2. 要約とファイル名（結果は要約キャッシュ経由で保存処理に渡す）
+        if audio_processor.summary_cache is None:
+            print("Summary cache is disabled; summaries will be generated interactively.")
+        else:
+            if not _collect_batch_job("summarize", backend, job_store, audio_processor, config):
+                return
+            entries = []
+            for audio_file, _, governor_decision in targets:
+                if governor_decision is not None:
+                    governor_decision.apply_to(audio_processor)
+                # バッチで得られた文字起こしだけを使う（未完了のチャンクがある録音は保存処理で文字起こし後に要約）
+                transcription = audio_processor.read_cached_transcription(str(audio_file))
+                if transcription is None:
+                    continue
+                try:
+                    recording_datetime = audio_processor.extract_recording_datetime_from_filename(audio_file.name)
+                    prepared = audio_processor.build_batch_summary_request(
+                        f"{audio_file.name}|summary", transcription, prompt_template, recording_datetime
+                    )
+                except Exception as e:
+                    print(f"Warning: Could not prepare batch summary for {audio_file.name}: {e}")
+                    continue
+                if prepared is not None:
+                    request, cache_key = prepared
+                    entries.append((request, cache_key, None))
+            if entries:
+                _submit_batch_job("summarize", entries, backend, job_store, audio_processor)
+                if not _collect_batch_job("summarize", backend, job_store, audio_processor, config):
+                    return
+
+        # 3. 保存・デイリーノート・移動（バッチで得られなかった部分は通常処理）
+        with file_manager.markdown_writer.batch():
+            for audio_file, lease, governor_decision in targets:
+                process_audio_file(
+                    audio_file, prompt_template, config, audio_processor, file_manager, processed_log,
+                    profile_dir, lease, governor_decision
+                )
+    finally:
+        if lease_manager is not None:
+            for _, lease, _ in targets:
+                if lease is not None:
+                    lease_manager.release(lease)
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-def main():
-    """メイン処理関数"""
+def main(argv: Optional[list] = None, client=None):
+    """メイン処理関数（client を指定するとAPIクライアントを差し替える）"""
     parser = argparse.ArgumentParser(
         description="Transcribe and summarize audio files in a directory."
     )
@@ -64,7 +376,19 @@ def main():
     parser.add_argument(
         "--processed_log_file_path", required=True, help="Path to the JSONL log file."
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--no_summary_cache", action="store_true",
+        help="Bypass the summary/title cache and always call the API.",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Collect per-stage cProfile stats and allocation reports into a 'profiles' directory next to the log.",
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Submit transcription and summary requests for all files as bulk jobs, then save the results.",
+    )
+    args = parser.parse_args(argv)
 
     try:
         # 設定管理の初期化
@@ -72,88 +396,79 @@ def main():
         config.validate_required_settings()
         
         # クラスの初期化
-        audio_processor = AudioProcessor(config)
-        file_manager = FileManager(config)
-        
-        # 処理ディレクトリの設定
-        processing_dir = pathlib.Path(args.audio_processing_dir)
-        
-        # 音声ファイルの取得
-        audio_files = file_manager.get_audio_files(str(processing_dir))
-        
-        if not audio_files:
-            print(f"No audio files found in {processing_dir}")
-            return
-        
-        print(f"Found {len(audio_files)} audio files to process")
-        
-        # プロンプトテンプレートの読み込み
-        with open(args.summary_prompt_file_path, "r", encoding="utf-8") as f:
-            prompt_template = f.read()
-        
-        # 各音声ファイルの処理
-        for audio_file in audio_files:
-            print(f"\n--- Processing file: {audio_file.name} ---")
+        summary_cache = SummaryCache.from_config(config, bypass=args.no_summary_cache)
+        usage_ledger = UsageLedger.from_config(config)
+        # アップロードしたファイルは台帳に記録し、削除はバックグラウンドで行う（前回の残りも削除）
+        uploaded_files = UploadedFileManager.from_config(
+            config, client if client is not None else GeminiClient.from_config(config)
+        )
+        try:
+            uploaded_files.sweep_orphans(keep=BatchJobStore.from_config(config).referenced_uploads())
+            audio_processor = AudioProcessor(
+                config, summary_cache, uploaded_files, usage_ledger, SpeedCalibrator.from_config(config)
+            )
+            budget_governor = BudgetGovernor.from_config(config, usage_ledger, audio_processor.model_name)
+            archive_manager = ArchiveManager.from_config(config)
+            file_manager = FileManager(config, SearchIndex.from_config(config), archive_manager)
+            
+            # 処理ディレクトリの設定
+            processing_dir = pathlib.Path(args.audio_processing_dir)
             
+            # 音声ファイルの取得
+            audio_files = file_manager.get_audio_files(str(processing_dir))
+            
+            if not audio_files:
+                print(f"No audio files found in {processing_dir}")
+                return
+            
+            print(f"Found {len(audio_files)} audio files to process")
+            
+            # プロンプトテンプレートの読み込み
+            with open(args.summary_prompt_file_path, "r", encoding="utf-8") as f:
+                prompt_template = f.read()
+            
+            # 各音声ファイルの処理（ファイルごとの処理記録をJSONLに追記）
+            processed_log = JsonlAppender(args.processed_log_file_path)
+            profile_dir = None
+            if args.profile:
+                profile_dir = pathlib.Path(args.processed_log_file_path).parent / "profiles"
+            lease_manager = LeaseManager.from_config(config, processing_dir)
             try:
-                # 一時ディレクトリの作成
-                temp_dir = file_manager.create_temp_chunk_directory(str(audio_file))
-                
-                # 録音日時の抽出
-                recording_datetime = audio_processor.extract_recording_datetime_from_filename(
-                    audio_file.name
-                )
-                
-                # 文字起こし
-                transcription = audio_processor.transcribe_audio(
-                    str(audio_file), temp_dir
-                )
-                
-                # 要約
-                summary = audio_processor.summarize_text(
-                    transcription, prompt_template, recording_datetime
-                )
-                
-                # ファイル名生成
-                filename_suggestion = audio_processor.generate_filename_from_summary(summary)
-                if not filename_suggestion:
-                    filename_suggestion = f"summary_{audio_file.stem}"
-                
-                # Markdownファイルの保存
-                markdown_path = file_manager.save_markdown(
-                    summary, filename_suggestion, recording_datetime
-                )
-                
-                # デイリーノートへのリンク追加
-                if config.obsidian_daily_notes_dir:
-                    add_link_to_daily_note(markdown_path, recording_datetime)
-                
-                # 処理済みファイルの移動
-                if config.processed_files_dir:
-                    file_manager.move_processed_file(
-                        str(audio_file), config.processed_files_dir
+                if args.batch:
+                    run_batch(
+                        audio_files, prompt_template, config, audio_processor, file_manager, processed_log,
+                        lease_manager, budget_governor, profile_dir
+                    )
+                else:
+                    _process_files(
+                        audio_files, prompt_template, config, audio_processor, file_manager, processed_log,
+                        lease_manager, budget_governor, profile_dir
                     )
-                
-                # ログ記録
-                file_manager.save_log(
-                    f"Successfully processed {audio_file.name} -> {pathlib.Path(markdown_path).name}",
-                    "info"
-                )
-                
-                print(f"Successfully processed: {audio_file.name}")
-                
-            except Exception as e:
-                error_msg = f"Error processing {audio_file.name}: {e}"
-                print(error_msg)
-                file_manager.save_log(error_msg, "error")
-                continue
-            
             finally:
-                # 一時ディレクトリのクリーンアップ
-                if 'temp_dir' in locals():
-                    file_manager.cleanup_temp_directory(temp_dir)
-        
-        print("\nProcessing completed.")
+                processed_log.close()
+                if lease_manager is not None:
+                    lease_manager.close()
+                # キューに残った削除を完了させる
+                uploaded_files.close()
+                audio_processor.metrics.update({
+                    f"uploads_{key}": value for key, value in uploaded_files.stats.items() if value
+                })
+                # 実行中のアーカイブ変換の完了を待つ（元ファイルの削除は長さの確認後）
+                if archive_manager is not None:
+                    archive_manager.close()
+                    audio_processor.metrics.update({key: value for key, value in archive_manager.stats.items() if value})
+            
+            print("\nProcessing completed.")
+            if audio_processor.metrics:
+                metrics_summary = ", ".join(
+                    f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}"
+                    for key, value in sorted(audio_processor.metrics.items())
+                )
+                print(f"Run metrics: {metrics_summary}")
+                file_manager.save_log(f"Run metrics: {metrics_summary}", "info")
+        finally:
+            # ファイルがない・途中で失敗した場合も、前回の残りを含むキューの削除を完了させる
+            uploaded_files.close()
         
     except Exception as e:
         print(f"Fatal error: {e}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+アップロード済みファイルの管理 - アップロードの台帳記録・バックグラウンド削除・前回の実行が残したファイルの掃除
+"""
+
+import os
+import pathlib
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config_manager import ConfigManager
+
+
+class UploadedFileManager:
+    """APIクライアントを包み、アップロードしたファイルを台帳に記録して削除をバックグラウンドで行うクラス
+
+    upload_file / generate_content / delete_file は元のクライアントと同じ呼び出し方で使える。
+    delete_file はキューに積んですぐに戻り、削除に成功したファイルだけを台帳から外すため、
+    異常終了などで削除されなかったファイルは次回起動時の sweep_orphans で削除される。
+    """
+
+    MAX_DELETE_ATTEMPTS = 3
+
+    def __init__(self, client, ledger_path: str, orphan_max_age_s: float = 6 * 3600, retry_delay_s: float = 1.0):
+        """初期化"""
+        self.client = client
+        self.ledger_path = ledger_path
+        self.orphan_max_age_s = orphan_max_age_s
+        self.retry_delay_s = retry_delay_s
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.stats = {"deleted": 0, "delete_failures": 0, "orphans_found": 0}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+
+        if ledger_path != ":memory:":
+            pathlib.Path(ledger_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(ledger_path, check_same_thread=False, timeout=30)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " name TEXT PRIMARY KEY,"
+            " label TEXT,"
+            " host TEXT NOT NULL,"
+            " pid INTEGER NOT NULL,"
+            " uploaded_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+        self._worker = threading.Thread(target=self._run, name="upload-deleter", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def from_config(cls, config: ConfigManager, client) -> "UploadedFileManager":
+        """設定から作成"""
+        return cls(client, config.upload_ledger_path, orphan_max_age_s=config.upload_orphan_max_age_s)
+
+    def upload_file(self, path, mime_type: Optional[str] = None):
+        """ファイルをアップロードし、台帳に記録"""
+        uploaded = self.client.upload_file(path, mime_type=mime_type)
+        label = path.name if isinstance(path, pathlib.Path) else (path if isinstance(path, str) else None)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO uploads (name, label, host, pid, uploaded_at) VALUES (?, ?, ?, ?, ?)",
+                (uploaded.name, label, self.host, self.pid, time.time())
+            )
+            self._connection.commit()
+        return uploaded
+
+    def generate_content(self, model_name: str, contents, stream: bool = False):
+        """コンテンツを生成（元のクライアントに委譲）"""
+        return self.client.generate_content(model_name, contents, stream=stream)
+
+    def delete_file(self, name: str):
+        """削除をキューに積む（実際の削除はバックグラウンドで行う）"""
+        self._queue.put(name)
+
+    def _run(self):
+        """削除キューを処理"""
+        while True:
+            name = self._queue.get()
+            try:
+                if name is None:
+                    return
+                self._delete_now(name)
+            finally:
+                self._queue.task_done()
+
+    def _delete_now(self, name: str):
+        """ファイルを削除し、成功したら台帳から外す（失敗した場合は次回の掃除に回す）"""
+        for attempt in range(1, self.MAX_DELETE_ATTEMPTS + 1):
+            try:
+                self.client.delete_file(name)
+                break
+            except Exception as e:
+                if attempt >= self.MAX_DELETE_ATTEMPTS:
+                    print(f"Warning: Failed to delete uploaded file {name}; it will be retried on the next run: {e}")
+                    with self._lock:
+                        self.stats["delete_failures"] += 1
+                    return
+                time.sleep(self.retry_delay_s * attempt)
+        with self._lock:
+            self._connection.execute("DELETE FROM uploads WHERE name = ?", (name,))
+            self._connection.commit()
+            self.stats["deleted"] += 1
+
+    def _is_orphan(self, host: str, pid: int, uploaded_at: float) -> bool:
+        """記録したプロセスが終了している（または一定時間以上経過した）アップロードか"""
+        if time.time() - uploaded_at > self.orphan_max_age_s:
+            return True
+        if host != self.host or pid == self.pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+        return False
+
+    def sweep_orphans(self, keep: Optional[set] = None) -> int:
+        """前回までの実行で削除されずに残ったファイルを削除キューに積み、件数を返す（keep のファイルは残す）"""
+        keep = keep or set()
+        with self._lock:
+            rows = self._connection.execute("SELECT name, host, pid, uploaded_at FROM uploads").fetchall()
+        orphans = [
+            name for name, host, pid, uploaded_at in rows
+            if name not in keep and self._is_orphan(host, pid, uploaded_at)
+        ]
+        if orphans:
+            print(f"Found {len(orphans)} uploaded files left by previous runs; deleting them in the background.")
+            with self._lock:
+                self.stats["orphans_found"] += len(orphans)
+            for name in orphans:
+                self._queue.put(name)
+        return len(orphans)
+
+    def pending_count(self) -> int:
+        """台帳上でまだ削除されていないファイル数"""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+
+    def close(self):
+        """キューに残った削除を完了させてから終了（複数回呼び出してもよい）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+        with self._lock:
+            self._connection.close()
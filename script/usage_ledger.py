@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+API使用量台帳 - レスポンスのトークン数と推定料金を日別にSQLiteへ記録
+"""
+
+import argparse
+import datetime
+import pathlib
+import sqlite3
+import sys
+import threading
+from typing import Optional
+
+from config_manager import ConfigManager
+
+# モデルごとの料金（USD / 100万トークン、入力・出力）。MODEL_PRICES で上書きできる
+DEFAULT_MODEL_PRICES = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+
+def parse_model_prices(spec: Optional[str]) -> dict:
+    """「model=入力/出力;model=入力/出力」形式の料金設定を解析（既定値に上書き）"""
+    prices = dict(DEFAULT_MODEL_PRICES)
+    if not spec:
+        return prices
+    for item in spec.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            model, rates = item.split("=", 1)
+            input_rate, output_rate = rates.split("/", 1)
+            prices[model.strip()] = (float(input_rate), float(output_rate))
+        except ValueError:
+            raise ValueError(f"Invalid MODEL_PRICES entry: '{item}' (expected model=input/output)")
+    return prices
+
+
+class UsageLedger:
+    """日付・モデル・用途ごとのトークン数と推定料金の台帳"""
+
+    def __init__(self, ledger_path: str, model_prices: Optional[dict] = None):
+        """初期化"""
+        self.ledger_path = ledger_path
+        self.model_prices = model_prices if model_prices is not None else dict(DEFAULT_MODEL_PRICES)
+        self._lock = threading.Lock()
+
+        if ledger_path != ":memory:":
+            pathlib.Path(ledger_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(ledger_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            " day TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " calls INTEGER NOT NULL DEFAULT 0,"
+            " prompt_tokens INTEGER NOT NULL DEFAULT 0,"
+            " candidates_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cost_usd REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (day, model, kind))"
+        )
+        self._connection.commit()
+
+    @classmethod
+    def from_config(cls, config: ConfigManager) -> Optional["UsageLedger"]:
+        """設定から台帳を作成（開けない場合は None）"""
+        try:
+            return cls(config.usage_ledger_path, parse_model_prices(config.model_prices))
+        except sqlite3.Error as e:
+            print(f"Warning: Could not open usage ledger {config.usage_ledger_path}: {e}")
+            return None
+
+    def estimate_cost(self, model: str, prompt_tokens: int, candidates_tokens: int) -> float:
+        """トークン数から推定料金（USD）を計算（料金未設定のモデルは0）"""
+        input_rate, output_rate = self.model_prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_rate + candidates_tokens * output_rate) / 1_000_000
+
+    def add(self, model: str, kind: str, prompt_tokens: int, candidates_tokens: int,
+            day: Optional[datetime.date] = None, cost_ratio: float = 1.0) -> float:
+        """1回のAPI呼び出しの使用量を加算し、推定料金を返す（cost_ratio はバッチ割引などの料金倍率）"""
+        day = day or datetime.date.today()
+        cost = self.estimate_cost(model, prompt_tokens, candidates_tokens) * cost_ratio
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO usage (day, model, kind, calls, prompt_tokens, candidates_tokens, cost_usd)"
+                " VALUES (?, ?, ?, 1, ?, ?, ?)"
+                " ON CONFLICT (day, model, kind) DO UPDATE SET"
+                " calls = calls + 1,"
+                " prompt_tokens = prompt_tokens + excluded.prompt_tokens,"
+                " candidates_tokens = candidates_tokens + excluded.candidates_tokens,"
+                " cost_usd = cost_usd + excluded.cost_usd",
+                (day.isoformat(), model, kind, prompt_tokens, candidates_tokens, cost)
+            )
+            self._connection.commit()
+        return cost
+
+    def month_to_date_cost(self, today: Optional[datetime.date] = None) -> float:
+        """当月1日から today までの推定料金の合計"""
+        today = today or datetime.date.today()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) FROM usage WHERE day >= ? AND day <= ?",
+                (today.replace(day=1).isoformat(), today.isoformat())
+            ).fetchone()
+        return row[0]
+
+    def daily_totals(self, start: datetime.date, end: datetime.date) -> list:
+        """期間内の日別・モデル別の合計"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT day, model, SUM(calls), SUM(prompt_tokens), SUM(candidates_tokens), SUM(cost_usd)"
+                " FROM usage WHERE day >= ? AND day <= ? GROUP BY day, model ORDER BY day, model",
+                (start.isoformat(), end.isoformat())
+            ).fetchall()
+        return [
+            {"day": row[0], "model": row[1], "calls": row[2], "prompt_tokens": row[3],
+             "candidates_tokens": row[4], "cost_usd": row[5]}
+            for row in rows
+        ]
+
+    def close(self):
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._connection.close()
+
+
+def main():
+    """月ごとの使用量の表示コマンド"""
+    parser = argparse.ArgumentParser(description="Show per-day API token usage and estimated cost.")
+    parser.add_argument("--month", help="Month to show (YYYY-MM, default: current month).")
+    args = parser.parse_args()
+
+    config = ConfigManager()
+    if not pathlib.Path(config.usage_ledger_path).exists():
+        print(f"No usage ledger found: {config.usage_ledger_path}")
+        sys.exit(1)
+    ledger = UsageLedger(config.usage_ledger_path, parse_model_prices(config.model_prices))
+
+    if args.month:
+        start = datetime.datetime.strptime(args.month, "%Y-%m").date()
+    else:
+        start = datetime.date.today().replace(day=1)
+    end = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+
+    rows = ledger.daily_totals(start, end)
+    print(f"{'day':<12}{'model':<24}{'calls':>7}{'input':>14}{'output':>12}{'cost_usd':>11}")
+    for row in rows:
+        print(
+            f"{row['day']:<12}{row['model']:<24}{row['calls']:>7}{row['prompt_tokens']:>14,}"
+            f"{row['candidates_tokens']:>12,}{row['cost_usd']:>11.4f}"
+        )
+    total = sum(row["cost_usd"] for row in rows)
+    print(f"Total {start.strftime('%Y-%m')}: ${total:.4f}", end="")
+    if config.monthly_budget_usd > 0:
+        print(f" / budget ${config.monthly_budget_usd:.2f} ({total / config.monthly_budget_usd:.0%})")
+    else:
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+処理済み録音のアーカイブ変換（長さの確認・元ファイルとの対応の記録）をテストするスクリプト
+"""
+
+import hashlib
+import os
+import pathlib
+import sys
+import tempfile
+import wave
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from archive_manager import ArchiveManager
+
+
+def fake_transcoder(source, codec, bitrate):
+    """ffmpeg の代わりに元の録音の先頭を書き出す変換（ファイル名に truncated を含む場合は3秒短くなる）"""
+    source_path = pathlib.Path(source)
+    with wave.open(source, "rb") as f:
+        duration = f.getnframes() / f.getframerate()
+    temp_path = source_path.with_name(f".{source_path.name}.archive.{codec}")
+    data = source_path.read_bytes()[:100]
+    temp_path.write_bytes(data)
+    return {
+        "source": source,
+        "temp_path": str(temp_path),
+        "codec": codec,
+        "source_duration_s": duration,
+        "archive_duration_s": duration - 3.0 if "truncated" in source_path.name else duration,
+        "archive_size": len(data),
+        "archive_sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def _make_wav(path: pathlib.Path, seconds: int):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\x01\x00" * 8000 * seconds)
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_archive_records_mapping_and_removes_original():
+    """長さが一致した場合は対応を記録してから元ファイルを削除し、どちらのハッシュからも検索できること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        original = work_path / "meeting.wav"
+        original_sha256 = _make_wav(original, 5)
+        (work_path / "meeting.opus").write_bytes(b"existing")
+
+        manager = ArchiveManager(str(work_path / "archive_index.sqlite3"), transcoder=fake_transcoder)
+        manager.submit(original, original_sha256)
+        manager.submit(work_path / "notes.txt")
+        manager.close()
+
+        assert not original.exists()
+        assert manager.stats["archived"] == 1 and manager.stats["archive_failures"] == 0
+        # 既存のファイルは上書きしない
+        assert (work_path / "meeting.opus").read_bytes() == b"existing"
+        assert (work_path / "meeting_1.opus").exists()
+        assert sorted(p.name for p in work_path.iterdir()) == [
+            "archive_index.sqlite3", "meeting.opus", "meeting_1.opus"
+        ]
+
+        reopened = ArchiveManager(str(work_path / "archive_index.sqlite3"), transcoder=fake_transcoder)
+        entry = reopened.lookup(original_sha256)
+        assert entry["archive_path"] == str(work_path / "meeting_1.opus")
+        assert entry["original_name"] == "meeting.wav" and entry["duration_s"] == 5.0
+        assert reopened.lookup(entry["archive_sha256"])["original_sha256"] == original_sha256
+        assert reopened.lookup("0" * 64) is None
+        reopened.close()
+
+
+def test_duration_mismatch_keeps_original():
+    """変換結果の長さが元の録音と異なる場合は元ファイルを残し、対応も記録しないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        original = work_path / "truncated.wav"
+        original_sha256 = _make_wav(original, 5)
+
+        manager = ArchiveManager(str(work_path / "archive_index.sqlite3"), codec="flac", transcoder=fake_transcoder)
+        manager.submit(original, original_sha256)
+        manager.close()
+
+        assert original.exists()
+        assert manager.stats["archive_failures"] == 1 and manager.stats["archived"] == 0
+        assert sorted(p.name for p in work_path.iterdir()) == ["archive_index.sqlite3", "truncated.wav"]
+        reopened = ArchiveManager(str(work_path / "archive_index.sqlite3"))
+        assert reopened.lookup(original_sha256) is None
+        reopened.close()
+
+
+if __name__ == "__main__":
+    test_archive_records_mapping_and_removes_original()
+    test_duration_mismatch_keeps_original()
+    print("✅ テスト成功")
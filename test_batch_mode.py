@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+バッチモード（ローカルのバッチバックエンド）をテストするスクリプト（スタブクライアントを使用）
+"""
+
+import concurrent.futures
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import types
+import wave
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from pydub.generators import Sine
+
+from testing_env import PROCESSOR_ENV, make_audio_processor, override_env, stub_response
+from config_manager import ConfigManager
+from audio_processor import AudioProcessor
+from summary_cache import SummaryCache
+from file_manager import FileManager
+from processing_record import JsonlAppender
+from usage_ledger import UsageLedger
+from budget_governor import BudgetGovernor, GovernorDecision
+import transcribe_summarize
+from batch_backend import JOB_SUCCEEDED, BatchJobStore, BatchResult, LocalBatchBackend, wait_for_job
+
+
+class StubClient:
+    """要約とファイル名をまとめた出力を返すスタブ"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, model_name, contents, stream=False):
+        self.calls += 1
+        response = types.SimpleNamespace(
+            candidates=[types.SimpleNamespace(
+                finish_reason="STOP",
+                content=types.SimpleNamespace(parts=[types.SimpleNamespace(text="## 要約\n合成の要約\n\n**ファイル名**: 定例会議")]),
+            )],
+            usage_metadata=types.SimpleNamespace(prompt_token_count=10, candidates_token_count=5, total_token_count=15),
+        )
+        return iter([response]) if stream else response
+
+
+def test_batch_summary_fills_cache():
+    """バッチで生成した要約・ファイル名がキャッシュに入り、通常処理ではAPIを呼ばないこと"""
+    client = StubClient()
+    with tempfile.TemporaryDirectory() as state_dir:
+        cache = SummaryCache(os.path.join(state_dir, "cache.sqlite3"))
+        processor = AudioProcessor(ConfigManager(), summary_cache=cache, client=client)
+        backend = LocalBatchBackend(client)
+
+        request, cache_key = processor.build_batch_summary_request("a.wav|summary", "文字起こし", "{{TRANSCRIPTION}}")
+        job_id = backend.submit([request], "test")
+        assert wait_for_job(backend, job_id, 0.01, timeout_s=5) == JOB_SUCCEEDED
+        assert processor.apply_batch_summary(backend.fetch_results(job_id).get(request.key), cache_key)
+        assert client.calls == 1
+
+        summary = processor.summarize_text("文字起こし", "{{TRANSCRIPTION}}")
+        assert summary == "## 要約\n合成の要約\n"
+        assert processor.generate_filename_from_summary(summary) == "定例会議"
+        assert client.calls == 1
+        # キャッシュ済みの録音はバッチに含めない
+        assert processor.build_batch_summary_request("a.wav|summary", "文字起こし", "{{TRANSCRIPTION}}") is None
+        cache.close()
+
+
+class UploadStubClient:
+    """アップロードだけを受け付けるスタブ（文字起こしはバッチの結果を使う）"""
+
+    def __init__(self):
+        self.uploads = 0
+
+    def upload_file(self, path, mime_type=None):
+        self.uploads += 1
+        return types.SimpleNamespace(name=f"files/stub-{self.uploads}", uri="https://stub.invalid", mime_type=mime_type)
+
+    def delete_file(self, name):
+        pass
+
+
+def test_batch_transcription_is_assembled_without_decoding():
+    """バッチで全チャンクを文字起こしした録音は、要約・保存処理で録音を再デコードしないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        recording = work_path / "meeting.wav"
+        Sine(440).to_audio_segment(duration=9_000).set_frame_rate(8000).set_channels(1).export(str(recording), format="wav")
+        temp_dir = work_path / "temp"
+
+        client = UploadStubClient()
+        processor = make_audio_processor(client)
+        processor.CHUNK_MAX_DURATION_MS = 4_000
+        processor.OVERLAP_MS = 1_000
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            futures = processor.build_batch_transcription_requests(str(recording), temp_dir, executor)
+        entries = processor.collect_batch_uploads(futures)
+        assert [output_path.name for _, output_path, _ in entries] == [
+            "chunk_1_transcription.txt", "chunk_2_transcription.txt", "chunk_3_transcription.txt"
+        ]
+        # 2番目のチャンクの結果が得られるまでは組み立てない
+        for index, (request, output_path, _) in enumerate(entries, start=1):
+            if index != 2:
+                processor.apply_batch_transcription(BatchResult(request.key, f"チャンク{index}", "STOP"), output_path)
+        assert processor.read_cached_transcription(str(recording)) is None
+        request, output_path, _ = entries[1]
+        processor.apply_batch_transcription(BatchResult(request.key, "チャンク2", "STOP"), output_path)
+
+        # 録音を削除しても（デコードしないため）要約用・保存処理用の文字起こしが得られる
+        recording.unlink()
+        assert processor.read_cached_transcription(str(recording)) == "チャンク1\n\nチャンク2\n\nチャンク3"
+        assert processor.transcribe_audio(str(recording), temp_dir) == "チャンク1\n\nチャンク2\n\nチャンク3"
+        assert processor.metrics["transcription_cache_hits"] == 3
+
+
+class RecordingStubClient:
+    """アップロードされたWAVのサンプリングレートから倍速を求め、生成に使われたモデルを記録するスタブ"""
+
+    FRAME_RATE = 8000
+
+    def __init__(self):
+        self.upload_speeds = {}
+        self.calls = []
+
+    def upload_file(self, buffer, mime_type=None):
+        with wave.open(buffer, "rb") as f:
+            speed = f.getframerate() / self.FRAME_RATE
+        buffer.seek(0)
+        name = f"files/stub-{len(self.upload_speeds) + 1}"
+        self.upload_speeds[name] = speed
+        return types.SimpleNamespace(name=name, uri=f"https://stub.invalid/{name}", mime_type=mime_type)
+
+    def generate_content(self, model_name, contents, stream=False):
+        if isinstance(contents, list):
+            upload_name = contents[1].name
+            self.calls.append(("transcribe", self.upload_speeds[upload_name], model_name))
+            return stub_response(f"文字起こし {upload_name}", stream=stream)
+        upload_name = next(name for name in self.upload_speeds if name in contents)
+        self.calls.append(("summarize", self.upload_speeds[upload_name], model_name))
+        return stub_response("## 要約\n合成の要約\n\n**ファイル名**: 定例会議", stream=stream)
+
+    def delete_file(self, name):
+        pass
+
+
+class ScriptedGovernor(BudgetGovernor):
+    """ファイルごとに決められた設定を順に返す予算ガバナー"""
+
+    def __init__(self, decisions):
+        super().__init__(UsageLedger(":memory:"), 10.0, 1.5, "gemini-1.5-flash")
+        self.decisions = list(decisions)
+
+    def decide(self):
+        return self.decisions.pop(0)
+
+
+def test_batch_uses_each_files_governor_decision():
+    """ファイルごとの予算ガバナーの設定が、そのファイルのアップロード・要約・保存処理に使われること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        inbox = work_path / "inbox"
+        inbox.mkdir()
+        audio_files = []
+        for name in ("a_meeting.wav", "b_meeting.wav"):
+            path = inbox / name
+            Sine(440).to_audio_segment(duration=5_000).set_frame_rate(8000).set_channels(1).export(str(path), format="wav")
+            audio_files.append(path)
+
+        env = dict(PROCESSOR_ENV, MARKDOWN_OUTPUT_DIR=str(work_path / "markdown"), STATE_DIR=str(work_path / "state"),
+                   TEMP_CHUNK_BASE_DIR=str(work_path / "chunks"), PROCESSED_FILES_DIR=str(work_path / "done"),
+                   BATCH_BACKEND="local", BATCH_POLL_INTERVAL_S="0.01", BATCH_LOCAL_REQUESTS_PER_MINUTE="0",
+                   UPLOAD_PARALLELISM="1")
+        with override_env(**env):
+            config = ConfigManager()
+        client = RecordingStubClient()
+        cache = SummaryCache(str(work_path / "state" / "summary_cache.sqlite3"))
+        processor = AudioProcessor(config, summary_cache=cache, client=client)
+        governor = ScriptedGovernor([
+            GovernorDecision(1.5, False, "model-a", False, 0.5),
+            GovernorDecision(2.5, False, "model-b", False, 0.9),
+        ])
+        processed_log = JsonlAppender(str(work_path / "processed_log.jsonl"))
+        transcribe_summarize.run_batch(
+            audio_files, "{{TRANSCRIPTION}}", config, processor, FileManager(config), processed_log, None, governor
+        )
+        processed_log.close()
+        cache.close()
+
+        # 1つ目のファイルは 1.5x・model-a、2つ目は 2.5x・model-b で文字起こし・要約し、保存処理で追加の呼び出しはない
+        assert sorted(client.calls) == [
+            ("summarize", 1.5, "model-a"), ("summarize", 2.5, "model-b"),
+            ("transcribe", 1.5, "model-a"), ("transcribe", 2.5, "model-b"),
+        ]
+        with open(work_path / "processed_log.jsonl", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert [(record["source_audio"], record["governor"]["model"]) for record in records] == [
+            ("a_meeting.wav", "model-a"), ("b_meeting.wav", "model-b")
+        ]
+
+
+def _store_as(state_dir, host, pid, worker_id=None):
+    """別のワーカーとしてジョブを保存するストア"""
+    store = BatchJobStore(state_dir)
+    store.owner = {"host": host, "pid": pid, "worker_id": worker_id}
+    return store
+
+
+def test_job_store_claims_only_own_or_abandoned_jobs():
+    """STATE_DIR を共有するワーカー同士が、実行中の他のワーカーのジョブを回収・上書きしないこと"""
+    with tempfile.TemporaryDirectory() as state_dir:
+        store = BatchJobStore(state_dir, stale_after_s=60)
+        host = store.owner["host"]
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+
+        store.save("transcribe", {"job_id": "mine", "uploads": ["files/a"]})
+        _store_as(state_dir, host, os.getppid()).save("transcribe", {"job_id": "running", "uploads": ["files/b"]})
+        _store_as(state_dir, host, finished.pid).save("transcribe", {"job_id": "dead", "uploads": []})
+        _store_as(state_dir, "other-host", 1).save("transcribe", {"job_id": "remote", "uploads": []})
+        stale_store = _store_as(state_dir, "other-host", 1)
+        stale_store.save("transcribe", {"job_id": "stale", "uploads": []})
+        stale_path = stale_store._path("transcribe", "stale")
+        job = stale_store._read(stale_path)
+        job["saved_at"] = time.time() - 120
+        stale_store._write(stale_path, job)
+        store.save("summarize", {"job_id": "mine", "uploads": []})
+
+        claimed = store.claim("transcribe")
+        assert sorted(job["job_id"] for job in claimed) == ["dead", "mine", "stale"]
+        # 引き継いだジョブは自分のジョブとして記録され、他のワーカーからは引き継げない
+        assert all(job["owner"] == store.owner for job in claimed)
+        assert _store_as(state_dir, host, os.getppid()).claim("transcribe")[0]["job_id"] == "running"
+        # 回収前のジョブのアップロードはどのワーカーのものも削除しない
+        assert store.referenced_uploads() == {"files/a", "files/b"}
+
+        for job in claimed:
+            store.clear("transcribe", job)
+        assert [job["job_id"] for job in store.claim("transcribe")] == []
+        assert [job["job_id"] for job in store.claim("summarize")] == ["mine"]
+        assert store.referenced_uploads() == {"files/b"}
+
+
+def test_job_store_never_takes_over_remote_jobs_when_age_is_zero():
+    """引き継ぐまでの時間が0以下の場合は、どれだけ古くても他のホストのジョブを引き継がないこと"""
+    with tempfile.TemporaryDirectory() as state_dir:
+        remote_store = _store_as(state_dir, "other-host", 1)
+        remote_store.save("transcribe", {"job_id": "remote", "uploads": []})
+        path = remote_store._path("transcribe", "remote")
+        job = remote_store._read(path)
+        job["saved_at"] = 0
+        remote_store._write(path, job)
+
+        with override_env(STATE_DIR=state_dir, BATCH_TIMEOUT_S="0", BATCH_TAKEOVER_AGE_S="0"):
+            store = BatchJobStore.from_config(ConfigManager())
+        assert store.claim("transcribe") == []
+        assert [job["job_id"] for job in _store_as(state_dir, "other-host", 1).claim("transcribe")] == ["remote"]
+
+
+if __name__ == "__main__":
+    test_batch_summary_fills_cache()
+    test_batch_transcription_is_assembled_without_decoding()
+    test_batch_uses_each_files_governor_decision()
+    test_job_store_claims_only_own_or_abandoned_jobs()
+    test_job_store_never_takes_over_remote_jobs_when_age_is_zero()
+    print("✅ テスト成功")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+API使用量台帳と予算ガバナーをテストするスクリプト（合成の使用量を返すスタブクライアントを使用）
+"""
+
+import datetime
+import os
+import sys
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from testing_env import make_audio_processor, stub_response
+from usage_ledger import UsageLedger
+from budget_governor import BudgetGovernor
+
+TODAY = datetime.date(2025, 8, 25)
+
+
+class StubClient:
+    """1回の生成ごとに固定のトークン数を返すスタブ"""
+
+    def __init__(self, prompt_tokens, candidates_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.candidates_tokens = candidates_tokens
+        self.models = []
+
+    def generate_content(self, model_name, contents, stream=False):
+        self.models.append(model_name)
+        return stub_response("## 要約\n合成の要約", self.prompt_tokens, self.candidates_tokens)
+
+
+def _make_processor(client, ledger):
+    """スタブクライアントと台帳を使う AudioProcessor を作成"""
+    return make_audio_processor(client, usage_ledger=ledger)
+
+
+def test_usage_ledger_accounting():
+    """レスポンスの使用量が日別・用途別に記録され、推定料金が計算されること"""
+    ledger = UsageLedger(":memory:", {"gemini-1.5-flash": (1.0, 4.0)})
+    processor = _make_processor(StubClient(100_000, 25_000), ledger)
+
+    for _ in range(3):
+        processor.summarize_text("文字起こし", "{{TRANSCRIPTION}}")
+
+    rows = ledger.daily_totals(datetime.date.today(), datetime.date.today())
+    assert len(rows) == 1 and rows[0]["calls"] == 3
+    assert rows[0]["prompt_tokens"] == 300_000 and rows[0]["candidates_tokens"] == 75_000
+    # 1回あたり 0.1 + 0.1 = 0.2 USD
+    assert abs(ledger.month_to_date_cost() - 0.6) < 1e-9
+    assert abs(processor.metrics["estimated_cost_usd"] - 0.6) < 1e-9
+
+
+def test_governor_escalation():
+    """予算の消化率に応じて倍速・無音圧縮・モデル・後回しが段階的に切り替わること"""
+    ledger = UsageLedger(":memory:", {"gemini-1.5-flash": (1.0, 0.0)})
+    processor = _make_processor(StubClient(0, 0), ledger)
+    governor = BudgetGovernor(
+        ledger, 10.0, 1.5, "gemini-1.5-flash", soft_limit_ratio=0.8, max_speed_multiplier=3.0,
+        fallback_model="gemini-1.5-flash-8b", low_priority_pattern=r"^memo_", today=lambda: TODAY,
+    )
+
+    def spend(usd):
+        ledger.add("gemini-1.5-flash", "transcribe", int(usd * 1_000_000), 0, day=TODAY)
+
+    # 先月の使用量は当月の消化率に含めない
+    ledger.add("gemini-1.5-flash", "transcribe", 50_000_000, 0, day=datetime.date(2025, 7, 31))
+    spend(5.0)
+    decision = governor.apply(processor, "meeting.wav")
+    assert (decision.speed_multiplier, decision.silence_compression, decision.model_name) == (1.5, False, "gemini-1.5-flash")
+
+    spend(3.5)  # 85%
+    decision = governor.apply(processor, "meeting.wav")
+    assert decision.silence_compression and 1.5 < decision.speed_multiplier < 3.0
+    assert processor.model_name == "gemini-1.5-flash"
+    assert processor.speed_multiplier == decision.speed_multiplier
+
+    spend(0.5)  # 90%
+    governor.apply(processor, "meeting.wav")
+    assert processor.model_name == "gemini-1.5-flash-8b"
+
+    spend(1.5)  # 105%
+    assert governor.apply(processor, "memo_idea.wav") is None
+    decision = governor.apply(processor, "meeting.wav")
+    assert decision.speed_multiplier == 3.0 and decision.defer_low_priority
+
+
+def test_silence_compression():
+    """長い無音区間だけが短縮されること"""
+    from pydub.generators import Sine
+    from pydub import AudioSegment
+
+    processor = _make_processor(StubClient(0, 0), None)
+    tone = Sine(440).to_audio_segment(duration=2000).set_frame_rate(16000).set_channels(1)
+    audio = tone + AudioSegment.silent(duration=5000, frame_rate=16000) + tone + AudioSegment.silent(duration=500, frame_rate=16000) + tone
+
+    compressed = processor._compress_silence(audio)
+    # 5秒の無音は前後0.3秒ずつ残して短縮、0.5秒の無音はそのまま
+    assert abs(len(compressed) - (6000 + 600 + 500)) <= processor.SILENCE_WINDOW_MS
+    assert processor.metrics["silence_removed_ms"] == len(audio) - len(compressed)
+
+
+if __name__ == "__main__":
+    test_usage_ledger_accounting()
+    test_governor_escalation()
+    test_silence_compression()
+    print("✅ テスト成功")
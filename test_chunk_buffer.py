@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+倍速チャンクのメモリ上のバッファと、上限を超えた場合の一時ファイルへの退避をテストするスクリプト
+"""
+
+import io
+import os
+import pathlib
+import sys
+import tempfile
+import wave
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from pydub.generators import Sine
+
+from testing_env import make_audio_processor, override_env
+
+FRAME_RATE = 8000
+MAX_BUFFER_BYTES = 20_000  # 8kHz・16bit・モノラルで 1.25秒弱
+
+
+def _segment(duration_ms: int):
+    return Sine(440).to_audio_segment(duration=duration_ms).set_frame_rate(FRAME_RATE).set_channels(1).set_sample_width(2)
+
+
+def _read_all(buffer) -> bytes:
+    data = buffer.read()
+    buffer.seek(0)
+    return data
+
+
+def test_only_segments_over_threshold_spill_to_disk():
+    """上限以下のセグメントはメモリ上に置き、超えたものだけ一時ファイルに退避して、その書き込みバイト数だけを計上すること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        spill_dir = pathlib.Path(work_dir) / "chunks"
+        with override_env(CHUNK_MEMORY_BUFFER_MAX_MB=str(MAX_BUFFER_BYTES / 1024 / 1024)):
+            processor = make_audio_processor(None)
+
+        # ヘッダを含めてちょうど上限のセグメントはメモリ上
+        exact = _segment(1000)._spawn(b"\0" * (MAX_BUFFER_BYTES - processor.WAV_HEADER_BYTES))
+        for segment in (_segment(500), exact):
+            buffer = processor._encode_fast_segment(segment, spill_dir)
+            assert isinstance(buffer, io.BytesIO)
+            assert len(_read_all(buffer)) == len(segment.raw_data) + processor.WAV_HEADER_BYTES
+            buffer.close()
+        assert processor.metrics["chunks_buffered_in_memory"] == 2
+        assert processor.metrics["temp_disk_bytes_written"] == 0
+        assert not spill_dir.exists()
+
+        spilled_sizes = []
+        for duration_ms in (2000, 3000):
+            buffer = processor._encode_fast_segment(_segment(duration_ms), spill_dir)
+            assert not isinstance(buffer, io.BytesIO) and buffer.fileno() >= 0
+            data = _read_all(buffer)
+            spilled_sizes.append(len(data))
+            with wave.open(buffer, "rb") as f:
+                assert f.getframerate() == int(FRAME_RATE * processor.speed_multiplier)
+                assert f.getnframes() == FRAME_RATE * duration_ms // 1000
+            buffer.close()
+        assert spill_dir.is_dir() and list(spill_dir.iterdir()) == []  # 一時ファイルは閉じると消える
+        assert processor.metrics["chunks_buffered_in_memory"] == 2
+        assert processor.metrics["temp_disk_bytes_written"] == sum(spilled_sizes)
+
+
+if __name__ == "__main__":
+    test_only_segments_over_threshold_spill_to_disk()
+    print("✅ テスト成功")
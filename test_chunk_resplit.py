@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+途切れ・空の文字起こしになったチャンクだけの再分割をテストするスクリプト（応答を順に返すスタブクライアントを使用）
+"""
+
+import os
+import pathlib
+import sys
+import tempfile
+import types
+import wave
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from pydub.generators import Sine
+
+from testing_env import make_audio_processor, stub_response
+
+FRAME_RATE = 8000
+
+
+class StubClient:
+    """アップロードされたチャンクの長さ（元の録音での秒数）を記録し、決められた応答を順に返すスタブ"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.uploaded_durations = []
+
+    def upload_file(self, buffer, mime_type=None):
+        with wave.open(buffer, "rb") as f:
+            self.uploaded_durations.append(round(f.getnframes() / FRAME_RATE, 1))
+        buffer.seek(0)
+        name = f"files/stub-{len(self.uploaded_durations)}"
+        return types.SimpleNamespace(name=name, uri=f"https://stub.invalid/{name}", mime_type=mime_type)
+
+    def generate_content(self, model_name, contents, stream=False):
+        text, finish_reason = self.responses.pop(0)
+        return stub_response(text, finish_reason=finish_reason)
+
+    def delete_file(self, name):
+        pass
+
+
+def _make_processor(client):
+    """10秒の録音を 4秒（オーバーラップ1秒）のチャンク3つに分ける設定の AudioProcessor を作成"""
+    processor = make_audio_processor(client)
+    processor.CHUNK_MAX_DURATION_MS = 4_000
+    processor.OVERLAP_MS = 1_000
+    processor.MIN_SPLIT_CHUNK_MS = 1_000
+    processor.SPLIT_OVERLAP_MS = 200
+    return processor
+
+
+def test_only_incomplete_chunks_are_resplit():
+    """出力上限で途切れたチャンクと空のチャンクだけを2分割して再文字起こしし、他のチャンクは再リクエストしないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        recording = work_path / "meeting.wav"
+        Sine(440).to_audio_segment(duration=10_000).set_frame_rate(FRAME_RATE).set_channels(1).export(str(recording), format="wav")
+        temp_dir = work_path / "chunks"
+
+        client = StubClient([
+            ("チャンク1", "STOP"),
+            ("チャンク2の途中まで", "MAX_TOKENS"),
+            ("チャンク2前半", "STOP"),
+            ("チャンク2後半", "STOP"),
+            ("", "STOP"),
+            ("チャンク3前半", "STOP"),
+            ("チャンク3後半", "STOP"),
+        ])
+        processor = _make_processor(client)
+        transcription = processor.transcribe_audio(str(recording), temp_dir)
+
+        assert transcription == "チャンク1\n\nチャンク2前半\n\nチャンク2後半\n\nチャンク3前半\n\nチャンク3後半"
+        # 4秒のチャンクはそれぞれ1回だけ、再分割は途切れ・空だったチャンクの 2.1秒ずつの2つだけ
+        assert client.uploaded_durations == [4.0, 4.0, 2.1, 2.1, 4.0, 2.1, 2.1]
+        assert client.responses == []
+        assert processor.metrics["chunk_splits"] == 2
+        assert processor.metrics["chunk_retries"] == 4
+        assert processor.metrics["truncated_responses"] == 1 and processor.metrics["empty_responses"] == 1
+        # 再分割したチャンクは結合した結果をキャッシュし、途中結果は残さない
+        assert (temp_dir / "chunk_2_transcription.txt").read_text(encoding="utf-8") == "チャンク2前半\n\nチャンク2後半"
+        assert list(temp_dir.glob("*.partial")) == []
+
+        # 再実行ではキャッシュを使い、APIを呼ばない
+        client = StubClient([])
+        processor = _make_processor(client)
+        assert processor.transcribe_audio(str(recording), temp_dir) == transcription
+        assert client.uploaded_durations == []
+
+
+if __name__ == "__main__":
+    test_only_incomplete_chunks_are_resplit()
+    print("✅ テスト成功")
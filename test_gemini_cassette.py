@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Gemini API の記録・再生（カセット）クライアントをテストするスクリプト（記録時はスタブクライアントを使用）
+"""
+
+import io
+import os
+import sys
+import tempfile
+import types
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from testing_env import stub_response
+from gemini_client import CassetteGeminiClient, CassetteMissError
+
+PROMPT = "この音声を文字起こししてください。"
+AUDIO_BYTES = b"RIFF" + bytes(range(256)) * 4
+
+
+class StubClient:
+    """2チャンクのストリーミングで応答し、呼び出しを記録するスタブ"""
+
+    def __init__(self):
+        self.operations = []
+
+    def upload_file(self, path, mime_type=None):
+        self.operations.append(("upload", path.read()))
+        path.seek(0)
+        return types.SimpleNamespace(name="files/live-1", uri="https://stub.invalid/files/live-1",
+                                     display_name="chunk", mime_type=mime_type)
+
+    def generate_content(self, model_name, contents, stream=False):
+        self.operations.append(("generate", model_name))
+        chunks = [stub_response("前半、", stream=False), stub_response("後半。", 120, 8, stream=False)]
+        chunks[0].candidates[0].finish_reason = None
+        chunks[0].usage_metadata = None
+        return iter(chunks) if stream else chunks[-1]
+
+    def delete_file(self, name):
+        self.operations.append(("delete", name))
+
+
+def _texts(response) -> list:
+    return ["".join(part.text for part in chunk.candidates[0].content.parts) for chunk in response]
+
+
+def test_record_then_replay_without_inner_client():
+    """記録したアップロード・ストリーミング生成・削除を、APIクライアントなしで同じ内容に再生できること"""
+    with tempfile.TemporaryDirectory() as cassette_dir:
+        inner = StubClient()
+        recorder = CassetteGeminiClient(inner, cassette_dir, "record")
+        uploaded = recorder.upload_file(io.BytesIO(AUDIO_BYTES), mime_type="audio/wav")
+        recorded = list(recorder.generate_content("gemini-1.5-flash", [PROMPT, uploaded], stream=True))
+        recorder.delete_file(uploaded.name)
+        assert [operation[0] for operation in inner.operations] == ["upload", "generate", "delete"]
+        assert _texts(recorded) == ["前半、", "後半。"]
+
+        player = CassetteGeminiClient(None, cassette_dir, "replay")
+        replayed_upload = player.upload_file(io.BytesIO(AUDIO_BYTES), mime_type="audio/wav")
+        assert replayed_upload.name.startswith("files/replay-")
+        assert replayed_upload.uri == uploaded.uri and replayed_upload.mime_type == "audio/wav"
+
+        # アップロード名が異なっても、ファイル内容のハッシュで同じリクエストとして再生
+        chunks = list(player.generate_content("gemini-1.5-flash", [PROMPT, replayed_upload], stream=True))
+        assert _texts(chunks) == ["前半、", "後半。"]
+        assert chunks[-1].candidates[0].finish_reason == "STOP"
+        assert chunks[-1].usage_metadata.prompt_token_count == 120
+        merged = player.generate_content("gemini-1.5-flash", [PROMPT, replayed_upload])
+        assert merged.text == "前半、後半。" and merged.usage_metadata.candidates_token_count == 8
+        player.delete_file(replayed_upload.name)
+        assert len(inner.operations) == 3
+
+
+def test_replay_fails_clearly_on_missing_entry():
+    """記録されていないアップロード・生成リクエストは、どのカセットがないかを示すエラーになること"""
+    with tempfile.TemporaryDirectory() as cassette_dir:
+        recorder = CassetteGeminiClient(StubClient(), cassette_dir, "record")
+        uploaded = recorder.upload_file(io.BytesIO(AUDIO_BYTES))
+        list(recorder.generate_content("gemini-1.5-flash", [PROMPT, uploaded], stream=True))
+
+        player = CassetteGeminiClient(None, cassette_dir, "replay")
+        replayed_upload = player.upload_file(io.BytesIO(AUDIO_BYTES))
+        for model_name, contents in (("gemini-1.5-flash", [PROMPT + "（改）", replayed_upload]),
+                                     ("gemini-1.5-pro", [PROMPT, replayed_upload])):
+            try:
+                player.generate_content(model_name, contents, stream=True)
+            except CassetteMissError as e:
+                assert "No recorded generation in cassette" in str(e)
+            else:
+                raise AssertionError("missing generation was not reported")
+        try:
+            player.upload_file(io.BytesIO(AUDIO_BYTES + b"changed"))
+        except CassetteMissError as e:
+            assert "No recorded upload in cassette" in str(e)
+        else:
+            raise AssertionError("missing upload was not reported")
+
+        try:
+            CassetteGeminiClient(None, cassette_dir, "record")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("record mode without a live client was accepted")
+
+
+if __name__ == "__main__":
+    test_record_then_replay_without_inner_client()
+    test_replay_fails_clearly_on_missing_entry()
+    print("✅ テスト成功")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+リースファイルによる複数ワーカー間の排他をテストするスクリプト
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import pathlib
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from lease_manager import LeaseManager
+
+FILE_COUNT = 40
+WORKER_COUNT = 4
+
+
+def _worker(lease_dir, worker_id, names, result_queue):
+    """すべてのファイルを順に処理しようとするワーカー（処理済みの印としてファイルを作成）"""
+    manager = LeaseManager(lease_dir, worker_id, ttl_s=5.0, heartbeat_interval_s=0.5)
+    done_dir = pathlib.Path(lease_dir).parent / "done"
+    processed = []
+    for name in names:
+        lease = manager.acquire(name)
+        if lease is None:
+            continue
+        try:
+            if (done_dir / name).exists():
+                continue
+            time.sleep(0.01)
+            (done_dir / name).touch()
+            processed.append(name)
+        finally:
+            manager.release(lease)
+    manager.close()
+    result_queue.put(processed)
+
+
+def test_exclusive_processing():
+    """複数プロセスで同じファイル群を処理しても各ファイルが1回だけ処理されること"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        lease_dir = pathlib.Path(temp_dir) / ".leases"
+        (pathlib.Path(temp_dir) / "done").mkdir()
+        names = [f"V20250825-{index:06d}.wav" for index in range(FILE_COUNT)]
+
+        result_queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(str(lease_dir), f"worker-{index}", names, result_queue))
+            for index in range(WORKER_COUNT)
+        ]
+        for worker in workers:
+            worker.start()
+        results = [result_queue.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        processed = [name for result in results for name in result]
+        print(f"ワーカーごとの処理件数: {[len(result) for result in results]}")
+        assert sorted(processed) == sorted(names), "各ファイルがちょうど1回処理されていません"
+        assert list(lease_dir.iterdir()) == [], "リースファイルが残っています"
+
+
+def test_stale_lease_reclaim():
+    """期限切れのリースは回収でき、回収されたワーカーはリースを失うこと"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        crashed = LeaseManager(temp_dir, "crashed", ttl_s=1.0, heartbeat_interval_s=0.5)
+        survivor = LeaseManager(temp_dir, "survivor", ttl_s=1.0, heartbeat_interval_s=0.5)
+
+        stale_lease = crashed._try_create("a.wav")
+        assert stale_lease is not None
+        assert survivor.acquire("a.wav") is None, "有効なリースを取得できてしまいました"
+
+        # ハートビートが止まったワーカーのリースを期限切れにする
+        old_time = time.time() - 10
+        os.utime(stale_lease.path, (old_time, old_time))
+        lease = survivor.acquire("a.wav")
+        assert lease is not None, "期限切れのリースを回収できませんでした"
+        assert not crashed.renew(stale_lease) and stale_lease.lost, "回収されたリースを延長できてしまいました"
+
+        # 保持中のリースはハートビートで延長され、期限を過ぎても回収されない
+        time.sleep(1.5)
+        assert crashed.acquire("a.wav") is None, "保持中のリースが回収されました"
+        survivor.close()
+        crashed.close()
+        assert not list(pathlib.Path(temp_dir).iterdir()), "リースファイルが残っています"
+
+
+if __name__ == "__main__":
+    test_exclusive_processing()
+    test_stale_lease_reclaim()
+    print("✅ テスト成功")
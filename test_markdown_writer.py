@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+議事録の書き込み（アトミックな置き換え後のファイル権限）をテストするスクリプト
+"""
+
+import os
+import pathlib
+import stat
+import sys
+import tempfile
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from markdown_writer import MarkdownWriter
+
+
+def _mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_files_follow_umask():
+    """新規の議事録は open(..., "w") で作成した場合と同じ権限になること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        previous_umask = os.umask(0o022)
+        try:
+            writer = MarkdownWriter(work_dir)
+            note = writer.write_new(["note.md"], "# 議事録\n")
+            plain = pathlib.Path(work_dir) / "plain.md"
+            with open(plain, "w", encoding="utf-8") as f:
+                f.write("# 議事録\n")
+            writer.write_atomic(pathlib.Path(work_dir) / "transcript.txt", "文字起こし")
+        finally:
+            os.umask(previous_umask)
+        assert _mode(note) == _mode(plain) == 0o644
+        assert _mode(pathlib.Path(work_dir) / "transcript.txt") == 0o644
+
+
+def test_update_keeps_existing_mode():
+    """既存ファイルの更新では元の権限を保つこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        daily_note = pathlib.Path(work_dir) / "2025-08-25.md"
+        daily_note.write_text("# 2025年08月25日\n", encoding="utf-8")
+        os.chmod(daily_note, 0o664)
+
+        MarkdownWriter(work_dir).write_atomic(daily_note, "# 2025年08月25日\n\n## 🎙️ 音声記録\n")
+        assert _mode(daily_note) == 0o664
+        assert "音声記録" in daily_note.read_text(encoding="utf-8")
+
+
+if __name__ == "__main__":
+    test_new_files_follow_umask()
+    test_update_keeps_existing_mode()
+    print("✅ テスト成功")
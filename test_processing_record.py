@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+処理記録（ファイルごとのJSONLレコード）とパーセンタイル集計コマンドをテストするスクリプト
+"""
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from testing_env import PipelineStubClient, make_recording, override_env, pipeline_env
+from config_manager import ConfigManager
+from audio_processor import AudioProcessor
+from file_manager import FileManager
+from processing_record import JsonlAppender
+import transcribe_summarize
+
+SCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script')
+
+
+class FailingSummaryClient(PipelineStubClient):
+    """要約の生成が失敗するスタブ"""
+
+    def generate_content(self, model_name, contents, stream=False):
+        if not isinstance(contents, list):
+            raise ValueError("summary failed")
+        return super().generate_content(model_name, contents, stream)
+
+
+def _process(work_path: pathlib.Path, client, name: str) -> dict:
+    """1ファイルを処理し、追記された処理記録を返す"""
+    with override_env(**pipeline_env(work_path)):
+        config = ConfigManager()
+    recording = make_recording(work_path / "inbox" / name)
+    log_path = work_path / "processed_log.jsonl"
+    processed_log = JsonlAppender(str(log_path))
+    transcribe_summarize.process_audio_file(
+        recording, "{{TRANSCRIPTION}}", config, AudioProcessor(config, client=client), FileManager(config),
+        processed_log
+    )
+    processed_log.close()
+    with open(log_path, encoding="utf-8") as f:
+        return json.loads(f.readlines()[-1])
+
+
+def test_record_for_processed_file():
+    """成功したファイルの記録に、ステージごとの経過時間・CPU時間とAPI呼び出し・トークン数が含まれること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        record = _process(work_path, PipelineStubClient(), "meeting.wav")
+
+        assert record["status"] == "success" and record["error"] is None
+        assert record["source_audio"] == "meeting.wav" and len(record["source_sha256"]) == 64
+        assert record["output_markdown"].endswith(".md")
+        assert record["audio_duration_s"] == 3.0
+        assert {"hash", "decode", "upload", "generate", "delete", "summarize", "title", "save", "move"} <= set(record["stages"])
+        for name, stage in record["stages"].items():
+            assert stage["count"] >= 1 and stage["wall_s"] >= 0.0 and stage["cpu_s"] >= 0.0, name
+        assert record["total_wall_s"] >= max(stage["wall_s"] for stage in record["stages"].values())
+        assert record["api_calls"] == {"upload": 1, "generate": 3, "delete": 1}
+        assert record["tokens"] == {"prompt": 1250, "candidates": 55, "total": 1305}
+        assert record["chunk_count"] == 1 and record["bytes_uploaded"] > 0
+        assert [timing["label"].split(":")[0] for timing in record["generation_timings"]] == ["transcribe", "summarize", "title"]
+
+
+def test_record_for_failed_file():
+    """失敗したファイルも、失敗までのステージとエラー内容を記録すること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        record = _process(work_path, FailingSummaryClient(), "broken.wav")
+
+        assert record["status"] == "error" and "summary failed" in record["error"]
+        assert record["output_markdown"] is None
+        assert "summarize" in record["stages"] and "save" not in record["stages"]
+        assert record["api_calls"]["generate"] == 2
+
+
+def test_percentile_report_cli():
+    """集計コマンドがステージごとのパーセンタイル・合計を出力し、状態で絞り込めること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_path = pathlib.Path(work_dir) / "processed_log.jsonl"
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write("旧形式の行\n")
+            for index in range(1, 6):
+                f.write(json.dumps({
+                    "status": "success", "total_wall_s": float(index * 2),
+                    "stages": {"generate": {"wall_s": float(index)}},
+                    "tokens": {"total": 100}, "api_calls": {"generate": 2}, "bytes_uploaded": 10,
+                }) + "\n")
+            f.write(json.dumps({"status": "error", "total_wall_s": 100.0, "stages": {}}) + "\n")
+
+        result = subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, "processing_record.py"), str(log_path)],
+            capture_output=True, text=True, check=True,
+        )
+        lines = result.stdout.splitlines()
+        assert lines[0] == "5 records (success)"
+        assert lines[2].split() == ["total", "5", "6.00", "9.20", "9.92", "10.00", "30.00"]
+        assert lines[3].split() == ["generate", "5", "3.00", "4.60", "4.96", "5.00", "15.00"]
+        assert lines[4] == "api_calls.generate=10, bytes_uploaded=50, temp_disk_bytes_written=0, tokens.total=500"
+
+        result = subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, "processing_record.py"), str(log_path), "--status", "all"],
+            capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.splitlines()[0] == "6 records (all)"
+
+        result = subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, "processing_record.py"), str(log_path), "--status", "skipped"],
+            capture_output=True, text=True,
+        )
+        assert result.returncode == 1 and "No matching records found." in result.stdout
+
+
+if __name__ == "__main__":
+    test_record_for_processed_file()
+    test_record_for_failed_file()
+    test_percentile_report_cli()
+    print("✅ テスト成功")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+再開可能アップロードをテストするスクリプト（途中で接続を切断するローカルの疑似エンドポイントを使用）
+"""
+
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from google.generativeai.types import content_types
+
+from resumable_uploader import CHUNK_GRANULARITY, ResumableUploader
+
+
+class FakeUploadServer(http.server.ThreadingHTTPServer):
+    """resumable プロトコルを模擬し、指定した回数だけチャンク受信中に接続を切断するサーバー"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeUploadHandler)
+        self.sessions = {}
+        self.drop_uploads = set()  # 何番目のチャンク送信で切断するか
+        self.upload_requests = 0
+        self.commands = []
+        self.bytes_read = 0
+        self.lock = threading.Lock()
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeUploadHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, headers: dict, body: bytes = b""):
+        self.send_response(200)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        command = self.headers.get("X-Goog-Upload-Command", "")
+        length = int(self.headers.get("Content-Length", 0))
+        with server.lock:
+            server.commands.append(command)
+
+        if self.path == "/upload/v1beta/files":
+            self.rfile.read(length)
+            with server.lock:
+                session_id = str(len(server.sessions) + 1)
+                server.sessions[session_id] = {
+                    "size": int(self.headers["X-Goog-Upload-Header-Content-Length"]), "data": bytearray(), "final": False,
+                }
+            self._reply({"X-Goog-Upload-URL": f"{server.base_url}/session/{session_id}"})
+            return
+
+        session = server.sessions[self.path.rsplit("/", 1)[-1]]
+        file_body = json.dumps({"file": {"name": "files/fake-1", "uri": "https://fake.invalid/files/fake-1",
+                                         "mimeType": "audio/wav", "state": "ACTIVE"}}).encode("utf-8")
+        if command == "query":
+            status = "final" if session["final"] else "active"
+            self._reply({"X-Goog-Upload-Status": status, "X-Goog-Upload-Size-Received": str(len(session["data"]))},
+                        file_body if session["final"] else b"")
+            return
+
+        with server.lock:
+            server.upload_requests += 1
+            drop = server.upload_requests in server.drop_uploads
+        if drop:
+            # チャンクの途中まで受信したところで応答せずに切断（受信途中のチャンクは破棄）
+            server.bytes_read += len(self.rfile.read(length // 2))
+            self.close_connection = True
+            self.connection.close()
+            return
+        data = self.rfile.read(length)
+        server.bytes_read += len(data)
+        assert int(self.headers["X-Goog-Upload-Offset"]) == len(session["data"])
+        session["data"].extend(data)
+        if "finalize" in command:
+            session["final"] = True
+            self._reply({"X-Goog-Upload-Status": "final"}, file_body)
+        else:
+            self._reply({"X-Goog-Upload-Status": "active"})
+
+
+def _start_server() -> FakeUploadServer:
+    server = FakeUploadServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _make_source(directory: str, chunks: int) -> str:
+    path = os.path.join(directory, "chunk_fast.wav")
+    with open(path, "wb") as f:
+        f.write(os.urandom(CHUNK_GRANULARITY * chunks + 1000))
+    return path
+
+
+def test_resume_after_dropped_connections():
+    """途中で接続が切れても受信済みの位置から再送し、全体を送り直さないこと"""
+    server = _start_server()
+    server.drop_uploads = {2, 4}
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = _make_source(work_dir, 4)
+        uploader = ResumableUploader(None, work_dir, base_url=server.base_url,
+                                     chunk_size=CHUNK_GRANULARITY, retry_delay_s=0)
+        uploaded = uploader.upload(source, mime_type="audio/wav")
+
+        with open(source, "rb") as f:
+            assert bytes(server.sessions["1"]["data"]) == f.read()
+        assert uploaded.name == "files/fake-1"
+        # 戻り値は SDK の generate_content にそのまま渡せること
+        contents = content_types.to_contents(["この音声ファイルを文字起こししてください。", uploaded])
+        file_data = contents[0].parts[1].file_data
+        assert (file_data.file_uri, file_data.mime_type) == ("https://fake.invalid/files/fake-1", "audio/wav")
+        # 切断されたチャンクの半分ずつだけが余分に送信される
+        size = os.path.getsize(source)
+        assert server.bytes_read <= size + CHUNK_GRANULARITY
+        assert not os.listdir(os.path.join(work_dir, "upload_sessions"))
+    server.shutdown()
+
+
+def test_resume_after_restart():
+    """再試行の上限で失敗しても、保存したセッションから別のプロセス（インスタンス）が続きを送信すること"""
+    server = _start_server()
+    server.drop_uploads = {3, 4}
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = _make_source(work_dir, 4)
+        first = ResumableUploader(None, work_dir, base_url=server.base_url,
+                                  chunk_size=CHUNK_GRANULARITY, max_attempts=2, retry_delay_s=0)
+        try:
+            first.upload(source, mime_type="audio/wav")
+            assert False, "upload should have failed"
+        except IOError:
+            pass
+        assert len(server.sessions["1"]["data"]) == 2 * CHUNK_GRANULARITY
+
+        server.commands.clear()
+        second = ResumableUploader(None, work_dir, base_url=server.base_url,
+                                   chunk_size=CHUNK_GRANULARITY, retry_delay_s=0)
+        second.upload(source, mime_type="audio/wav")
+        # 新しいセッションを開始せず、受信済みの位置を問い合わせてから続きを送信
+        assert server.commands[0] == "query" and "start" not in server.commands
+        assert len(server.sessions) == 1
+        with open(source, "rb") as f:
+            assert bytes(server.sessions["1"]["data"]) == f.read()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    test_resume_after_dropped_connections()
+    test_resume_after_restart()
+    print("✅ テスト成功")
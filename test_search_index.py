@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+全文検索インデックス（議事録・文字起こしの登録・更新・検索・再構築）をテストするスクリプト
+"""
+
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from search_index import SearchIndex
+
+NOTE_BODY = "## 要約\n来期の予算案について営業部と開発部で協議した。\n"
+
+
+def _paths(hits) -> list:
+    return [pathlib.Path(hit["path"]).name for hit in hits]
+
+
+def test_index_note_and_search_japanese():
+    """日本語の3文字以上の語は trigram で検索でき、更新すると古い内容ではヒットしないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        index = SearchIndex(os.path.join(work_dir, "index.sqlite3"))
+        index.index_note(os.path.join(work_dir, "20250801_予算会議.md"),
+                         {"title": "予算会議", "tags": ["会議", "予算"], "recording_datetime": "2025-08-01 10:00"},
+                         NOTE_BODY)
+        index.index_transcript(os.path.join(work_dir, "20250801_予算会議.txt"), "えー、では予算案の説明を始めます。")
+
+        hits = index.search("予算案")
+        assert sorted(_paths(hits)) == ["20250801_予算会議.md", "20250801_予算会議.txt"]
+        note_hit = next(hit for hit in hits if hit["kind"] == "minutes")
+        assert note_hit["title"] == "予算会議" and "[予算案]" in note_hit["snippet"]
+        # 複数の語はすべてを含むドキュメントだけがヒット
+        assert _paths(index.search("予算案 開発部")) == ["20250801_予算会議.md"]
+
+        # 同じパスを更新すると置き換えられ、重複しない
+        index.index_note(os.path.join(work_dir, "20250801_予算会議.md"), {"title": "採用会議"},
+                         "新卒採用の計画を確認した。")
+        assert _paths(index.search("予算案")) == ["20250801_予算会議.txt"]
+        assert _paths(index.search("採用の")) == ["20250801_予算会議.md"]
+        assert index._connection.execute("SELECT count(*) FROM notes").fetchone()[0] == 2
+        assert index._connection.execute("SELECT count(*) FROM docs").fetchone()[0] == 2
+        index.close()
+
+
+def test_short_query_falls_back_to_substring_search():
+    """3文字未満の語はインデックスを使わない部分一致検索で見つかること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        index = SearchIndex(os.path.join(work_dir, "index.sqlite3"))
+        index.index_note(os.path.join(work_dir, "a.md"), {"title": "定例", "recording_datetime": "2025-08-01"},
+                         "議題はAIの活用。")
+        index.index_note(os.path.join(work_dir, "b.md"), {"title": "雑談", "recording_datetime": "2025-08-02"},
+                         "特になし。")
+
+        assert _paths(index.search("AI")) == ["a.md"]
+        assert _paths(index.search("定例")) == ["a.md"]
+        assert _paths(index.search("な")) == ["b.md"]
+        assert index.search("  ") == []
+        index.close()
+
+
+def test_rebuild_from_files_and_upgrade_legacy_index():
+    """既存のファイルから再構築でき、対応表のない以前のインデックスも更新で重複しないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        markdown_dir = work_path / "markdown"
+        transcript_dir = markdown_dir / ".transcripts"
+        transcript_dir.mkdir(parents=True)
+        (markdown_dir / "予算会議.md").write_text(
+            "---\ntitle: 予算会議\ntags:\n- 会議\n---\n\n" + NOTE_BODY, encoding="utf-8"
+        )
+        (markdown_dir / "採用会議.md").write_text("新卒採用の計画を確認した。\n", encoding="utf-8")
+        (transcript_dir / "予算会議.txt").write_text("予算案の説明を始めます。", encoding="utf-8")
+
+        index = SearchIndex(str(work_path / "index.sqlite3"))
+        index.index_note(str(work_path / "stale.md"), {}, "削除済みの予算案")
+        assert index.rebuild(str(markdown_dir), str(transcript_dir), workers=1) == 3
+        assert sorted(_paths(index.search("予算案"))) == ["予算会議.md", "予算会議.txt"]
+        assert sorted(_paths(index.search("会議"))) == ["予算会議.md", "予算会議.txt", "採用会議.md"]
+        assert index.search("新卒採用")[0]["title"] == "採用会議"
+        index.close()
+
+        # 対応表（docs）のない以前の形式のインデックス
+        legacy_path = work_path / "legacy.sqlite3"
+        connection = sqlite3.connect(str(legacy_path))
+        connection.execute(
+            "CREATE VIRTUAL TABLE notes USING fts5("
+            " path UNINDEXED, kind UNINDEXED, title, tags, recording_datetime, body, tokenize = 'trigram')"
+        )
+        connection.execute("INSERT INTO notes VALUES ('old.md', 'minutes', '旧議事録', '', '', '古い予算案')")
+        connection.commit()
+        connection.close()
+
+        index = SearchIndex(str(legacy_path))
+        index.index_note("old.md", {"title": "旧議事録"}, "新しい採用計画")
+        assert index.search("予算案") == []
+        assert _paths(index.search("採用計画")) == ["old.md"]
+        index.close()
+
+
+if __name__ == "__main__":
+    test_index_note_and_search_japanese()
+    test_short_query_falls_back_to_substring_search()
+    test_rebuild_from_files_and_upgrade_legacy_index()
+    print("✅ テスト成功")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+録音ごとの倍速の自動調整をテストするスクリプト（倍速に応じて文字起こしの精度が落ちるスタブクライアントを使用）
+"""
+
+import os
+import pathlib
+import sys
+import tempfile
+import types
+import wave
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from pydub.generators import Sine
+
+from testing_env import make_audio_processor, stub_response
+from speed_calibrator import SpeedCalibrator, transcription_agreement
+
+FRAME_RATE = 16000
+REFERENCE_TEXT = "本日の議題は来期の予算案についてです。まず営業部から説明をお願いします。"
+
+
+class StubClient:
+    """アップロードされたWAVのサンプリングレートから倍速を求め、max_clean_speed を超えると崩れた文字起こしを返すスタブ"""
+
+    def __init__(self, max_clean_speed):
+        self.max_clean_speed = max_clean_speed
+        self.uploaded_speeds = {}
+        self.generated_speeds = []
+
+    def upload_file(self, path, mime_type=None):
+        with wave.open(path, "rb") as f:
+            speed = f.getframerate() / FRAME_RATE
+        name = f"files/stub-{len(self.uploaded_speeds) + 1}"
+        self.uploaded_speeds[name] = speed
+        return types.SimpleNamespace(name=name, uri=f"https://stub.invalid/{name}", mime_type=mime_type)
+
+    def generate_content(self, model_name, contents, stream=False):
+        speed = self.uploaded_speeds[contents[1].name]
+        self.generated_speeds.append(speed)
+        text = REFERENCE_TEXT if speed <= self.max_clean_speed else "えーと、ちょっと、聞き取れません。"
+        return stub_response(text)
+
+    def delete_file(self, name):
+        pass
+
+
+def _make_processor(client, calibrator):
+    """スタブクライアントと調整器を使う AudioProcessor を作成"""
+    return make_audio_processor(client, speed_calibrator=calibrator)
+
+
+def _make_recording(directory: pathlib.Path) -> str:
+    path = directory / "meeting.wav"
+    Sine(440).to_audio_segment(duration=40_000).set_frame_rate(FRAME_RATE).set_channels(1).export(str(path), format="wav")
+    return str(path)
+
+
+def _temp_dir(work_path: pathlib.Path, name: str) -> pathlib.Path:
+    temp_dir = work_path / name
+    temp_dir.mkdir()
+    return temp_dir
+
+
+def _calibrator(db_path: pathlib.Path) -> SpeedCalibrator:
+    return SpeedCalibrator(str(db_path), candidates=(1.5, 2.0, 2.5, 3.0), sample_s=5, sample_count=3,
+                           min_agreement=0.85, min_duration_s=30)
+
+
+def test_agreement_score():
+    """空白・句読点の違いは一致度に影響せず、内容が異なると一致度が下がること"""
+    assert transcription_agreement("本日は、晴天なり。", "本日は晴天なり") == 1.0
+    assert transcription_agreement(REFERENCE_TEXT, "聞き取れません") < 0.5
+    assert transcription_agreement("", REFERENCE_TEXT) == 0.0
+
+
+def test_calibration_picks_fastest_acceptable_speed_and_caches():
+    """一致度が十分な最も速い倍速で文字起こしし、同じ録音の再処理では調整を繰り返さないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        recording = _make_recording(work_path)
+
+        client = StubClient(max_clean_speed=2.5)
+        processor = _make_processor(client, _calibrator(work_path / "calibration.sqlite3"))
+        transcription = processor.transcribe_audio(recording, _temp_dir(work_path, "run1"))
+
+        assert transcription == REFERENCE_TEXT
+        # 1.5x（基準）・2.0x・2.5x・3.0x の順に試し、本番の文字起こしは 2.5x
+        assert client.generated_speeds == [1.5, 2.0, 2.5, 3.0, 2.5]
+        assert processor.metrics["speed_calibrations"] == 1
+        # 処理後は元の倍速に戻る
+        assert processor.speed_multiplier == 1.5
+
+        client = StubClient(max_clean_speed=2.5)
+        processor = _make_processor(client, _calibrator(work_path / "calibration.sqlite3"))
+        processor.transcribe_audio(recording, _temp_dir(work_path, "run2"))
+        assert client.generated_speeds == [2.5]
+        assert processor.metrics["speed_calibration_cache_hits"] == 1
+
+
+def test_hard_recording_stays_slow_and_governor_boost_is_respected():
+    """聞き取りにくい録音は遅い倍速を選び、予算ガバナーの引き上げ中は新たに調整しないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        recording = _make_recording(work_path)
+
+        client = StubClient(max_clean_speed=1.5)
+        processor = _make_processor(client, _calibrator(work_path / "calibration.sqlite3"))
+        processor.transcribe_audio(recording, _temp_dir(work_path, "run1"))
+        # 2.0x で一致度が下がった時点で、より速い倍速は試さない
+        assert client.generated_speeds == [1.5, 2.0, 1.5]
+
+        # 予算ガバナーが倍速を引き上げている場合は、保存済みの結果より引き上げ後の倍速を優先
+        client = StubClient(max_clean_speed=1.5)
+        processor = _make_processor(client, _calibrator(work_path / "calibration.sqlite3"))
+        processor.speed_multiplier = 2.5
+        processor.transcribe_audio(recording, _temp_dir(work_path, "run2"))
+        assert client.generated_speeds == [2.5]
+
+        # 未調整の録音でも、引き上げ中は調整のためのAPI呼び出しを行わない
+        client = StubClient(max_clean_speed=3.0)
+        processor = _make_processor(client, _calibrator(work_path / "other.sqlite3"))
+        processor.speed_multiplier = 2.5
+        processor.transcribe_audio(recording, _temp_dir(work_path, "run3"))
+        assert client.generated_speeds == [2.5]
+        assert processor.metrics["speed_calibrations"] == 0
+
+
+if __name__ == "__main__":
+    test_agreement_score()
+    test_calibration_picks_fastest_acceptable_speed_and_caches()
+    test_hard_recording_stays_slow_and_governor_boost_is_respected()
+    print("✅ テスト成功")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+ステージ別プロファイラ（--profile）の出力と、無効時に何も追加しないことをテストするスクリプト
+"""
+
+import gc
+import json
+import os
+import pathlib
+import pstats
+import sys
+import tempfile
+import tracemalloc
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from testing_env import PipelineStubClient, make_recording, override_env, pipeline_env
+from config_manager import ConfigManager
+from audio_processor import AudioProcessor
+from file_manager import FileManager
+from processing_record import JsonlAppender
+from stage_profiler import StageProfiler
+import transcribe_summarize
+
+
+def _process(work_path: pathlib.Path, profile_dir=None) -> dict:
+    """1ファイルを処理し、処理記録を返す"""
+    with override_env(**pipeline_env(work_path)):
+        config = ConfigManager()
+    recording = make_recording(work_path / "inbox" / "meeting.wav")
+    log_path = work_path / "processed_log.jsonl"
+    processed_log = JsonlAppender(str(log_path))
+    transcribe_summarize.process_audio_file(
+        recording, "{{TRANSCRIPTION}}", config, AudioProcessor(config, client=PipelineStubClient()),
+        FileManager(config), processed_log, profile_dir=profile_dir
+    )
+    processed_log.close()
+    with open(log_path, encoding="utf-8") as f:
+        return json.loads(f.readlines()[-1])
+
+
+def _profiler_count() -> int:
+    gc.collect()
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, StageProfiler))
+
+
+def test_profiling_off_writes_nothing():
+    """profile_dir を指定しない場合はプロファイラを作らず、tracemalloc も開始せず、ファイルも書き出さないこと"""
+    assert not tracemalloc.is_tracing()
+    profilers_before = _profiler_count()
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        original_span = StageProfiler.span
+        StageProfiler.span = None  # 呼ばれたら TypeError になる
+        try:
+            record = _process(work_path)
+        finally:
+            StageProfiler.span = original_span
+
+        assert record["status"] == "success"
+        assert not tracemalloc.is_tracing()
+        assert _profiler_count() == profilers_before
+        assert not (work_path / "profiles").exists()
+        assert list(work_path.rglob("*.pstats")) == [] and list(work_path.rglob("allocations.txt")) == []
+
+
+def test_profiling_on_writes_each_stage():
+    """profile_dir を指定した場合はステージごとの .pstats と全体の統計・メモリ確保レポートを書き出すこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        record = _process(work_path, profile_dir=work_path / "profiles")
+
+        assert record["status"] == "success"
+        assert not tracemalloc.is_tracing()  # 自分で開始した tracemalloc は停止する
+        [output_dir] = (work_path / "profiles").iterdir()
+        assert output_dir.name.startswith("meeting_")
+        stages = set(record["stages"])
+        assert {"decode", "upload", "generate", "summarize", "title", "save"} <= stages
+        assert {path.stem for path in output_dir.glob("*.pstats")} == stages | {"combined"}
+        for stage in stages:
+            assert pstats.Stats(str(output_dir / f"{stage}.pstats")).total_calls > 0, stage
+        combined = pstats.Stats(str(output_dir / "combined.pstats"))
+        assert combined.total_calls == sum(
+            pstats.Stats(str(output_dir / f"{stage}.pstats")).total_calls for stage in stages
+        )
+
+        cpu_top = (output_dir / "cpu_top.txt").read_text(encoding="utf-8")
+        allocations = (output_dir / "allocations.txt").read_text(encoding="utf-8")
+        for stage in stages:
+            assert f"== {stage}\n" in cpu_top, stage
+            assert f"== {stage} (calls=" in allocations, stage
+
+
+if __name__ == "__main__":
+    test_profiling_off_writes_nothing()
+    test_profiling_on_writes_each_stage()
+    print("✅ テスト成功")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+ストリーミング生成の途中出力からの再開と、一時的なエラーだけの再試行をテストするスクリプト（スタブクライアントを使用）
+"""
+
+import os
+import pathlib
+import sys
+import tempfile
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from google.api_core import exceptions as google_exceptions
+
+from testing_env import make_audio_processor, stub_response
+
+
+class StubClient:
+    """1回目のストリーミングは途中まで受信してから error を送出し、2回目以降は最後まで返すスタブ"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.requests = []
+
+    def generate_content(self, model_name, contents, stream=False):
+        self.requests.append(contents)
+        if self.error is not None and len(self.requests) == 1:
+            return self._interrupted()
+        return stub_response("後半。")
+
+    def _interrupted(self):
+        yield next(stub_response("前半、"))
+        raise self.error
+
+
+def test_transient_error_resumes_from_partial_output():
+    """一時的なエラーで中断した場合は、途中出力を添えて続きから生成すること"""
+    for error in (ConnectionError("reset"), google_exceptions.ServiceUnavailable("unavailable")):
+        with tempfile.TemporaryDirectory() as work_dir:
+            partial_path = pathlib.Path(work_dir) / "chunk_1_transcription.txt.partial"
+            client = StubClient(error)
+            processor = make_audio_processor(client)
+
+            text, finish_reason = processor._stream_generate("文字起こし", partial_path, "transcribe:test")
+            assert text == "前半、後半。" and finish_reason == "STOP"
+            assert len(client.requests) == 2
+            assert "前半、" in client.requests[1]
+            assert processor.metrics["stream_resumes"] == 1
+
+
+def test_non_transient_error_is_not_retried():
+    """一時的でないエラー（不正なリクエストなど）は再試行せずに送出すること"""
+    for error in (google_exceptions.InvalidArgument("bad request"), ValueError("unexpected")):
+        client = StubClient(error)
+        processor = make_audio_processor(client)
+        try:
+            processor._stream_generate("文字起こし", None, "transcribe:test")
+        except type(error):
+            pass
+        else:
+            raise AssertionError(f"{type(error).__name__} was retried")
+        assert len(client.requests) == 1
+        assert processor.metrics["stream_resumes"] == 0
+
+
+def test_previous_partial_output_is_continued():
+    """前回の実行の途中出力がある場合は、最初のリクエストからその続きを生成させること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        partial_path = pathlib.Path(work_dir) / "chunk_1_transcription.txt.partial"
+        partial_path.write_text("前半、", encoding="utf-8")
+        client = StubClient()
+        processor = make_audio_processor(client)
+
+        text, _ = processor._stream_generate("文字起こし", partial_path, "transcribe:test")
+        assert text == "前半、後半。"
+        assert len(client.requests) == 1 and "前半、" in client.requests[0]
+        assert processor.metrics["stream_resumes"] == 1
+
+
+def test_summary_draft_for_different_input_is_discarded():
+    """入力が変わった要約の途中出力は続きに使わず、同じ入力の途中出力だけを再開すること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        draft_path = pathlib.Path(work_dir) / "summary_draft.md"
+        client = StubClient(ConnectionError("reset"))
+        processor = make_audio_processor(client)
+        processor.MAX_STREAM_ATTEMPTS = 1
+        try:
+            processor.summarize_text("古い文字起こし", "{{TRANSCRIPTION}}", draft_path=draft_path)
+        except ConnectionError:
+            pass
+        stale_partials = list(pathlib.Path(work_dir).glob("summary_draft.md*.partial"))
+        assert len(stale_partials) == 1 and stale_partials[0].read_text(encoding="utf-8") == "前半、"
+        # 以前の形式の途中出力
+        (pathlib.Path(work_dir) / "summary_draft.md.partial").write_text("古い要約", encoding="utf-8")
+
+        client = StubClient()
+        processor = make_audio_processor(client)
+        summary = processor.summarize_text("新しい文字起こし", "{{TRANSCRIPTION}}", draft_path=draft_path)
+        assert summary == "後半。"
+        assert "前半、" not in client.requests[0] and "古い要約" not in client.requests[0]
+        assert processor.metrics["stream_resumes"] == 0
+        assert list(pathlib.Path(work_dir).glob("*.partial")) == []
+        assert draft_path.read_text(encoding="utf-8") == "後半。"
+
+        # 同じ入力なら途中出力の続きから生成
+        client = StubClient(ConnectionError("reset"))
+        processor = make_audio_processor(client)
+        processor.MAX_STREAM_ATTEMPTS = 1
+        try:
+            processor.summarize_text("古い文字起こし", "{{TRANSCRIPTION}}", draft_path=draft_path)
+        except ConnectionError:
+            pass
+        client = StubClient()
+        processor = make_audio_processor(client)
+        assert processor.summarize_text("古い文字起こし", "{{TRANSCRIPTION}}", draft_path=draft_path) == "前半、後半。"
+        assert "前半、" in client.requests[0]
+
+
+if __name__ == "__main__":
+    test_transient_error_resumes_from_partial_output()
+    test_non_transient_error_is_not_retried()
+    test_previous_partial_output_is_continued()
+    test_summary_draft_for_different_input_is_discarded()
+    print("✅ テスト成功")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+要約・タイトル生成結果のキャッシュ（再実行時のAPI呼び出しの省略・LRU削除・--no_summary_cache）をテストするスクリプト
+"""
+
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import time
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from testing_env import PipelineStubClient, make_audio_processor, make_recording, override_env, pipeline_env
+from summary_cache import SummaryCache
+import transcribe_summarize
+
+
+def test_second_run_makes_no_generate_calls():
+    """入力が同じなら、別のプロセス（キャッシュを開き直した状態）でも要約・タイトルのAPIを呼ばないこと"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache_path = os.path.join(work_dir, "summary_cache.sqlite3")
+        results = []
+        for _ in range(2):
+            client = PipelineStubClient()
+            cache = SummaryCache(cache_path)
+            processor = make_audio_processor(client, summary_cache=cache)
+            summary = processor.summarize_text("文字起こし", "{{TRANSCRIPTION}}")
+            results.append((summary, processor.generate_filename_from_summary(summary), sum(client.calls.values())))
+            cache.close()
+
+        assert results[0] == (PipelineStubClient.SUMMARY, PipelineStubClient.TITLE, 2)
+        assert results[1] == (PipelineStubClient.SUMMARY, PipelineStubClient.TITLE, 0)
+
+        # 文字起こしが変わった場合は要約し直す
+        client = PipelineStubClient()
+        cache = SummaryCache(cache_path)
+        make_audio_processor(client, summary_cache=cache).summarize_text("別の文字起こし", "{{TRANSCRIPTION}}")
+        assert client.calls["summarize"] == 1
+        cache.close()
+
+
+def test_lru_eviction_respects_max_entries():
+    """上限を超えると最終アクセスが最も古いエントリから削除されること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = SummaryCache(os.path.join(work_dir, "summary_cache.sqlite3"), max_entries=2)
+        cache.put("a", "summary", "A")
+        time.sleep(0.01)
+        cache.put("b", "summary", "B")
+        time.sleep(0.01)
+        assert cache.get("a") == "A"  # a の方が最近アクセスされた
+        time.sleep(0.01)
+        cache.put("c", "title", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A" and cache.get("c") == "C"
+        assert cache._connection.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0] == 2
+        cache.close()
+
+
+def test_no_summary_cache_flag_bypasses_cache():
+    """--no_summary_cache を指定した実行はキャッシュ済みでも要約・タイトルを生成すること"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        inbox = work_path / "inbox"
+        inbox.mkdir()
+        recording = make_recording(work_path / "meeting.wav")
+        prompt_path = work_path / "prompt.txt"
+        prompt_path.write_text("{{TRANSCRIPTION}}", encoding="utf-8")
+
+        env = pipeline_env(work_path)
+        calls = []
+        for extra_args in ([], [], ["--no_summary_cache"]):
+            shutil.copy(recording, inbox / "meeting.wav")
+            client = PipelineStubClient()
+            with override_env(**env):
+                transcribe_summarize.main([
+                    "--audio_processing_dir", str(inbox),
+                    "--markdown_output_dir", str(work_path / "markdown"),
+                    "--summary_prompt_file_path", str(prompt_path),
+                    "--processed_log_file_path", str(work_path / "processed_log.jsonl"),
+                ] + extra_args, client=client)
+            calls.append((client.calls["summarize"], client.calls["title"]))
+
+        assert calls == [(1, 1), (0, 0), (1, 1)]
+
+
+if __name__ == "__main__":
+    test_second_run_makes_no_generate_calls()
+    test_lru_eviction_respects_max_entries()
+    test_no_summary_cache_flag_bypasses_cache()
+    print("✅ テスト成功")
@@ -10,7 +10,7 @@ import tempfile
 import pathlib
 
 # スクリプトディレクトリをパスに追加
-sys.path.append('/Users/okky_1_2/dev/AppLaud/script')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
 
 from daily_note_utils import add_link_to_daily_note
 
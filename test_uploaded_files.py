@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+アップロード済みファイルの管理（バックグラウンド削除・前回の残りの掃除）をテストするスクリプト
+"""
+
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from config_manager import ConfigManager
+from audio_processor import AudioProcessor
+from uploaded_files import UploadedFileManager
+from testing_env import override_env
+import transcribe_summarize
+
+
+class StubClient:
+    """生成が必ず失敗し、削除されたファイル名を記録するスタブ"""
+
+    def __init__(self, delete_latency_s=0.0):
+        self.uploaded = []
+        self.deleted = []
+        self.delete_latency_s = delete_latency_s
+        self._lock = threading.Lock()
+
+    def upload_file(self, path, mime_type=None):
+        with self._lock:
+            name = f"files/stub-{len(self.uploaded) + 1}"
+            self.uploaded.append(name)
+        return types.SimpleNamespace(name=name, uri=f"https://stub.invalid/{name}", mime_type=mime_type)
+
+    def generate_content(self, model_name, contents, stream=False):
+        raise ConnectionError("generation failed")
+
+    def delete_file(self, name):
+        time.sleep(self.delete_latency_s)
+        with self._lock:
+            self.deleted.append(name)
+
+
+def test_delete_after_failed_generation():
+    """生成に失敗してもアップロードしたファイルが削除され、台帳に残らないこと"""
+    client = StubClient()
+    with tempfile.TemporaryDirectory() as work_dir:
+        manager = UploadedFileManager(client, os.path.join(work_dir, "uploads.sqlite3"))
+        processor = AudioProcessor(ConfigManager(), client=manager)
+        processor.MAX_STREAM_ATTEMPTS = 1
+        chunk_path = pathlib.Path(work_dir) / "chunk.wav"
+        chunk_path.write_bytes(b"RIFF")
+
+        try:
+            processor.transcribe_chunk(chunk_path, pathlib.Path(work_dir) / "chunk_transcription.txt")
+            assert False, "transcription should have failed"
+        except ConnectionError:
+            pass
+        manager.close()
+        assert client.deleted == client.uploaded == ["files/stub-1"]
+
+        manager = UploadedFileManager(client, os.path.join(work_dir, "uploads.sqlite3"))
+        assert manager.pending_count() == 0
+        manager.close()
+
+
+def test_sweep_orphans_from_crashed_run():
+    """終了したプロセスが削除せずに残したファイルだけが次回起動時に削除されること"""
+    client = StubClient()
+    with tempfile.TemporaryDirectory() as work_dir:
+        ledger_path = os.path.join(work_dir, "uploads.sqlite3")
+        crashed = UploadedFileManager(client, ledger_path)
+        crashed.upload_file("crashed.wav")
+        crashed.upload_file("kept_for_batch.wav")
+        dead_process = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead_process.wait()
+        crashed.pid = dead_process.pid
+        crashed._connection.execute("UPDATE uploads SET pid = ?", (dead_process.pid,))
+        crashed._connection.commit()
+        live = UploadedFileManager(client, ledger_path)
+        live.upload_file("in_progress.wav")
+        crashed.close()
+
+        manager = UploadedFileManager(client, ledger_path)
+        assert manager.sweep_orphans(keep={"files/stub-2"}) == 1
+        manager.close()
+        assert client.deleted == ["files/stub-1"]
+        live.close()
+
+
+def test_orphans_deleted_when_inbox_is_empty():
+    """処理するファイルがない実行でも、前回の残りのファイルの削除を完了してから終了すること"""
+    client = StubClient(delete_latency_s=0.5)
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_path = pathlib.Path(work_dir)
+        state_dir = work_path / "state"
+        crashed = UploadedFileManager(client, str(state_dir / "uploads.sqlite3"), orphan_max_age_s=0)
+        crashed.upload_file("crashed.wav")
+        crashed.close()
+        (work_path / "inbox").mkdir()
+
+        with override_env(GOOGLE_API_KEY="offline", MARKDOWN_OUTPUT_DIR=str(work_path / "markdown"),
+                          STATE_DIR=str(state_dir), UPLOAD_ORPHAN_MAX_AGE_S="0", SEARCH_INDEX_ENABLED="false",
+                          GEMINI_CASSETTE_MODE="off"):
+            transcribe_summarize.main([
+                "--audio_processing_dir", str(work_path / "inbox"),
+                "--markdown_output_dir", str(work_path / "markdown"),
+                "--summary_prompt_file_path", str(work_path / "missing_prompt.txt"),
+                "--processed_log_file_path", str(work_path / "processed_log.jsonl"),
+            ], client=client)
+
+        assert client.deleted == ["files/stub-1"]
+        manager = UploadedFileManager(client, str(state_dir / "uploads.sqlite3"))
+        assert manager.pending_count() == 0
+        manager.close()
+
+
+if __name__ == "__main__":
+    test_delete_after_failed_generation()
+    test_sweep_orphans_from_crashed_run()
+    test_orphans_deleted_when_inbox_is_empty()
+    print("✅ テスト成功")
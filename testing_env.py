@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+テスト用の共通処理 - 環境変数を一時的に上書きした AudioProcessor の作成とスタブのクライアント・レスポンス
+"""
+
+import collections
+import contextlib
+import os
+import pathlib
+import sys
+import types
+
+# スクリプトディレクトリをパスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+
+from pydub.generators import Sine
+
+from config_manager import ConfigManager
+from audio_processor import AudioProcessor
+
+# テストで使う処理設定（AUDIO_SPEED_MULTIPLIER などのユーザー設定に依存しないようにする）
+PROCESSOR_ENV = {"AUDIO_SPEED_MULTIPLIER": "1.5", "SILENCE_COMPRESSION_ENABLED": "false"}
+
+
+@contextlib.contextmanager
+def override_env(**values):
+    """ブロック内だけ環境変数を上書き（終了時に元の値に戻す）"""
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def make_audio_processor(client, **kwargs) -> AudioProcessor:
+    """固定の処理設定で AudioProcessor を作成（環境変数は作成後に元に戻す）"""
+    with override_env(**PROCESSOR_ENV):
+        return AudioProcessor(ConfigManager(), client=client, **kwargs)
+
+
+def stub_response(text: str, prompt_tokens: int = 0, candidates_tokens: int = 0, stream: bool = True,
+                  finish_reason: str = "STOP"):
+    """generate_content のレスポンスを模したオブジェクト（stream=True の場合は1チャンクのストリーミング）"""
+    chunk = types.SimpleNamespace(
+        candidates=[types.SimpleNamespace(
+            finish_reason=finish_reason,
+            content=types.SimpleNamespace(parts=[types.SimpleNamespace(text=text)]),
+        )],
+        usage_metadata=types.SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=candidates_tokens,
+            total_token_count=prompt_tokens + candidates_tokens,
+        ),
+    )
+    return iter([chunk]) if stream else chunk
+
+
+def pipeline_env(work_path: pathlib.Path) -> dict:
+    """作業ディレクトリ内で1ファイルの処理全体を実行するための環境変数"""
+    return dict(
+        PROCESSOR_ENV, GOOGLE_API_KEY="offline", MARKDOWN_OUTPUT_DIR=str(work_path / "markdown"),
+        STATE_DIR=str(work_path / "state"), TEMP_CHUNK_BASE_DIR=str(work_path / "chunks"),
+        PROCESSED_FILES_DIR=str(work_path / "done"), SEARCH_INDEX_ENABLED="false", GEMINI_CASSETTE_MODE="off",
+    )
+
+
+def make_recording(path: pathlib.Path, duration_ms: int = 3_000, frame_rate: int = 8000) -> pathlib.Path:
+    """合成音声のWAVファイルを作成"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Sine(440).to_audio_segment(duration=duration_ms).set_frame_rate(frame_rate).set_channels(1).export(str(path), format="wav")
+    return path
+
+
+class PipelineStubClient:
+    """用途（文字起こし・要約・タイトル）ごとの生成回数を数え、固定の結果を返すスタブ"""
+
+    TRANSCRIPTION = "本日の議題は来期の予算案です。"
+    SUMMARY = "## 要約\n来期の予算案を確認した。"
+    TITLE = "予算会議"
+
+    def __init__(self):
+        self.calls = collections.Counter()
+
+    def upload_file(self, path, mime_type=None):
+        self.calls["upload"] += 1
+        name = f"files/stub-{self.calls['upload']}"
+        return types.SimpleNamespace(name=name, uri=f"https://stub.invalid/{name}", mime_type=mime_type)
+
+    def generate_content(self, model_name, contents, stream=False):
+        if isinstance(contents, list):
+            self.calls["transcribe"] += 1
+            return stub_response(self.TRANSCRIPTION, 1000, 20, stream=stream)
+        if "作成ファイル名" in contents:
+            self.calls["title"] += 1
+            return stub_response(self.TITLE, 50, 5, stream=stream)
+        self.calls["summarize"] += 1
+        return stub_response(self.SUMMARY, 200, 30, stream=stream)
+
+    def delete_file(self, name):
+        self.calls["delete"] += 1